@@ -11,6 +11,7 @@ def create_app(config_path: str | None = None) -> Flask:
     from .config import load_config
     from .database import init_db
     from .api import register_api
+    from .system_options import configure_catalog
     from ..routes.settings import settings_bp
     """Application factory used by tests and runtime."""
     config = load_config(config_path)
@@ -28,6 +29,7 @@ def create_app(config_path: str | None = None) -> Flask:
     app.config.update(config)
 
     init_db(app)
+    configure_catalog(app.config.get("CATALOG_PATH"), app.config.get("CATALOG_SPEC_PATH"))
     register_api(app)
     app.register_blueprint(settings_bp)
 
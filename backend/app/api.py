@@ -1,16 +1,27 @@
 from __future__ import annotations
 
-from flask import Blueprint, Flask, current_app, jsonify, request
+import json
 
-from .database import session_scope
+from flask import Blueprint, Flask, Response, current_app, jsonify, request
+
+from .cel import ROLLUP_SNAPSHOTS
+from .compute import COMPUTE_CACHE, compute_quote
+from .database import read_scope, session_scope
+from .formula import compile_formula
 from .models import RDSInput
+from .repricing import DEFAULT_CHUNK_SIZE, reprice_all
+from .search import search_configurations
 from .services import RDSService
 from .system_options import (
-    CATALOG_VERSION,
     PricingValidationError,
-    catalog_payload,
+    SerializedPayload,
     compute_pricing,
-    dropdown_payload,
+    configuration_from_key,
+    configuration_key,
+    current_catalog,
+    price_batch,
+    price_delta,
+    reload_catalog,
     validate_inputs,
 )
 
@@ -18,29 +29,30 @@ from .system_options import (
 api = Blueprint("api", __name__, url_prefix="/api")
 
 
-@api.route("/quote/<quote_number>", methods=["GET", "POST"])
+def _quote_not_found(quote_number: str):
+    return jsonify({"error": "quote not found", "quote_number": quote_number}), 404
+
+
+@api.get("/quote/<quote_number>")
 def quote_detail(quote_number: str):
+    with read_scope() as session:
+        service = RDSService(session)
+        quote = service.load_quote(quote_number)
+        if quote is None:
+            return _quote_not_found(quote_number)
+        return jsonify(service.quote_detail(quote))
+
+
+@api.post("/quote/<quote_number>")
+def save_quote(quote_number: str):
+    payload = request.get_json(silent=True) or {}
     with session_scope() as session:
         service = RDSService(session)
         quote = service.get_or_create_quote(quote_number)
-        if request.method == "POST":
-            payload = request.json or {}
-            service.update_input(quote, payload.get("data", {}), payload.get("customer"))
-            service.recompute_costing(quote, payload.get("margin"))
-            service.append_usage(quote, "update", payload)
-        data = {
-            "quote_number": quote.quote_number,
-            "customer": quote.customer,
-            "inputs": quote.data,
-            "pricing": {
-                "base_total": quote.pricing.subtotal if quote.pricing else 0.0,
-                "margin": quote.pricing.margin if quote.pricing else 0.0,
-                "sell_price": quote.pricing.total if quote.pricing else 0.0,
-                "raw": quote.pricing.data if quote.pricing else {},
-            },
-            "summary": service.summary_as_dict(quote),
-        }
-        return jsonify(data)
+        service.update_input(quote, payload.get("data", {}), payload.get("customer"))
+        service.recompute_costing(quote, payload.get("margin"))
+        service.append_usage(quote, "update", payload)
+        return jsonify(service.quote_detail(quote))
 
 
 @api.post("/quote/<quote_number>/margin")
@@ -55,6 +67,88 @@ def set_margin(quote_number: str):
         return jsonify(result)
 
 
+MAX_SWEEP_POINTS = 1001
+
+
+def _sweep_margins(source) -> list[float]:
+    """Read ``margins`` (list or comma-separated) or ``start``/``stop``/``step``."""
+    margins = source.get("margins")
+    if margins is not None:
+        if isinstance(margins, str):
+            margins = [part for part in margins.split(",") if part.strip()]
+        values = [float(value) for value in margins]
+    else:
+        start = float(source.get("start", 0.0))
+        stop = float(source.get("stop", 0.5))
+        step = float(source.get("step", 0.01))
+        if step <= 0 or stop < start:
+            raise ValueError("need start <= stop and a positive step")
+        count = int(round((stop - start) / step)) + 1
+        values = [start + idx * step for idx in range(min(count, MAX_SWEEP_POINTS + 1))]
+    if not values:
+        raise ValueError("no margins requested")
+    if len(values) > MAX_SWEEP_POINTS:
+        raise ValueError(f"at most {MAX_SWEEP_POINTS} margins per sweep")
+    return values
+
+
+@api.route("/quote/<quote_number>/margin-sweep", methods=["GET", "POST"])
+def margin_sweep(quote_number: str):
+    source = (request.json or {}) if request.method == "POST" else request.args
+    try:
+        margins = _sweep_margins(source)
+    except (TypeError, ValueError) as exc:
+        return jsonify({"error": str(exc)}), 400
+    with read_scope() as session:
+        service = RDSService(session)
+        quote = service.load_quote(quote_number)
+        if quote is None:
+            return _quote_not_found(quote_number)
+        return jsonify(service.margin_sweep(quote, margins))
+
+
+def _goal_targets(payload) -> dict[str, float]:
+    targets = payload.get("targets")
+    if not isinstance(targets, dict) or not targets:
+        raise ValueError("targets must be a non-empty object of quote number -> target")
+    return {str(quote_number): float(target) for quote_number, target in targets.items()}
+
+
+@api.post("/quote/<quote_number>/goal-seek")
+def goal_seek_quote(quote_number: str):
+    payload = request.json or {}
+    try:
+        target = float(payload["target"])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "target must be a number"}), 400
+    with read_scope() as session:
+        service = RDSService(session)
+        quote = service.load_quote(quote_number)
+        if quote is None:
+            return _quote_not_found(quote_number)
+        try:
+            [result] = service.goal_seek({quote.quote_number: target}, payload.get("goal", "sell_price"))
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        return jsonify(result)
+
+
+@api.post("/goal-seek")
+def goal_seek_bulk():
+    payload = request.json or {}
+    try:
+        targets = _goal_targets(payload)
+    except (TypeError, ValueError) as exc:
+        return jsonify({"error": str(exc)}), 400
+    with read_scope() as session:
+        service = RDSService(session)
+        try:
+            results = service.goal_seek(targets, payload.get("goal", "sell_price"))
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        return jsonify({"results": results})
+
+
 @api.post("/quote/<quote_number>/margin/reset")
 def reset_margin(quote_number: str):
     with session_scope() as session:
@@ -78,6 +172,22 @@ def toggle_cell(quote_number: str):
         return jsonify(result)
 
 
+@api.get("/quote/<quote_number>/what-if")
+def toggle_what_if(quote_number: str):
+    without = request.args.getlist("without")
+    margin = request.args.get("margin", type=float)
+    with read_scope() as session:
+        service = RDSService(session)
+        quote = service.load_quote(quote_number)
+        if quote is None:
+            return _quote_not_found(quote_number)
+        try:
+            result = service.toggle_what_if(quote, without, margin)
+        except KeyError as exc:
+            return jsonify({"error": f"unknown toggle: {exc.args[0]}"}), 400
+        return jsonify(result)
+
+
 @api.post("/quote/<quote_number>/generate")
 def generate_outputs(quote_number: str):
     with session_scope() as session:
@@ -88,42 +198,206 @@ def generate_outputs(quote_number: str):
         return jsonify({k: str(v) if v else None for k, v in result.items()})
 
 
+@api.post("/reprice")
+def reprice_quotes():
+    payload = request.json or {}
+    try:
+        margin = None if payload.get("margin") is None else float(payload["margin"])
+        chunk_size = int(payload.get("chunk_size", DEFAULT_CHUNK_SIZE))
+        workers = None if payload.get("workers") is None else int(payload["workers"])
+    except (TypeError, ValueError):
+        return jsonify({"error": "margin, chunk_size and workers must be numbers"}), 400
+    with session_scope() as session:
+        try:
+            report = reprice_all(session, margin=margin, chunk_size=chunk_size, workers=workers)
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        return jsonify(report.to_dict())
+
+
+@api.post("/quote/compute")
+def compute_quote_route():
+    payload = request.get_json(silent=True) or {}
+    try:
+        result = compute_quote(payload)
+    except PricingValidationError as exc:
+        response = jsonify({"error": str(exc), "field": exc.field})
+        return _with_catalog_header(response), 400
+    return _with_catalog_header(jsonify(result))
+
+
+@api.get("/cache/stats")
+def cache_stats():
+    return jsonify(
+        {
+            "rollup": ROLLUP_SNAPSHOTS.stats().to_dict(),
+            "compute": COMPUTE_CACHE.stats().to_dict(),
+            "formula": compile_formula.cache_info()._asdict(),
+        }
+    )
+
+
 def register_api(app: Flask) -> None:
     app.register_blueprint(api)
-def _with_catalog_header(response):
-    response.headers["X-Catalog-Version"] = CATALOG_VERSION
+def _with_catalog_header(response, catalog=None):
+    response.headers["X-Catalog-Version"] = (catalog or current_catalog()).version
     return response
 
 
+@api.post("/catalog/reload")
+def catalog_reload():
+    try:
+        catalog = reload_catalog(current_app.config.get("CATALOG_PATH"), current_app.config.get("CATALOG_SPEC_PATH"))
+    except (OSError, ValueError, KeyError) as exc:
+        return jsonify({"error": f"catalog reload failed: {exc}"}), 500
+    response = jsonify({"version": catalog.version, "updatedAt": catalog.updated_at})
+    return _with_catalog_header(response, catalog)
+
+
+def _serialized_response(serialized: SerializedPayload, catalog):
+    """Serve pre-serialized JSON, compressed if accepted, with ETag revalidation."""
+    encoding = next(
+        (name for name in ("br", "gzip") if name in serialized.encodings and request.accept_encodings[name]),
+        None,
+    )
+    etag = serialized.etag_for(encoding)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(serialized.encodings[encoding] if encoding else serialized.body, mimetype="application/json")
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    response.vary.add("Accept-Encoding")
+    return _with_catalog_header(response, catalog)
+
+
 @api.get("/dropdowns")
 def dropdown_catalog():
-    response = jsonify(catalog_payload())
-    return _with_catalog_header(response)
+    catalog = current_catalog()
+    return _serialized_response(catalog.payload_serialized, catalog)
 
 
 @api.get("/dropdowns/<dropdown_id>")
 def dropdown_detail(dropdown_id: str):
-    payload = dropdown_payload(dropdown_id)
-    if payload is None:
-        return _with_catalog_header(jsonify({"error": "not found"})), 404
-    response = jsonify(payload)
-    return _with_catalog_header(response)
+    catalog = current_catalog()
+    serialized = catalog.dropdown_serialized.get(dropdown_id)
+    if serialized is None:
+        return _with_catalog_header(jsonify({"error": "not found"}), catalog), 404
+    return _serialized_response(serialized, catalog)
+
+
+def _stale_catalog(catalog):
+    client_version = request.headers.get("X-Catalog-Version")
+    if client_version and client_version != catalog.version:
+        response = jsonify({"error": "stale catalog", "version": catalog.version})
+        return _with_catalog_header(response, catalog), 409
+    return None
 
 
 @api.post("/price")
 def price_quote():
-    client_version = request.headers.get("X-Catalog-Version")
-    if client_version and client_version != CATALOG_VERSION:
-        response = jsonify({"error": "stale catalog", "version": CATALOG_VERSION})
-        return _with_catalog_header(response), 409
+    catalog = current_catalog()
+    stale = _stale_catalog(catalog)
+    if stale is not None:
+        return stale
 
     payload = request.json or {}
     try:
-        inputs = validate_inputs(payload)
+        inputs = validate_inputs(payload, catalog)
     except PricingValidationError as exc:
-        response = jsonify({"error": str(exc), "field": exc.field})
-        return _with_catalog_header(response), 400
+        response = jsonify({"error": str(exc), "field": exc.field, "errors": exc.errors})
+        return _with_catalog_header(response, catalog), 400
 
-    pricing = compute_pricing(inputs)
+    pricing = compute_pricing(inputs, catalog=catalog)
     response = jsonify(pricing)
-    return _with_catalog_header(response)
+    response.headers["X-Configuration-Key"] = configuration_key(inputs, catalog)
+    return _with_catalog_header(response, catalog)
+
+
+@api.post("/price/delta")
+def price_quote_delta():
+    catalog = current_catalog()
+    stale = _stale_catalog(catalog)
+    if stale is not None:
+        return stale
+
+    payload = request.get_json(silent=True) or {}
+    try:
+        if not isinstance(payload, dict):
+            raise PricingValidationError("expected a JSON object", None)
+        if payload.get("base_key") is not None:
+            base = configuration_from_key(payload["base_key"], catalog)
+        else:
+            base = validate_inputs({"inputs": payload.get("base")}, catalog)
+        changes = payload.get("changes") or {}
+        if not isinstance(changes, dict):
+            raise PricingValidationError("changes must be an object", "changes")
+        delta = price_delta(base, changes, catalog)
+    except PricingValidationError as exc:
+        response = jsonify({"error": str(exc), "field": exc.field, "errors": exc.errors})
+        return _with_catalog_header(response, catalog), 400
+    return _with_catalog_header(jsonify(delta), catalog)
+
+
+MAX_PRICE_BATCH = 10_000
+
+
+def _batch_payloads() -> list:
+    """Read a JSON array (or ``{"items": [...]}``) or NDJSON request body."""
+    if request.mimetype in ("application/x-ndjson", "application/jsonl"):
+        payloads = []
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                payloads.append(json.loads(line))
+            except ValueError:
+                payloads.append(None)
+        return payloads
+    body = request.get_json(silent=True)
+    if isinstance(body, dict):
+        body = body.get("items")
+    if not isinstance(body, list):
+        raise ValueError("expected a JSON array of inputs or NDJSON")
+    return body
+
+
+@api.post("/price/batch")
+def price_quote_batch():
+    catalog = current_catalog()
+    stale = _stale_catalog(catalog)
+    if stale is not None:
+        return stale
+    try:
+        payloads = _batch_payloads()
+    except ValueError as exc:
+        return _with_catalog_header(jsonify({"error": str(exc)}), catalog), 400
+    if len(payloads) > MAX_PRICE_BATCH:
+        response = jsonify({"error": f"at most {MAX_PRICE_BATCH} items per batch"})
+        return _with_catalog_header(response, catalog), 413
+    results = price_batch(payloads, catalog)
+    response = jsonify({"version": catalog.version, "count": len(results), "results": results})
+    return _with_catalog_header(response, catalog)
+
+
+@api.post("/search")
+def search_quote_configurations():
+    catalog = current_catalog()
+    stale = _stale_catalog(catalog)
+    if stale is not None:
+        return stale
+    payload = request.get_json(silent=True) or {}
+    try:
+        if not isinstance(payload, dict):
+            raise PricingValidationError("expected a JSON object", None)
+        total, results = search_configurations(payload, catalog)
+    except PricingValidationError as exc:
+        response = jsonify({"error": str(exc), "field": exc.field})
+        return _with_catalog_header(response, catalog), 400
+    # One JSON object per line, serialized as the client reads them.
+    lines = (json.dumps(result, separators=(",", ":")) + "\n" for result in results)
+    response = Response(lines, mimetype="application/x-ndjson")
+    response.headers["X-Total-Matches"] = str(total)
+    return _with_catalog_header(response, catalog)
@@ -1,11 +1,17 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
-from typing import Dict, Iterable, List, Tuple
+from array import array
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import AbstractSet, Callable, Dict, Iterable, Iterator, List, Mapping, Set, Tuple
 
+import numpy as np
 from sqlalchemy.orm import Session
 
-from .formula import FormulaEngine
+from .cache import CacheStats, LRUCache
+from .formula import CompiledFormula, compile_formula
+from .graph import DependencyGraph
+from .money import NUMERIC_FIXED, NUMERIC_FLOAT, fixed_mul, from_fixed, to_fixed
 from .models import CostingItem, CostingSummary, Pricing, RDSInput
 
 SummaryValues = Dict[str, float]
@@ -36,6 +42,22 @@ SUMMARY_ROLLUP_ORDER = [
     "J47",
 ]
 
+SUBTOTAL_FORMULA = "SUM(J4:J10,J14,J17,J24,J31)"
+SELL_PRICE_FORMULA = "base_total*(1+margin)"
+
+# Derived cells evaluated on top of the item cells, keyed by output name.
+DERIVED_FORMULAS = {
+    "base_total": SUBTOTAL_FORMULA,
+    "sell_price": SELL_PRICE_FORMULA,
+}
+
+# ``options_total`` is not a formula: it is the toggle-gated sum of the option
+# rows, read straight from the ``toggle_mask`` cell. It is reported alongside
+# the rollup but does not feed the persisted ``sell_price`` (the workbook's
+# ``subtotal*(1+margin)``); ``what_if`` prices other masks relative to it.
+OPTIONS_TOTAL = "options_total"
+TOGGLE_MASK = "toggle_mask"
+
 TOGGLE_CELLS = {
     "H18": "infeed_primary",
     "H19": "infeed_secondary",
@@ -50,69 +72,541 @@ TOGGLE_CELLS = {
     "H47": "misc_freight",
 }
 
+# Bit ``i`` of a toggle mask is ``TOGGLE_BITS[i]``; it gates the J cell on the
+# same row (``TOGGLE_ROWS[i]``).
+TOGGLE_BITS: Tuple[str, ...] = tuple(TOGGLE_CELLS)
+TOGGLE_ROWS: Tuple[str, ...] = tuple(f"J{cell[1:]}" for cell in TOGGLE_BITS)
+ALL_TOGGLES = (1 << len(TOGGLE_BITS)) - 1
+_TOGGLE_ROW_SET = frozenset(TOGGLE_ROWS)
+
+
+def toggle_mask(toggles: Mapping[str, int]) -> int:
+    """Pack a ``{cell: 0/1}`` toggle map into a bitmask."""
+    mask = 0
+    for bit, cell in enumerate(TOGGLE_BITS):
+        if toggles.get(cell):
+            mask |= 1 << bit
+    return mask
+
+
+def toggles_from_mask(mask: int) -> ToggleMap:
+    """Unpack a bitmask into the ``{cell: 0/1}`` map stored on the summary."""
+    return {cell: (mask >> bit) & 1 for bit, cell in enumerate(TOGGLE_BITS)}
+
+
+@lru_cache(maxsize=1)
+def _toggle_bit_matrix():
+    """``(2**bits, bits)`` 0/1 matrix; row ``m`` holds the bits of mask ``m``."""
+    masks = np.arange(ALL_TOGGLES + 1)[:, None]
+    return ((masks >> np.arange(len(TOGGLE_BITS))) & 1).astype(float)
+
+
+GOAL_SELL_PRICE = "sell_price"
+GOAL_PROFIT = "profit"
+GOALS = (GOAL_SELL_PRICE, GOAL_PROFIT)
+
+# Search bracket for margins when the rollup is not linear in margin.
+MARGIN_BOUNDS = (-0.99, 10.0)
+
+
+def solve_linear_margins(at_zero, at_one, targets) -> "np.ndarray":
+    """Closed-form inverse of a rollup that is linear in margin.
+
+    With ``f(m) = f(0) + m * (f(1) - f(0))`` -- e.g. ``subtotal * (1 + m)`` --
+    the margin reaching each target is ``(target - f(0)) / (f(1) - f(0))``.
+    Rows with a flat curve (zero subtotal) come back as NaN.
+    """
+    at_zero = np.asarray(at_zero, dtype=float)
+    slope = np.asarray(at_one, dtype=float) - at_zero
+    targets = np.asarray(targets, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(slope != 0, (targets - at_zero) / slope, np.nan)
+
+
+def solve_margin(
+    curve: Callable[["np.ndarray"], "np.ndarray"],
+    target: float,
+    bounds: Tuple[float, float] = MARGIN_BOUNDS,
+    points: int = 65,
+    tol: float = 1e-10,
+    max_rounds: int = 40,
+) -> float:
+    """Solve ``curve(margin) == target`` for a non-linear rollup.
+
+    Vectorised multisection: each round evaluates ``points`` margins across the
+    bracket in one ``curve`` call and keeps the first sub-interval where the
+    residual changes sign. Returns NaN when ``bounds`` do not bracket a root.
+    """
+    low, high = bounds
+    for _ in range(max_rounds):
+        grid = np.linspace(low, high, points)
+        residual = np.asarray(curve(grid), dtype=float) - target
+        exact = np.flatnonzero(residual == 0)
+        if exact.size:
+            return float(grid[exact[0]])
+        crossings = np.flatnonzero(np.signbit(residual[:-1]) != np.signbit(residual[1:]))
+        if not crossings.size:
+            return float("nan")
+        low, high = grid[crossings[0]], grid[crossings[0] + 1]
+        if high - low <= tol:
+            break
+    return float((low + high) / 2)
+
+
+# Layout of ``RollupResult.values``: the rollup cells, then the derived totals.
+ROLLUP_TOTAL_KEYS: Tuple[str, ...] = ("base_total", OPTIONS_TOTAL, "margin", "sell_price")
+RESULT_KEYS: Tuple[str, ...] = (*SUMMARY_ROLLUP_ORDER, *ROLLUP_TOTAL_KEYS)
+RESULT_INDEX: Dict[str, int] = {key: idx for idx, key in enumerate(RESULT_KEYS)}
+
+
+class SummaryVector(Mapping[str, float]):
+    """Read-only ``{key: value}`` view over a ``RollupResult`` value array."""
+
+    __slots__ = ("_values",)
+
+    def __init__(self, values: array):
+        self._values = values
+
+    def __getitem__(self, key: str) -> float:
+        return self._values[RESULT_INDEX[key]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(RESULT_KEYS)
+
+    def __len__(self) -> int:
+        return len(RESULT_KEYS)
+
+    def to_dict(self) -> SummaryValues:
+        """Plain dict copy for JSON columns and API payloads."""
+        return dict(zip(RESULT_KEYS, self._values))
+
 
-@dataclass
 class RollupResult:
-    summary_values: SummaryValues
+    """Rollup totals packed into one ``array('d')`` laid out as ``RESULT_KEYS``.
+
+    ``summary_values``, ``toggles`` and ``details`` are views built on access,
+    so a result costs one small array plus a few slots.
+    """
+
+    __slots__ = ("values", "margin", "toggle_mask", "changed")
+
+    def __init__(self, values: array, margin: float, toggle_mask: int = 0, changed: AbstractSet[str] = frozenset()):
+        self.values = values
+        self.margin = margin
+        self.toggle_mask = toggle_mask
+        self.changed = changed
+
+    @property
+    def summary_values(self) -> SummaryVector:
+        return SummaryVector(self.values)
+
+    @property
+    def toggles(self) -> ToggleMap:
+        return toggles_from_mask(self.toggle_mask)
+
+    @property
+    def details(self) -> Dict[str, Dict[str, float]]:
+        return {key: {key: self.values[idx]} for idx, key in enumerate(SUMMARY_ROLLUP_ORDER)}
+
+
+@dataclass
+class ToggleScenarios:
+    """Totals for every toggle combination; arrays are indexed by mask."""
+
+    current_mask: int
+    base_total: float
     margin: float
-    toggles: ToggleMap
-    details: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    options_total: "np.ndarray"
+    sell_price: "np.ndarray"
+
+    def without(self, *cells: str) -> float:
+        """Sell price of the current configuration with ``cells`` switched off."""
+        for cell in cells:
+            if cell not in TOGGLE_CELLS:
+                raise KeyError(cell)
+        mask = self.current_mask & ~toggle_mask({cell: 1 for cell in cells})
+        return float(self.sell_price[mask])
+
+    def delta(self, *cells: str) -> float:
+        """Change from the current sell price when ``cells`` are switched off."""
+        return self.without(*cells) - float(self.sell_price[self.current_mask])
+
+
+ROLLUP_CACHE_SIZE = 4096
+
+
+class RollupSnapshots:
+    """In-process LRU of rollup results.
+
+    Keys are ``(summary id, items fingerprint, margin, toggle mask)``. The
+    fingerprint is the content of the summary's items as loaded, so edits
+    from any process or script -- or direct SQL updates -- miss the cache
+    instead of serving stale totals; superseded snapshots age out of the LRU.
+    """
+
+    def __init__(self, maxsize: int = ROLLUP_CACHE_SIZE):
+        self._cache: LRUCache[RollupResult] = LRUCache(maxsize)
+
+    def _key(self, summary: CostingSummary, margin: float) -> tuple | None:
+        if summary.id is None or margin is None:
+            return None
+        return (summary.id, items_fingerprint(summary.items), float(margin), toggle_mask(summary.toggles or {}))
+
+    def get(self, summary: CostingSummary, margin: float) -> RollupResult | None:
+        key = self._key(summary, margin)
+        return None if key is None else self._cache.get(key)
+
+    def put(self, summary: CostingSummary, margin: float, result: RollupResult) -> None:
+        key = self._key(summary, margin)
+        if key is not None:
+            self._cache.put(key, result)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> CacheStats:
+        return self._cache.stats()
+
+
+def items_fingerprint(items: Iterable[CostingItem]) -> Tuple[tuple, ...]:
+    """Hashable content of costing items: everything the CEL reads from them.
+
+    Only the metadata keys the layer interprets are included, read as plain
+    values, so building the key costs a few attribute reads per item.
+    """
+    fingerprint = []
+    for item in items:
+        metadata = item.metadata_json or {}
+        inputs = metadata.get("inputs")
+        fingerprint.append(
+            (
+                item.id,
+                item.code,
+                item.quantity,
+                item.unit_cost,
+                metadata.get("summary_cell"),
+                metadata.get("formula"),
+                tuple(inputs) if inputs else None,
+            )
+        )
+    return tuple(fingerprint)
+
+
+ROLLUP_SNAPSHOTS = RollupSnapshots()
+
+
+# Cells an item can only feed through an explicit ``summary_cell``: the rollup
+# rows and the layer's own cells.
+_RESERVED_CELLS = frozenset((*SUMMARY_ROLLUP_ORDER, *DERIVED_FORMULAS, OPTIONS_TOTAL, TOGGLE_MASK, "margin"))
+
+
+def _item_key(item: CostingItem) -> str | None:
+    """Cell an item feeds: its ``summary_cell``, else its code as a formula input.
+
+    A bare code never names a reserved cell, so an item coded ``J4`` without a
+    ``summary_cell`` stays out of the rollup as it did before formulas.
+    """
+    summary_cell = (item.metadata_json or {}).get("summary_cell")
+    if summary_cell:
+        return summary_cell
+    code = item.code
+    return code if code and code not in _RESERVED_CELLS else None
 
 
 class CostingEmulationLayer:
-    """Implements the behaviour of the missing Costing workbook."""
+    """Implements the behaviour of the missing Costing workbook.
+
+    Cells are evaluated through a dependency graph built from the summary
+    rollup, the subtotal formula and any ``metadata_json["formula"]`` entries.
+    The layer can be kept alive across edits: ``set_cell``/``update_item`` mark
+    cells dirty and the next ``recompute`` only re-evaluates their dependents.
+
+    ``session`` may be ``None`` for detached summaries (e.g. in a worker
+    process); ``recompute`` then only updates the in-memory summary.
 
-    def __init__(self, session: Session, summary: CostingSummary):
+    With ``numeric="fixed"`` the context holds integer fixed-point units
+    (``money.to_fixed``): item values and formulas are exact, and values are
+    only converted back to floats in the returned totals. The margin is a
+    multiplier, not money: cells downstream of it are evaluated with the
+    unrounded margin and rounded to fixed-point once, on output.
+    """
+
+    def __init__(self, session: Session | None, summary: CostingSummary, numeric: str = NUMERIC_FLOAT):
+        if numeric not in (NUMERIC_FLOAT, NUMERIC_FIXED):
+            raise ValueError(f"Unsupported numeric mode: {numeric}")
         self.session = session
         self.summary = summary
+        self.numeric = numeric
+        self._fixed = numeric == NUMERIC_FIXED
+        self._zero = 0 if self._fixed else 0.0
+        self.formulas: Dict[str, CompiledFormula] = {}
+        self._margin = summary.margin or 0.0
         self.context = self._build_context()
-        self.engine = FormulaEngine(self.context)
+        self.graph = self._build_graph()
+        self._margin_cells = frozenset(self.graph.affected(["margin"]))
+        self._dirty: Set[str] = set(self.graph.order)
+        self._contributions: Tuple[float, ...] | None = None
+        self._contribution_vector = None
 
     def _build_context(self) -> SummaryValues:
         context: SummaryValues = {}
         for item in self.summary.items:
-            key = item.metadata_json.get("summary_cell")
+            key = _item_key(item)
             if key:
-                context[key] = item.quantity * item.unit_cost
+                self._load_item(context, key, item)
         # Ensure missing keys exist with zero
         for key in SUMMARY_ROLLUP_ORDER:
-            context.setdefault(key, 0.0)
+            context.setdefault(key, self._zero)
+        context["margin"] = self._to_cell(self.summary.margin or 0.0)
+        context[TOGGLE_MASK] = toggle_mask(self.summary.toggles or {})
         return context
 
+    def _to_cell(self, value: float) -> float:
+        return to_fixed(value) if self._fixed else value
+
+    def _from_cell(self, value: float) -> float:
+        return from_fixed(value) if self._fixed else value
+
+    def _load_item(self, context: SummaryValues, key: str, item: CostingItem) -> None:
+        formula = (item.metadata_json or {}).get("formula")
+        if formula:
+            self.formulas[key] = compile_formula(formula)
+            context.setdefault(key, self._zero)
+        else:
+            self.formulas.pop(key, None)
+            if self._fixed:
+                context[key] = fixed_mul(to_fixed(item.quantity), to_fixed(item.unit_cost))
+            else:
+                context[key] = item.quantity * item.unit_cost
+
+    def _build_graph(self) -> DependencyGraph:
+        dependencies: Dict[str, Tuple[str, ...]] = {key: () for key in self.context}
+        for key, compiled in self.formulas.items():
+            dependencies[key] = compiled.refs
+        for item in self.summary.items:
+            key = _item_key(item)
+            inputs = (item.metadata_json or {}).get("inputs")
+            if key in self.formulas and inputs:
+                dependencies[key] = tuple(dict.fromkeys((*dependencies[key], *inputs)))
+        dependencies[OPTIONS_TOTAL] = (*TOGGLE_ROWS, TOGGLE_MASK)
+        for key, formula in DERIVED_FORMULAS.items():
+            dependencies[key] = compile_formula(formula).refs
+        return DependencyGraph(dependencies)
+
+    def contributions(self) -> Tuple[float, ...]:
+        """Per-bit option contributions: the J cell gated by each toggle bit.
+
+        Built once per item set and rebuilt only after a toggle row changes.
+        """
+        if self._contributions is None:
+            self._contributions = tuple(self.context.get(row, self._zero) for row in TOGGLE_ROWS)
+        return self._contributions
+
+    def _contribution_floats(self) -> "np.ndarray":
+        if self._contribution_vector is None:
+            self._contribution_vector = np.array([self._from_cell(value) for value in self.contributions()], dtype=float)
+        return self._contribution_vector
+
+    def _touch(self, cell: str) -> None:
+        if cell in _TOGGLE_ROW_SET:
+            self._contributions = self._contribution_vector = None
+
+    def _options_total(self, mask: int) -> float:
+        return sum((value for bit, value in enumerate(self.contributions()) if mask >> bit & 1), self._zero)
+
+    def _compiled(self, cell: str) -> CompiledFormula | None:
+        compiled = self.formulas.get(cell)
+        if compiled is None and cell in DERIVED_FORMULAS:
+            compiled = compile_formula(DERIVED_FORMULAS[cell])
+        return compiled
+
+    def _evaluate_cell(self, cell: str) -> float | None:
+        if cell == OPTIONS_TOTAL:
+            return self._options_total(self.context[TOGGLE_MASK])
+        compiled = self._compiled(cell)
+        if compiled is None:
+            return None
+        if self._fixed:
+            if cell in self._margin_cells:
+                return to_fixed(compiled.evaluate(self._float_refs(compiled)).value)
+            return compiled.evaluate_fixed(self.context).value
+        return compiled.evaluate(self.context).value
+
+    def _float_refs(self, compiled: CompiledFormula) -> SummaryValues:
+        """Float context for ``compiled``'s refs with the unrounded margin."""
+        refs: SummaryValues = {}
+        for ref in compiled.refs:
+            if ref == "margin":
+                refs[ref] = self._margin
+            elif ref in self.context:
+                value = self.context[ref]
+                refs[ref] = value if ref == TOGGLE_MASK else from_fixed(value)
+        return refs
+
+    def set_cell(self, cell: str, value: float) -> None:
+        """Overwrite an input cell and mark it dirty for the next recompute."""
+        stale = cell == "margin" and value != self._margin
+        if cell == "margin":
+            self._margin = value
+        value = self._to_cell(value)
+        if stale or self.context.get(cell) != value:
+            self.context[cell] = value
+            self._dirty.add(cell)
+            self._touch(cell)
+
+    def set_toggle_mask(self, mask: int) -> None:
+        """Replace the toggle bitmask and mark the options total dirty."""
+        if not 0 <= mask <= ALL_TOGGLES:
+            raise ValueError(f"Toggle mask out of range: {mask}")
+        if self.context.get(TOGGLE_MASK) != mask:
+            self.context[TOGGLE_MASK] = mask
+            self._dirty.add(TOGGLE_MASK)
+
+    def update_item(self, item: CostingItem) -> None:
+        """Re-read a (possibly edited) costing item and mark its cell dirty."""
+        key = _item_key(item)
+        if not key:
+            return
+        had_formula = self.formulas.get(key)
+        self._load_item(self.context, key, item)
+        if self.formulas.get(key) is not had_formula or key not in self.graph:
+            self.graph = self._build_graph()
+            self._margin_cells = frozenset(self.graph.affected(["margin"]))
+        self._dirty.add(key)
+        self._touch(key)
+
+    def _propagate(self) -> Set[str]:
+        changed = {cell for cell in self._dirty if cell in self.context}
+        for cell in self.graph.affected(self._dirty):
+            value = self._evaluate_cell(cell)
+            if value is None:
+                continue
+            if cell in self._dirty or self.context.get(cell) != value:
+                changed.add(cell)
+                self._touch(cell)
+            self.context[cell] = value
+        self._dirty.clear()
+        return changed
+
+    def _refresh(self) -> Set[str]:
+        """Pick up toggle edits made on the summary and propagate dirty cells."""
+        self.set_toggle_mask(toggle_mask(self.summary.toggles or {}))
+        return self._propagate()
+
     def recompute(self, margin: float | None = None) -> RollupResult:
+        """Re-evaluate dirty cells and return the rollup with the changed cells."""
         if margin is None:
             margin = self.summary.margin
         else:
             self.summary.margin = margin
+        self.set_cell("margin", margin)
+        changed = self._refresh()
 
-        totals: SummaryValues = {}
-        details: Dict[str, Dict[str, float]] = {}
-        for key in SUMMARY_ROLLUP_ORDER:
-            totals[key] = self.context.get(key, 0.0)
-            details[key] = {key: totals[key]}
+        values = array("d", (self._from_cell(self.context.get(key, self._zero)) for key in SUMMARY_ROLLUP_ORDER))
+        values.append(self._from_cell(self.context["base_total"]))
+        values.append(self._from_cell(self.context[OPTIONS_TOTAL]))
+        values.append(margin or 0.0)
+        values.append(self._from_cell(self.context["sell_price"]))
+        result = RollupResult(values, margin, self.context[TOGGLE_MASK], changed)
+
+        self.summary.totals = result.summary_values.to_dict()
+        toggles = result.toggles
+        if self.summary.toggles != toggles:
+            self.summary.toggles = toggles
+        if self.session is not None:
+            self.session.add(self.summary)
+        return result
+
+    def what_if(self, margin: float | None = None) -> ToggleScenarios:
+        """Evaluate all ``2**len(TOGGLE_BITS)`` toggle combinations at once.
+
+        Nothing is persisted: the current cells are brought up to date and the
+        options total for every mask is a single matrix-vector product over the
+        per-bit contributions. The current mask is priced at the rollup's own
+        ``sell_price`` (what ``recompute`` persists); every other mask is that
+        price plus its options-total difference marked up by ``margin``.
+        """
+        if margin is None:
+            margin = self.summary.margin or 0.0
+        batch = self._margin_batch([margin])
+        current_mask = self.context[TOGGLE_MASK]
+        options_total = _toggle_bit_matrix() @ self._contribution_floats()
+        sell_price = float(batch["sell_price"][0]) + (options_total - options_total[current_mask]) * (1 + margin)
+        return ToggleScenarios(
+            current_mask=current_mask,
+            base_total=float(batch["base_total"][0]),
+            margin=margin,
+            options_total=options_total,
+            sell_price=sell_price,
+        )
+
+    def _margin_batch(self, margins: Iterable[float]) -> Dict[str, "np.ndarray"]:
+        """Evaluate every cell downstream of ``margin`` for a vector of margins.
+
+        The current context becomes one row per margin; only the cells the
+        dependency graph reaches from ``margin`` are re-evaluated, each with a
+        single batch call. Nothing is written back to the context.
+        """
+        self._refresh()
+        margins = np.asarray(list(margins), dtype=float)
+        columns = {key: idx for idx, key in enumerate(self.context)}
+        row = [value if key == TOGGLE_MASK else self._from_cell(value) for key, value in self.context.items()]
+        matrix = np.tile(np.asarray(row, dtype=float), (margins.size, 1))
+        matrix[:, columns["margin"]] = margins
+        for cell in self.graph.affected(["margin"]):
+            if cell == OPTIONS_TOTAL:
+                mask = self.context[TOGGLE_MASK]
+                bits = np.array([(mask >> bit) & 1 for bit in range(len(TOGGLE_BITS))], dtype=float)
+                matrix[:, columns[cell]] = matrix[:, [columns[row] for row in TOGGLE_ROWS]] @ bits
+                continue
+            compiled = self._compiled(cell)
+            if compiled is not None:
+                matrix[:, columns[cell]] = compiled.evaluate_batch(matrix, columns)
+        return {key: matrix[:, columns[key]] for key in ("base_total", OPTIONS_TOTAL, "sell_price")}
+
+    def margin_sweep(self, margins: Iterable[float]) -> "np.ndarray":
+        """Sell price at each margin, evaluated as one batch; nothing is persisted."""
+        return self._margin_batch(margins)["sell_price"]
 
-        subtotal_formula = "SUM(J4:J10,J14,J17,J24,J31)"
-        subtotal = self.engine.eval(subtotal_formula).value
-        totals["base_total"] = subtotal
-        totals["margin"] = margin
-        totals["sell_price"] = subtotal * (1 + margin)
+    @property
+    def margin_is_linear(self) -> bool:
+        """True when ``margin`` only feeds ``sell_price`` (the stock rollup)."""
+        return self.graph.affected(["margin"]) == ["margin", "sell_price"]
 
-        toggles = {cell: int(self.summary.toggles.get(cell, 0)) for cell in TOGGLE_CELLS}
+    def goal_curve(self, goal: str = GOAL_SELL_PRICE) -> Callable[["np.ndarray"], "np.ndarray"]:
+        """Return ``margins -> sell price`` (or gross profit) as a batch function."""
+        if goal not in GOALS:
+            raise ValueError(f"Unsupported goal: {goal}")
 
-        self.summary.totals = totals
-        self.summary.toggles = toggles
-        self.session.add(self.summary)
-        return RollupResult(summary_values=totals, margin=margin, toggles=toggles, details=details)
+        def curve(margins: "np.ndarray") -> "np.ndarray":
+            batch = self._margin_batch(margins)
+            if goal == GOAL_PROFIT:
+                return batch["sell_price"] - batch["base_total"]
+            return batch["sell_price"]
+
+        return curve
+
+    def goal_seek(self, target: float, goal: str = GOAL_SELL_PRICE) -> float:
+        """Margin at which the sell price (or gross profit) equals ``target``.
+
+        Uses the closed-form inverse while the rollup is linear in margin and
+        falls back to ``solve_margin`` otherwise. NaN when unreachable.
+        """
+        curve = self.goal_curve(goal)
+        if self.margin_is_linear:
+            at_zero, at_one = curve([0.0, 1.0])
+            return float(solve_linear_margins(at_zero, at_one, target))
+        return solve_margin(curve, target)
 
     @classmethod
     def set_toggle(cls, summary: CostingSummary, cell: str, value: int) -> None:
-        toggles = summary.toggles or {}
+        toggles = dict(summary.toggles or {})
         toggles[cell] = value
         summary.toggles = toggles
 
     @classmethod
     def force_enable_all(cls, summary: CostingSummary) -> None:
-        summary.toggles = {cell: 1 for cell in TOGGLE_CELLS}
+        summary.toggles = toggles_from_mask(ALL_TOGGLES)
 
     @staticmethod
     def base_cost(totals: SummaryValues) -> float:
@@ -134,6 +628,21 @@ class CostingEmulationLayer:
         return [(key, self.summary.totals.get(key, 0.0)) for key in SUMMARY_ROLLUP_ORDER]
 
 
+def _placeholder_items(summary: CostingSummary) -> List[CostingItem]:
+    """One zero-cost placeholder item per required summary cell."""
+    return [
+        CostingItem(
+            summary=summary,
+            code=key,
+            description=f"Placeholder for {key}",
+            quantity=1.0,
+            unit_cost=0.0,
+            metadata_json={"summary_cell": key},
+        )
+        for key in SUMMARY_ROLLUP_ORDER
+    ]
+
+
 def ensure_costing_summary(session: Session, rds_input: RDSInput) -> CostingSummary:
     summary = rds_input.costing_summary
     if summary is None:
@@ -141,17 +650,18 @@ def ensure_costing_summary(session: Session, rds_input: RDSInput) -> CostingSumm
         session.add(summary)
         session.flush()
         # Create placeholder items for required cells
-        items: List[CostingItem] = []
-        for key in SUMMARY_ROLLUP_ORDER:
-            items.append(
-                CostingItem(
-                    summary=summary,
-                    code=key,
-                    description=f"Placeholder for {key}",
-                    quantity=1.0,
-                    unit_cost=0.0,
-                    metadata_json={"summary_cell": key},
-                )
-            )
-        session.add_all(items)
+        session.add_all(_placeholder_items(summary))
+    return summary
+
+
+def costing_summary_for_read(rds_input: RDSInput) -> CostingSummary:
+    """The quote's summary, or the default ``ensure_costing_summary`` would create.
+
+    The default is transient: it is not linked to ``rds_input`` or added to a
+    session, so read-only paths price it without writing any rows.
+    """
+    summary = rds_input.costing_summary
+    if summary is None:
+        summary = CostingSummary(margin=0.2, toggles={}, totals={})
+        _placeholder_items(summary)
     return summary
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Dict, Mapping, Tuple
+
+from .cache import LRUCache
+from .cel import ALL_TOGGLES, CostingEmulationLayer, toggles_from_mask
+from .models import CostingItem, CostingSummary
+from .system_options import Catalog, PricingValidationError, compute_pricing, current_catalog
+
+COMPUTE_CACHE_SIZE = 8192
+
+# Harness payload key -> (catalog field, {payload value: catalog option}).
+# ``None`` as the value map means the payload value is used as-is.
+PAYLOAD_FIELDS: Dict[str, Tuple[str, Mapping[str, str] | None]] = {
+    "spares": ("sys.spare_saw_blades_qty", None),
+    "guard": ("sys.guarding", {"Standard": "Standard", "Tall": "Tall", "TallNet": "Tall w/ Netting"}),
+    "usl": (
+        "sys.feeding_funneling",
+        {"None": "No", "Front": "Front USL", "Side": "Side USL", "BadgerSide": "Side Badger"},
+    ),
+    "xfmr": ("sys.transformer", {"None": "None", "Canada": "Canada", "StepUp": "Step Up"}),
+    "train": ("sys.training_lang", {"EN": "English", "EN+ES": "English & Spanish"}),
+}
+
+# Summary cell each catalog option is costed into, as read back into
+# Sheet3!B3:B13 (see ``services.SUMMARY_EXPORT_MAP``).
+OPTION_CELLS: Dict[str, str] = {
+    "opt.spare_parts": "J38",
+    "opt.saw_blades": "J39",
+    "opt.foam_pads": "J40",
+    "opt.guarding_tall": "J32",
+    "opt.guarding_tall_net": "J33",
+    "opt.feeding_front": "J18",
+    "opt.feeding_side_usl": "J19",
+    "opt.feeding_side_badger": "J20",
+    "opt.transformer_canada": "J45",
+    "opt.transformer_step": "J46",
+    "opt.training_spanish": "J47",
+}
+
+# Response sections in the shape ``tests/run_matrix.py`` compares.
+RESPONSE_GROUPS: Dict[str, Tuple[str, ...]] = {
+    "spares": ("J38", "J39", "J40"),
+    "guard": ("J32", "J33"),
+    "infeed": ("J18", "J19", "J20"),
+    "misc": ("J45", "J46", "J47"),
+}
+
+BASE_COST_CELL = "J4"
+
+COMPUTE_CACHE: LRUCache[Dict[str, Any]] = LRUCache(COMPUTE_CACHE_SIZE)
+
+
+def normalise_payload(
+    payload: Mapping[str, Any], catalog: Catalog | None = None
+) -> Tuple[Dict[str, str | int], float]:
+    """Map a compute payload onto validated catalog inputs and a margin.
+
+    Fields the payload omits take the catalog defaults; ``margin`` may be a
+    number, or ``"RESET"``/missing for the catalog default margin.
+    """
+    catalog = catalog or current_catalog()
+    dropdown_map = catalog.dropdown_map
+    inputs: Dict[str, str | int] = {field: dropdown_map[field].default for field in catalog.required_fields}
+    for key, (field, values) in PAYLOAD_FIELDS.items():
+        if key not in payload:
+            continue
+        raw = payload[key]
+        if values is None:
+            if isinstance(raw, bool) or not isinstance(raw, (int, str)):
+                raise PricingValidationError(f"invalid enum for {key}", key)
+            try:
+                value: str | int = int(raw)
+            except ValueError:
+                raise PricingValidationError(f"invalid enum for {key}", key) from None
+        elif isinstance(raw, str) and raw in values:
+            value = values[raw]
+        else:
+            raise PricingValidationError(f"invalid enum for {key}", key)
+        if value not in dropdown_map[field].options:
+            raise PricingValidationError(f"invalid enum for {key}", key)
+        inputs[field] = value
+
+    margin = payload.get("margin")
+    if margin is None or margin == "RESET":
+        return inputs, float(catalog.default_margin)
+    if isinstance(margin, bool):
+        raise PricingValidationError("margin must be a number or RESET", "margin")
+    try:
+        return inputs, float(margin)
+    except (TypeError, ValueError):
+        raise PricingValidationError("margin must be a number or RESET", "margin") from None
+
+
+def cache_key(inputs: Mapping[str, str | int], margin: float, catalog: Catalog | None = None) -> str:
+    """Canonical hash of the pricing inputs, margin and catalog version."""
+    canonical = json.dumps(
+        {"catalog": (catalog or current_catalog()).version, "inputs": dict(inputs), "margin": margin},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def cost_cells(inputs: Mapping[str, str | int], catalog: Catalog) -> Dict[str, float]:
+    """Summary cell -> cost for validated catalog ``inputs``."""
+    pricing = compute_pricing(inputs, catalog=catalog)
+    cells: Dict[str, float] = {BASE_COST_CELL: pricing["base"]}
+    for option in pricing["options"]:
+        cell = OPTION_CELLS[option["id"]]
+        cells[cell] = cells.get(cell, 0.0) + option["extended"]
+    return cells
+
+
+def _compute(inputs: Mapping[str, str | int], margin: float, catalog: Catalog) -> Dict[str, Any]:
+    cells = cost_cells(inputs, catalog)
+    # Detached summary: the CEL rolls it up with every toggle on, nothing is saved.
+    summary = CostingSummary(margin=margin, toggles=toggles_from_mask(ALL_TOGGLES), totals={})
+    summary.items = [
+        CostingItem(code=cell, description=cell, quantity=1.0, unit_cost=value, metadata_json={"summary_cell": cell})
+        for cell, value in cells.items()
+    ]
+    totals = CostingEmulationLayer(None, summary).recompute(margin).summary_values
+
+    result: Dict[str, Any] = {"base_cost": CostingEmulationLayer.base_cost(totals)}
+    for group, keys in RESPONSE_GROUPS.items():
+        result[group] = {key: totals[key] for key in keys}
+    result["options_total"] = totals["options_total"]
+    result["margin"] = margin
+    # Same rollup as a saved quote's ``Pricing.total`` (see ``recompute_costing``).
+    result["sell_price"] = totals["sell_price"]
+    result["catalog_version"] = catalog.version
+    return result
+
+
+def compute_quote(payload: Mapping[str, Any]) -> Dict[str, Any]:
+    """Price a compute payload without touching the database.
+
+    Results are memoised in ``COMPUTE_CACHE`` by ``cache_key``; the quote
+    number and customer are echoed back but do not affect the price.
+    """
+    catalog = current_catalog()
+    inputs, margin = normalise_payload(payload, catalog)
+    key = cache_key(inputs, margin, catalog)
+    result = COMPUTE_CACHE.get(key)
+    if result is None:
+        result = _compute(inputs, margin, catalog)
+        COMPUTE_CACHE.put(key, result)
+    return {"quote_number": payload.get("quote_number"), "customer": payload.get("customer"), **result}
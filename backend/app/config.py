@@ -53,6 +53,8 @@ DEFAULT_CONFIG: AttrDict = AttrDict({
     "SERVER_HOST": os.getenv("SERVER_HOST", "0.0.0.0"),
     "SERVER_PORT": int(os.getenv("SERVER_PORT", "7600")),
     "DEBUG": _env_flag("DEBUG", "false"),
+    "CATALOG_PATH": os.getenv("RDS_CATALOG_PATH"),
+    "CATALOG_SPEC_PATH": os.getenv("RDS_CATALOG_SPEC_PATH"),
     # Nested (modern) ----------------------
     "server": {
         "host": os.getenv("SERVER_HOST", "0.0.0.0"),
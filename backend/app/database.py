@@ -22,8 +22,11 @@ def init_db(app: Flask) -> None:
     _engine = create_engine(database_url, future=True)
     SessionLocal.configure(bind=_engine)
     from . import models  # noqa: F401
+    from .cel import ROLLUP_SNAPSHOTS
 
     models.Base.metadata.create_all(bind=_engine)
+    # Snapshots are keyed by summary id, which is only unique per database.
+    ROLLUP_SNAPSHOTS.clear()
 
 
 @contextmanager
@@ -37,3 +40,15 @@ def session_scope() -> Iterator[Session]:
         raise
     finally:
         session.close()
+
+
+@contextmanager
+def read_scope() -> Iterator[Session]:
+    """Session for read-only handlers: never flushes and always rolls back."""
+    session: Session = SessionLocal()
+    try:
+        with session.no_autoflush:
+            yield session
+    finally:
+        session.rollback()
+        session.close()
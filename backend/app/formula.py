@@ -1,11 +1,42 @@
 from __future__ import annotations
 
+import math
 import operator
 import re
+from array import array
+from bisect import bisect_right
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, Iterable
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Sequence, Set, Tuple, Union
+
+import numpy as np
+
+from .money import (
+    FIXED_SCALE,
+    NUMERIC_FIXED,
+    NUMERIC_FLOAT,
+    fixed_div,
+    fixed_mul,
+    from_fixed,
+    round_fixed,
+    to_fixed,
+)
 
 FormulaContext = Dict[str, float]
+ColumnIndex = Mapping[str, int]
+
+# Compiled formulas are shared by every engine; re-pricing jobs only ever see a
+# handful of distinct formulas so a small bound is plenty.
+FORMULA_CACHE_SIZE = 1024
+# CellIndex block layout: rows further apart than MAX_ROW_GAP start a new
+# block instead of padding the gap, and no block spans more than
+# MAX_BLOCK_ROWS rows.
+MAX_ROW_GAP = 16
+MAX_BLOCK_ROWS = 4096
+
+
+class FormulaError(ValueError):
+    """Raised when a formula cannot be parsed or compiled."""
 
 
 @dataclass
@@ -14,66 +45,978 @@ class FormulaResult:
     details: Dict[str, float]
 
 
-class FormulaEngine:
-    """Very small Excel-like formula interpreter."""
+@dataclass(frozen=True)
+class Number:
+    value: float
+
+
+@dataclass(frozen=True)
+class Ref:
+    key: str
+
+
+@dataclass(frozen=True)
+class Range:
+    start: str
+    end: str
+    keys: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class Call:
+    name: str
+    args: Tuple["Node", ...]
+
+
+@dataclass(frozen=True)
+class Unary:
+    op: str
+    operand: "Node"
+
+
+@dataclass(frozen=True)
+class BinOp:
+    op: str
+    left: "Node"
+    right: "Node"
+
+
+Node = Union[Number, Ref, Range, Call, Unary, BinOp]
+Evaluator = Callable[[Any, Dict[str, float]], Any]
+BatchEvaluator = Callable[[Any, ColumnIndex], Any]
+
+
+# ---------------------------------------------------------------------------
+# Tokenizer and Pratt parser
+# ---------------------------------------------------------------------------
+
+_TOKEN_RE = re.compile(
+    r"""\s*(?:
+        (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<ref>(?:'[^']+'!|[A-Za-z_][\w.]*!)?\$?[A-Za-z_][\w.$]*)
+      | (?P<op><>|<=|>=|[-+*/^=<>(),:])
+    )""",
+    re.VERBOSE,
+)
+
+# Excel precedence, loosest first. Every binary operator is left-associative
+# and negation binds tighter than ``^`` (so ``-2^2`` is 4, as in Excel).
+_INFIX_POWER = {
+    "=": 10, "<>": 10, "<": 10, ">": 10, "<=": 10, ">=": 10,
+    "+": 20, "-": 20,
+    "*": 30, "/": 30,
+    "^": 40,
+}
+_PREFIX_POWER = 50
+
+# name -> (min args, max args or None for variadic)
+_FUNCTIONS: Dict[str, Tuple[int, int | None]] = {
+    "SUM": (1, None),
+    "MIN": (1, None),
+    "MAX": (1, None),
+    "AND": (1, None),
+    "OR": (1, None),
+    "SUMPRODUCT": (1, None),
+    "ROUND": (2, 2),
+    "IF": (2, 3),
+}
+
+_A1_RE = re.compile(r"^(?P<sheet>.*!)?(?P<col>[A-Za-z]{1,3})(?P<row>\d+)$")
+
+
+def _tokenize(formula: str) -> List[Tuple[str, str, int]]:
+    tokens: List[Tuple[str, str, int]] = []
+    pos = 0
+    length = len(formula.rstrip())
+    while pos < length:
+        match = _TOKEN_RE.match(formula, pos)
+        if match is None or match.end() == pos:
+            raise FormulaError(f"Unexpected character {formula[pos:].strip()[0]!r} at {pos} in {formula!r}")
+        kind = match.lastgroup or ""
+        tokens.append((kind, match.group(kind), match.start(kind)))
+        pos = match.end()
+    tokens.append(("end", "", length))
+    return tokens
+
+
+def _normalise_ref(text: str) -> str:
+    sheet, bang, cell = text.rpartition("!")
+    cell = cell.replace("$", "")
+    if not bang:
+        return cell
+    return f"{sheet.strip(chr(39))}!{cell}"
+
+
+def _column_number(letters: str) -> int:
+    number = 0
+    for char in letters.upper():
+        number = number * 26 + ord(char) - 64
+    return number
+
+
+def _column_letters(number: int) -> str:
+    letters = ""
+    while number:
+        number, rem = divmod(number - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def _split_key(key: str) -> Tuple[str, int | None]:
+    prefix = key.rstrip("0123456789")
+    if prefix == key:
+        return key, None
+    return prefix, int(key[len(prefix) :])
+
+
+def _range_keys(start: str, end: str) -> Tuple[str, ...]:
+    """Expand ``start:end`` into cell keys (row-major).
+
+    Keys sharing a prefix (``J4:J10``, ``cost.item1:cost.item5``) only differ
+    by their trailing number; A1-style corners in different columns expand to
+    the full rectangle.
+    """
+    prefix, start_idx = _split_key(start)
+    end_prefix, end_idx = _split_key(end)
+    if prefix == end_prefix and start_idx is not None and end_idx is not None:
+        return tuple(f"{prefix}{idx}" for idx in range(start_idx, end_idx + 1))
+    first = _A1_RE.match(start)
+    last = _A1_RE.match(end)
+    if not (first and last and (first["sheet"] or "") == (last["sheet"] or "")):
+        raise FormulaError(f"Unsupported range {start}:{end}")
+    sheet = first["sheet"] or ""
+    col_lo, col_hi = sorted((_column_number(first["col"]), _column_number(last["col"])))
+    row_lo, row_hi = sorted((int(first["row"]), int(last["row"])))
+    return tuple(
+        f"{sheet}{_column_letters(col)}{row}"
+        for row in range(row_lo, row_hi + 1)
+        for col in range(col_lo, col_hi + 1)
+    )
+
+
+class _Parser:
+    def __init__(self, formula: str):
+        self.formula = formula
+        self.tokens = _tokenize(formula)
+        self.pos = 0
+
+    def peek(self) -> Tuple[str, str, int]:
+        return self.tokens[self.pos]
+
+    def advance(self) -> Tuple[str, str, int]:
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def expect(self, text: str) -> None:
+        kind, value, pos = self.advance()
+        if kind != "op" or value != text:
+            raise FormulaError(f"Expected {text!r} at {pos} in {self.formula!r}")
+
+    def parse(self) -> Node:
+        node = self.expression(0)
+        kind, value, pos = self.peek()
+        if kind != "end":
+            raise FormulaError(f"Unexpected {value!r} at {pos} in {self.formula!r}")
+        return node
+
+    def expression(self, right_power: int) -> Node:
+        node = self.prefix()
+        while True:
+            kind, value, _ = self.peek()
+            power = _INFIX_POWER.get(value, 0) if kind == "op" else 0
+            if power <= right_power:
+                return node
+            self.advance()
+            node = BinOp(value, node, self.expression(power))
+
+    def prefix(self) -> Node:
+        kind, value, pos = self.advance()
+        if kind == "number":
+            return Number(float(value))
+        if kind == "ref":
+            return self.reference(value)
+        if kind == "op" and value == "(":
+            node = self.expression(0)
+            self.expect(")")
+            return node
+        if kind == "op" and value in {"-", "+"}:
+            operand = self.expression(_PREFIX_POWER)
+            return operand if value == "+" else Unary("-", operand)
+        if kind == "end":
+            raise FormulaError(f"Unexpected end of formula {self.formula!r}")
+        raise FormulaError(f"Unexpected {value!r} at {pos} in {self.formula!r}")
+
+    def reference(self, text: str) -> Node:
+        kind, value, _ = self.peek()
+        if kind == "op" and value == "(":
+            self.advance()
+            return self.call(text.upper())
+        if text.upper() in {"TRUE", "FALSE"}:
+            return Number(1.0 if text.upper() == "TRUE" else 0.0)
+        start = _normalise_ref(text)
+        if kind == "op" and value == ":":
+            self.advance()
+            end_kind, end_text, pos = self.advance()
+            if end_kind != "ref":
+                raise FormulaError(f"Expected a cell after ':' at {pos} in {self.formula!r}")
+            end = _normalise_ref(end_text)
+            sheet, bang, _ = start.rpartition("!")
+            if bang and "!" not in end:
+                end = f"{sheet}!{end}"
+            return Range(start, end, _range_keys(start, end))
+        return Ref(start)
+
+    def call(self, name: str) -> Node:
+        if name not in _FUNCTIONS:
+            raise FormulaError(f"Unsupported function {name} in {self.formula!r}")
+        args: List[Node] = []
+        kind, value, _ = self.peek()
+        if not (kind == "op" and value == ")"):
+            while True:
+                args.append(self.expression(0))
+                kind, value, pos = self.advance()
+                if kind == "op" and value == ")":
+                    break
+                if not (kind == "op" and value == ","):
+                    raise FormulaError(f"Expected ',' or ')' at {pos} in {self.formula!r}")
+        else:
+            self.advance()
+        low, high = _FUNCTIONS[name]
+        if len(args) < low or (high is not None and len(args) > high):
+            raise FormulaError(f"{name} called with {len(args)} arguments in {self.formula!r}")
+        return Call(name, tuple(args))
+
+
+def parse(formula: str) -> Node:
+    """Parse an Excel-style formula (an optional leading ``=`` is ignored)."""
+    formula = formula.strip()
+    if formula.startswith("="):
+        formula = formula[1:]
+    return _Parser(formula).parse()
+
+
+def _collect_refs(node: Node, out: Dict[str, None]) -> None:
+    if isinstance(node, Ref):
+        out.setdefault(node.key)
+    elif isinstance(node, Range):
+        for key in node.keys:
+            out.setdefault(key)
+    elif isinstance(node, Call):
+        for arg in node.args:
+            _collect_refs(arg, out)
+    elif isinstance(node, Unary):
+        _collect_refs(node.operand, out)
+    elif isinstance(node, BinOp):
+        _collect_refs(node.left, out)
+        _collect_refs(node.right, out)
 
-    _ops: Dict[str, Callable[[float, float], float]] = {
+
+# ---------------------------------------------------------------------------
+# Scalar evaluation (dict contexts and dense slot vectors)
+# ---------------------------------------------------------------------------
+
+
+def _round_half_away(value: float, digits: int) -> float:
+    """Excel ``ROUND``: half away from zero, tolerant of binary representation noise."""
+    digits = int(digits)
+    if digits >= 0:
+        factor = 10.0**digits
+        return math.copysign(math.floor(round(abs(value) * factor, 9) + 0.5) / factor, value)
+    factor = 10 ** -digits
+    return math.copysign(math.floor(round(abs(value) / factor, 9) + 0.5) * factor, value)
+
+
+def _compare(op: Callable[[Any, Any], bool]) -> Callable[[float, float], float]:
+    return lambda left, right: 1.0 if op(left, right) else 0.0
+
+
+class _FloatArithmetic:
+    binary: Dict[str, Callable[[Any, Any], Any]] = {
         "+": operator.add,
         "-": operator.sub,
         "*": operator.mul,
         "/": operator.truediv,
+        "^": operator.pow,
+        "=": _compare(operator.eq),
+        "<>": _compare(operator.ne),
+        "<": _compare(operator.lt),
+        ">": _compare(operator.gt),
+        "<=": _compare(operator.le),
+        ">=": _compare(operator.ge),
+    }
+    true = 1.0
+    false = 0.0
+
+    @staticmethod
+    def constant(value: float) -> Any:
+        return value
+
+    @staticmethod
+    def round(value: Any, digits: Any) -> Any:
+        return _round_half_away(value, digits)
+
+
+def _fixed_power(left: int, right: int) -> int:
+    return to_fixed(from_fixed(left) ** from_fixed(right))
+
+
+def _fixed_compare(op: Callable[[Any, Any], bool]) -> Callable[[int, int], int]:
+    return lambda left, right: FIXED_SCALE if op(left, right) else 0
+
+
+class _FixedArithmetic:
+    """Integer fixed-point arithmetic (see ``money``); values are scaled ints."""
+
+    binary: Dict[str, Callable[[Any, Any], Any]] = {
+        "+": operator.add,
+        "-": operator.sub,
+        "*": fixed_mul,
+        "/": fixed_div,
+        "^": _fixed_power,
+        "=": _fixed_compare(operator.eq),
+        "<>": _fixed_compare(operator.ne),
+        "<": _fixed_compare(operator.lt),
+        ">": _fixed_compare(operator.gt),
+        "<=": _fixed_compare(operator.le),
+        ">=": _fixed_compare(operator.ge),
     }
+    true = FIXED_SCALE
+    false = 0
+
+    @staticmethod
+    def constant(value: float) -> Any:
+        return to_fixed(value)
+
+    @staticmethod
+    def round(value: Any, digits: Any) -> Any:
+        return round_fixed(value, int(from_fixed(digits)))
+
+
+class _ContextLeaves:
+    """Leaf evaluators reading a context dict and recording details."""
+
+    def __init__(self, coerce: Callable[[Any], Any] = float):
+        self.coerce = coerce
+        self.zero = coerce(0)
+
+    def ref(self, key: str) -> Evaluator:
+        coerce = self.coerce
+
+        def resolve(context: FormulaContext, details: Dict[str, float]) -> float:
+            try:
+                value = coerce(context[key])
+            except KeyError as exc:
+                raise KeyError(f"Unknown token {key}") from exc
+            details[key] = value
+            return value
+
+        return resolve
+
+    def cells(self, keys: Sequence[str]) -> Evaluator:
+        parts = [self.ref(key) for key in keys]
+        return lambda context, details: [part(context, details) for part in parts]
+
+    def range(self, node: Range) -> Evaluator:
+        """Values of the range's non-blank cells; blanks are skipped as in Excel."""
+        keys = node.keys
+
+        def expand(context: FormulaContext, details: Dict[str, float]) -> List[float]:
+            values = []
+            for key in keys:
+                if key in context:
+                    value = context[key]
+                    details[key] = value
+                    values.append(value)
+            return values
+
+        return expand
+
+    def positions(self, node: Range) -> Evaluator:
+        """Every cell of the range in order, blanks as zero (``SUMPRODUCT``)."""
+        keys = node.keys
+        zero = self.zero
+
+        def expand(context: FormulaContext, details: Dict[str, float]) -> List[float]:
+            values = []
+            for key in keys:
+                value = context.get(key, zero)
+                if key in context:
+                    details[key] = value
+                values.append(value)
+            return values
+
+        return expand
+
+
+class _SlotLeaves:
+    """Leaf evaluators reading a dense value vector laid out by a ``CellIndex``."""
+
+    def __init__(self, index: "CellIndex"):
+        self.index = index
+
+    def slot(self, key: str) -> int:
+        try:
+            return self.index[key]
+        except KeyError as exc:
+            raise KeyError(f"Unknown token {key}") from exc
+
+    def ref(self, key: str) -> Evaluator:
+        slot = self.slot(key)
+        return lambda values, details: values[slot]
+
+    def cells(self, keys: Sequence[str]) -> Evaluator:
+        slots = [self.slot(key) for key in keys]
+        return lambda values, details: [values[slot] for slot in slots]
+
+    def range(self, node: Range) -> Evaluator:
+        span = self.index.span(node.start, node.end, skip_blanks=True)
+        if span is not None:
+            start, stop = span.start, span.stop
+            return lambda values, details: values[start:stop]
+        slots = [self.index[key] for key in node.keys if self.index.has_value(key)]
+        return lambda values, details: [values[slot] for slot in slots]
+
+    def positions(self, node: Range) -> Evaluator:
+        span = self.index.span(node.start, node.end)
+        if span is not None:
+            start, stop = span.start, span.stop
+            return lambda values, details: values[start:stop]
+        slots = [self.index.get(key) for key in node.keys]
+        return lambda values, details: [0.0 if slot is None else values[slot] for slot in slots]
+
+
+class _ScalarCompiler:
+    """Compile an AST into nested closures of ``(scope, details) -> value``."""
+
+    def __init__(self, leaves: Any, arithmetic: Any = _FloatArithmetic):
+        self.leaves = leaves
+        self.arithmetic = arithmetic
+
+    def compile(self, node: Node) -> Evaluator:
+        if isinstance(node, Number):
+            value = self.arithmetic.constant(node.value)
+            return lambda scope, details: value
+        if isinstance(node, Ref):
+            return self.leaves.ref(node.key)
+        if isinstance(node, Range):
+            raise FormulaError(f"Range {node.start}:{node.end} is only valid as a function argument")
+        if isinstance(node, Unary):
+            operand = self.compile(node.operand)
+            return lambda scope, details: -operand(scope, details)
+        if isinstance(node, BinOp):
+            op = self.arithmetic.binary[node.op]
+            left = self.compile(node.left)
+            right = self.compile(node.right)
+            return lambda scope, details: op(left(scope, details), right(scope, details))
+        return self.call(node)
+
+    def arguments(self, args: Sequence[Node]) -> Tuple[List[Evaluator], List[Evaluator]]:
+        """Split arguments into scalar evaluators and sequence (range) evaluators."""
+        scalars: List[Evaluator] = []
+        sequences: List[Evaluator] = []
+        cell_keys = [arg.key for arg in args if isinstance(arg, Ref)]
+        if cell_keys:
+            sequences.append(self.leaves.cells(cell_keys))
+        for arg in args:
+            if isinstance(arg, Range):
+                sequences.append(self.leaves.range(arg))
+            elif not isinstance(arg, Ref):
+                scalars.append(self.compile(arg))
+        return scalars, sequences
+
+    def call(self, node: Call) -> Evaluator:
+        name = node.name
+        arithmetic = self.arithmetic
+
+        if name == "IF":
+            condition = self.compile(node.args[0])
+            when_true = self.compile(node.args[1])
+            when_false = self.compile(node.args[2]) if len(node.args) > 2 else self.compile(Number(0.0))
+            return lambda scope, details: (
+                when_true(scope, details) if condition(scope, details) else when_false(scope, details)
+            )
+
+        if name == "ROUND":
+            value = self.compile(node.args[0])
+            digits = self.compile(node.args[1])
+            return lambda scope, details: arithmetic.round(value(scope, details), digits(scope, details))
+
+        if name == "SUMPRODUCT":
+            multiply = arithmetic.binary["*"]
+            arrays = [self._as_sequence(arg) for arg in node.args]
+
+            def sumproduct(scope: Any, details: Dict[str, float]) -> Any:
+                columns = [list(part(scope, details)) for part in arrays]
+                if len({len(column) for column in columns}) > 1:
+                    raise FormulaError("SUMPRODUCT arguments must have the same size")
+                total = arithmetic.constant(0.0)
+                for row in zip(*columns):
+                    product = row[0]
+                    for value in row[1:]:
+                        product = multiply(product, value)
+                    total += product
+                return total
+
+            return sumproduct
+
+        scalars, sequences = self.arguments(node.args)
+
+        if name == "SUM":
+            zero = arithmetic.constant(0.0)
+
+            def call_sum(scope: Any, details: Dict[str, float]) -> Any:
+                total = zero
+                for part in sequences:
+                    total += sum(part(scope, details))
+                for part in scalars:
+                    total += part(scope, details)
+                return total
+
+            return call_sum
+
+        def flatten(scope: Any, details: Dict[str, float]) -> List[Any]:
+            values: List[Any] = []
+            for part in sequences:
+                values.extend(part(scope, details))
+            for part in scalars:
+                values.append(part(scope, details))
+            return values
+
+        if name in {"MIN", "MAX"}:
+            pick = min if name == "MIN" else max
+            zero = arithmetic.constant(0.0)
+            return lambda scope, details: pick(flatten(scope, details), default=zero)
+
+        truth, falsity = arithmetic.true, arithmetic.false
+        combine = all if name == "AND" else any
+        return lambda scope, details: truth if combine(flatten(scope, details)) else falsity
+
+    def _as_sequence(self, node: Node) -> Evaluator:
+        if isinstance(node, Range):
+            return self.leaves.positions(node)
+        scalar = self.compile(node)
+        return lambda scope, details: [scalar(scope, details)]
+
+
+# ---------------------------------------------------------------------------
+# Batch evaluation (NumPy, one row per context)
+# ---------------------------------------------------------------------------
+
+
+def _round_half_away_array(values: Any, digits: Any) -> Any:
+    digits = np.trunc(digits)
+    factor = np.power(10.0, digits)
+    scaled = np.round(np.abs(values) * factor, 9)
+    return np.copysign(np.floor(scaled + 0.5) / factor, values)
+
+
+def _batch_compare(op: Callable[[Any, Any], Any]) -> Callable[[Any, Any], Any]:
+    return lambda left, right: np.asarray(op(left, right), dtype=float)
+
+
+_BATCH_BINARY: Dict[str, Callable[[Any, Any], Any]] = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    "^": lambda left, right: np.power(np.asarray(left, dtype=float), right),
+    "=": _batch_compare(operator.eq),
+    "<>": _batch_compare(operator.ne),
+    "<": _batch_compare(operator.lt),
+    ">": _batch_compare(operator.gt),
+    "<=": _batch_compare(operator.le),
+    ">=": _batch_compare(operator.ge),
+}
+
+
+def _as_columns(value: Any, rows: int) -> Any:
+    """Coerce a scalar, vector or (rows x k) block into a (rows x k) block."""
+    value = np.asarray(value, dtype=float)
+    if value.ndim == 2:
+        return value
+    return np.broadcast_to(value.reshape(-1, 1) if value.ndim else value, (rows, 1))
+
+
+def _compile_batch_range(node: Range, positions: bool = False) -> BatchEvaluator:
+    """Columns of the range's non-blank cells, or of every cell with ``positions``."""
+    keys = node.keys
+    start, end = node.start, node.end
+
+    def expand(matrix: Any, index: ColumnIndex) -> Any:
+        cell_index = isinstance(index, CellIndex)
+        span = index.span(start, end, skip_blanks=not positions) if cell_index else None
+        if span is not None:
+            return matrix[:, span]
+        if not positions:
+            return matrix[:, [index[key] for key in keys if (index.has_value(key) if cell_index else key in index)]]
+        slots = [index.get(key) for key in keys]
+        block = np.zeros((matrix.shape[0], len(slots)))
+        present = [column for column, slot in enumerate(slots) if slot is not None]
+        block[:, present] = matrix[:, [slots[column] for column in present]]
+        return block
+
+    return expand
+
+
+def _compile_batch_node(node: Node) -> BatchEvaluator:
+    if isinstance(node, Number):
+        value = node.value
+        return lambda matrix, index: value
+
+    if isinstance(node, Ref):
+        key = node.key
+
+        def column(matrix: Any, index: ColumnIndex) -> Any:
+            try:
+                return matrix[:, index[key]]
+            except KeyError as exc:
+                raise KeyError(f"Unknown token {key}") from exc
+
+        return column
+
+    if isinstance(node, Range):
+        raise FormulaError(f"Range {node.start}:{node.end} is only valid as a function argument")
+
+    if isinstance(node, Unary):
+        operand = _compile_batch_node(node.operand)
+        return lambda matrix, index: -operand(matrix, index)
+
+    if isinstance(node, BinOp):
+        op = _BATCH_BINARY[node.op]
+        left = _compile_batch_node(node.left)
+        right = _compile_batch_node(node.right)
+        return lambda matrix, index: op(left(matrix, index), right(matrix, index))
+
+    return _compile_batch_call(node)
+
+
+def _compile_batch_call(node: Call) -> BatchEvaluator:
+    name = node.name
+    parts = [
+        _compile_batch_range(arg, positions=name == "SUMPRODUCT") if isinstance(arg, Range) else _compile_batch_node(arg)
+        for arg in node.args
+    ]
+
+    if name == "IF":
+        condition, when_true = parts[0], parts[1]
+        when_false = parts[2] if len(parts) > 2 else (lambda matrix, index: 0.0)
+        return lambda matrix, index: np.where(
+            np.asarray(condition(matrix, index)) != 0, when_true(matrix, index), when_false(matrix, index)
+        )
+
+    if name == "ROUND":
+        value, digits = parts
+        return lambda matrix, index: _round_half_away_array(value(matrix, index), digits(matrix, index))
+
+    def block(matrix: Any, index: ColumnIndex) -> Any:
+        rows = matrix.shape[0]
+        return np.hstack([_as_columns(part(matrix, index), rows) for part in parts])
+
+    if name == "SUM":
+        return lambda matrix, index: block(matrix, index).sum(axis=1)
+
+    if name in {"MIN", "MAX"}:
+        reduce = np.min if name == "MIN" else np.max
+
+        def pick(matrix: Any, index: ColumnIndex) -> Any:
+            values = block(matrix, index)
+            return reduce(values, axis=1) if values.shape[1] else np.zeros(values.shape[0])
+
+        return pick
+
+    if name == "SUMPRODUCT":
+
+        def sumproduct(matrix: Any, index: ColumnIndex) -> Any:
+            rows = matrix.shape[0]
+            columns = [_as_columns(part(matrix, index), rows) for part in parts]
+            if len({column.shape[1] for column in columns}) > 1:
+                raise FormulaError("SUMPRODUCT arguments must have the same size")
+            product = columns[0]
+            for column in columns[1:]:
+                product = product * column
+            return product.sum(axis=1)
+
+        return sumproduct
+
+    combine = np.all if name == "AND" else np.any
+    return lambda matrix, index: combine(block(matrix, index) != 0, axis=1).astype(float)
+
+
+# ---------------------------------------------------------------------------
+# Compiled formulas, cell index and engine
+# ---------------------------------------------------------------------------
+
+
+class CompiledFormula:
+    """A formula parsed once into an AST and a closure that evaluates it."""
+
+    __slots__ = ("source", "tree", "refs", "_evaluate", "_evaluate_fixed", "_evaluate_batch")
+
+    def __init__(self, source: str, tree: Node):
+        self.source = source
+        self.tree = tree
+        refs: Dict[str, None] = {}
+        _collect_refs(tree, refs)
+        self.refs: Tuple[str, ...] = tuple(refs)
+        self._evaluate = _ScalarCompiler(_ContextLeaves()).compile(tree)
+        self._evaluate_fixed: Evaluator | None = None
+        self._evaluate_batch: BatchEvaluator | None = None
+
+    def evaluate(self, context: FormulaContext) -> FormulaResult:
+        details: Dict[str, float] = {}
+        value = self._evaluate(context, details)
+        return FormulaResult(value=value, details=details)
+
+    def evaluate_fixed(self, context: Mapping[str, int]) -> FormulaResult:
+        """Evaluate with integer fixed-point arithmetic.
+
+        ``context`` values, the result value and the details are all fixed-point
+        units (see ``money.to_fixed``); no rounding happens between operations
+        other than the rescale after each ``*``/``/``.
+        """
+        if self._evaluate_fixed is None:
+            self._evaluate_fixed = _ScalarCompiler(_ContextLeaves(int), _FixedArithmetic).compile(self.tree)
+        details: Dict[str, int] = {}
+        value = self._evaluate_fixed(context, details)
+        return FormulaResult(value=value, details=details)
+
+    def evaluate_batch(self, matrix: Any, columns: Sequence[str] | ColumnIndex) -> Any:
+        """Evaluate against many contexts at once.
+
+        ``matrix`` holds one row per context and one column per cell key, named
+        by ``columns`` (a key sequence or a key -> column index mapping).
+        Returns a float vector with one result per row.
+        """
+        if self._evaluate_batch is None:
+            self._evaluate_batch = _compile_batch_node(self.tree)
+        matrix = np.asarray(matrix, dtype=float)
+        if matrix.ndim != 2:
+            raise ValueError("matrix must be two-dimensional (contexts x cells)")
+        index = columns if isinstance(columns, Mapping) else {key: idx for idx, key in enumerate(columns)}
+        result = self._evaluate_batch(matrix, index)
+        return np.broadcast_to(np.asarray(result, dtype=float), (matrix.shape[0],)).copy()
+
+
+def _row_runs(rows: Sequence[int]) -> Iterator[Tuple[int, int]]:
+    """Split sorted ``rows`` into ``(low, high)`` runs for ``CellIndex`` blocks."""
+    low = high = rows[0]
+    for row in rows[1:]:
+        if row - high > MAX_ROW_GAP or row - low >= MAX_BLOCK_ROWS:
+            yield low, high
+            low = row
+        high = row
+    yield low, high
+
+
+class CellIndex(Mapping[str, int]):
+    """Dense slot layout for cell keys.
+
+    Keys are grouped by their sheet/column prefix (``J``, ``Summary!J``, ...)
+    and each run of nearby rows owns one contiguous block of slots from its
+    lowest to its highest row, so a same-column range such as ``J4:J10`` is a
+    plain slice. Gaps wider than ``MAX_ROW_GAP`` rows split a prefix into
+    several blocks and no block exceeds ``MAX_BLOCK_ROWS`` rows, so sparse
+    keys such as ``J1`` and ``J1000000`` cost two slots, not a million. A row
+    with no neighbours and keys without a row number get a slot of their own.
+    Slots padding a block read as zero but count as blank inside ranges.
+    """
+
+    def __init__(self, keys: Iterable[str]):
+        rows: Dict[str, set] = {}
+        scalars: Dict[str, None] = {}
+        aliases: Dict[str, Tuple[str, int]] = {}
+        for key in keys:
+            prefix, row = _split_key(key)
+            if row is None:
+                scalars.setdefault(key)
+            else:
+                rows.setdefault(prefix, set()).add(row)
+                aliases[key] = (prefix, row)
+
+        self._slots: Dict[str, int] = {}
+        # Slots padding a block between rows no key named; they read as zero.
+        self._blank_slots: Set[int] = set()
+        # prefix -> (block low rows, [(first slot, low, high), ...]) sorted by row
+        self._blocks: Dict[str, Tuple[List[int], List[Tuple[int, int, int]]]] = {}
+        slot = 0
+        for prefix, prefix_rows in rows.items():
+            lows: List[int] = []
+            blocks: List[Tuple[int, int, int]] = []
+            for low, high in _row_runs(sorted(prefix_rows)):
+                if low == high:
+                    self._slots[f"{prefix}{low}"] = slot
+                    slot += 1
+                    continue
+                lows.append(low)
+                blocks.append((slot, low, high))
+                for row in range(low, high + 1):
+                    self._slots[f"{prefix}{row}"] = slot + row - low
+                    if row not in prefix_rows:
+                        self._blank_slots.add(slot + row - low)
+                slot += high - low + 1
+            if blocks:
+                self._blocks[prefix] = (lows, blocks)
+        for key in scalars:
+            self._slots[key] = slot
+            slot += 1
+        self.size = slot
+        # Keep zero-padded spellings such as ``J04`` addressable as well.
+        for key, (prefix, row) in aliases.items():
+            self._slots.setdefault(key, self._slots[f"{prefix}{row}"])
+
+    def __getitem__(self, key: str) -> int:
+        return self._slots[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._slots)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def has_value(self, key: str) -> bool:
+        """True for keys the index was built from, False for padding and unknowns."""
+        slot = self._slots.get(key)
+        return slot is not None and slot not in self._blank_slots
+
+    def span(self, start: str, end: str, skip_blanks: bool = False) -> slice | None:
+        """Return the slot slice for ``start:end`` when both ends share a block.
+
+        With ``skip_blanks`` the slice must also hold no padding slot, so it
+        covers exactly the range's non-blank cells (as ``MIN``/``MAX`` read).
+        """
+        prefix, start_row = _split_key(start)
+        end_prefix, end_row = _split_key(end)
+        entry = self._blocks.get(prefix)
+        if entry is None or prefix != end_prefix or start_row is None or end_row is None:
+            return None
+        lows, blocks = entry
+        position = bisect_right(lows, start_row) - 1
+        if position < 0:
+            return None
+        first, low, high = blocks[position]
+        if end_row > high or start_row > end_row:
+            return None
+        span = slice(first + start_row - low, first + end_row - low + 1)
+        if skip_blanks and self._blank_slots and any(slot in self._blank_slots for slot in range(span.start, span.stop)):
+            return None
+        return span
+
+    def vector(self, context: Mapping[str, float]) -> array:
+        """Lay ``context`` out as a dense ``array('d')``; unknown keys are ignored."""
+        values = array("d", bytes(8 * self.size))
+        slots = self._slots
+        for key, value in context.items():
+            slot = slots.get(key)
+            if slot is not None:
+                values[slot] = value
+        return values
+
+    def bind(self, formula: str | CompiledFormula) -> "BoundFormula":
+        compiled = compile_formula(formula) if isinstance(formula, str) else formula
+        return BoundFormula(compiled, self)
+
+
+class BoundFormula:
+    """A compiled formula resolved against a ``CellIndex``.
+
+    Ranges become slice sums and the plain cell arguments of a function a
+    precomputed slot list, so evaluation does no key building or dict lookups.
+    """
+
+    __slots__ = ("formula", "index", "_evaluate")
+
+    def __init__(self, formula: CompiledFormula, index: CellIndex):
+        self.formula = formula
+        self.index = index
+        self._evaluate = _ScalarCompiler(_SlotLeaves(index)).compile(formula.tree)
+
+    def evaluate(self, values: Sequence[float]) -> float:
+        return self._evaluate(values, None)
+
+
+@lru_cache(maxsize=FORMULA_CACHE_SIZE)
+def compile_formula(formula: str) -> CompiledFormula:
+    """Parse ``formula`` once; repeat calls are served from a shared LRU cache.
+
+    Hit/miss counters are available through ``compile_formula.cache_info()``.
+    """
+    return CompiledFormula(formula, parse(formula))
+
+
+class _FixedContext(Mapping[str, int]):
+    """Fixed-point view of a float context, converted key by key on read.
+
+    Each conversion is remembered with the value it came from, so a key is
+    converted once while it is unchanged and again after it is reassigned.
+    """
 
     def __init__(self, context: FormulaContext):
         self.context = context
+        self._converted: Dict[str, Tuple[Any, int]] = {}
+
+    def __getitem__(self, key: str) -> int:
+        value = self.context[key]
+        converted = self._converted.get(key)
+        if converted is not None and converted[0] == value:
+            return converted[1]
+        fixed = to_fixed(value)
+        self._converted[key] = (value, fixed)
+        return fixed
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.context)
+
+    def __len__(self) -> int:
+        return len(self.context)
+
+
+class FormulaEngine:
+    """Small Excel-compatible formula interpreter.
+
+    Supports numbers, cell references and ranges, ``+ - * / ^``, unary minus,
+    comparisons, parentheses and ``SUM``, ``MIN``, ``MAX``, ``ROUND``,
+    ``SUMPRODUCT``, ``IF``, ``AND`` and ``OR``.
+
+    With ``numeric="fixed"`` context values are converted to integer
+    fixed-point units as formulas read them (each value once until it
+    changes), formulas run on ints and results are converted back to floats,
+    so totals are exact and reproducible. Updating ``context`` in place or
+    assigning a new one is seen by the next ``eval``.
+    """
+
+    def __init__(self, context: FormulaContext, numeric: str = NUMERIC_FLOAT):
+        if numeric not in (NUMERIC_FLOAT, NUMERIC_FIXED):
+            raise ValueError(f"Unsupported numeric mode: {numeric}")
+        self.numeric = numeric
+        self._fixed_context: _FixedContext | None = None
+        self.context = context
+
+    @property
+    def context(self) -> FormulaContext:
+        return self._context
+
+    @context.setter
+    def context(self, context: FormulaContext) -> None:
+        self._context = context
+        if self.numeric == NUMERIC_FIXED:
+            self._fixed_context = _FixedContext(context)
 
     def eval(self, formula: str) -> FormulaResult:
-        formula = formula.strip()
-        if formula.upper().startswith("SUM(") and formula.endswith(")"):
-            inside = formula[4:-1]
-            parts = [p.strip() for p in inside.split(",") if p.strip()]
-            total = 0.0
-            details: Dict[str, float] = {}
-            for part in parts:
-                if ":" in part:
-                    start, end = [s.strip() for s in part.split(":", 1)]
-                    values = self._expand_range(start, end)
-                else:
-                    values = [self._resolve(part)]
-                for key, value in values:
-                    total += value
-                    details[key] = value
-            return FormulaResult(value=total, details=details)
-
-        tokens = re.split(r"\s*([+\-*/])\s*", formula)
-        if not tokens:
-            return FormulaResult(0.0, {})
-        value = self._resolve(tokens[0])[1]
-        details = {tokens[0]: value}
-        i = 1
-        while i < len(tokens) - 1:
-            op = tokens[i]
-            operand = tokens[i + 1]
-            rhs_name, rhs_value = self._resolve(operand)
-            value = self._ops[op](value, rhs_value)
-            details[rhs_name] = rhs_value
-            i += 2
-        return FormulaResult(value=value, details=details)
+        compiled = compile_formula(formula)
+        if self._fixed_context is None:
+            return compiled.evaluate(self.context)
+        result = compiled.evaluate_fixed(self._fixed_context)
+        return FormulaResult(
+            value=from_fixed(result.value),
+            details={key: from_fixed(value) for key, value in result.details.items()},
+        )
 
-    def _resolve(self, token: str) -> tuple[str, float]:
-        token = token.strip()
-        if token in self.context:
-            return token, float(self.context[token])
-        try:
-            return token, float(token)
-        except ValueError as exc:
-            raise KeyError(f"Unknown token {token}") from exc
-
-    def _expand_range(self, start: str, end: str) -> Iterable[tuple[str, float]]:
-        """Expand a simplified cell range that maps to dot-separated identifiers."""
-        prefix = start.rstrip("0123456789")
-        start_idx = int(start[len(prefix) :])
-        end_idx = int(end[len(prefix) :])
-        for idx in range(start_idx, end_idx + 1):
-            key = f"{prefix}{idx}"
-            yield key, self.context.get(key, 0.0)
+    @staticmethod
+    def eval_batch(formula: str, matrix: Any, columns: Sequence[str] | ColumnIndex) -> Any:
+        """Vectorised ``eval``: one result per row of ``matrix`` (see ``CompiledFormula.evaluate_batch``)."""
+        return compile_formula(formula).evaluate_batch(matrix, columns)
+
+    @staticmethod
+    def cache_info():
+        return compile_formula.cache_info()
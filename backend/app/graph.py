@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from graphlib import TopologicalSorter
+from typing import Dict, Iterable, List, Mapping, Set, Tuple
+
+
+class DependencyGraph:
+    """Cell dependency graph with a fixed topological evaluation order.
+
+    ``dependencies`` maps each cell to the cells it reads.  Cells that only
+    appear as dependencies are treated as inputs.  A cycle raises
+    ``graphlib.CycleError`` (a ``ValueError``).
+    """
+
+    def __init__(self, dependencies: Mapping[str, Iterable[str]]):
+        self.dependencies: Dict[str, Tuple[str, ...]] = {cell: tuple(deps) for cell, deps in dependencies.items()}
+        self.dependents: Dict[str, Set[str]] = {}
+        for cell, deps in self.dependencies.items():
+            for dep in deps:
+                self.dependents.setdefault(dep, set()).add(cell)
+        self.order: Tuple[str, ...] = tuple(TopologicalSorter(self.dependencies).static_order())
+        self._position = {cell: idx for idx, cell in enumerate(self.order)}
+
+    def __contains__(self, cell: str) -> bool:
+        return cell in self._position
+
+    def affected(self, dirty: Iterable[str]) -> List[str]:
+        """Return the dirty cells plus everything downstream, in evaluation order."""
+        seen: Set[str] = set()
+        stack = [cell for cell in dirty if cell in self._position]
+        while stack:
+            cell = stack.pop()
+            if cell in seen:
+                continue
+            seen.add(cell)
+            stack.extend(self.dependents.get(cell, ()))
+        return sorted(seen, key=self._position.__getitem__)
@@ -4,7 +4,14 @@ import json
 import xml.etree.ElementTree as ET
 import zipfile
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterator, List, TextIO, Tuple
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+STREAM_JSON = "json"
+STREAM_NDJSON = "ndjson"
+STREAM_FORMATS = (STREAM_JSON, STREAM_NDJSON)
 
 
 class WorkbookIngestor:
@@ -14,50 +21,122 @@ class WorkbookIngestor:
     def extract(self) -> Dict[str, Any]:
         spec: Dict[str, Any] = {"sheets": {}, "named_ranges": {}}
         with zipfile.ZipFile(self.workbook_path) as zf:
-            workbook_xml = ET.fromstring(zf.read("xl/workbook.xml"))
-            rels_xml = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
-            ns = {"main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main", "rel": "http://schemas.openxmlformats.org/officeDocument/2006/relationships"}
-            rel_map = {
-                rel.attrib["Id"]: rel.attrib["Target"]
-                for rel in rels_xml.findall("rel:Relationship", {"rel": "http://schemas.openxmlformats.org/package/2006/relationships"})
-            }
-            for sheet in workbook_xml.findall("main:sheets/main:sheet", ns):
-                name = sheet.attrib["name"]
-                rel_id = sheet.attrib["{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"]
-                target = rel_map[rel_id]
-                sheet_xml = ET.fromstring(zf.read(f"xl/{target}"))
-                rows = []
-                for row in sheet_xml.findall("main:sheetData/main:row", ns):
-                    row_data = []
-                    for cell in row.findall("main:c", ns):
-                        value = ""
-                        if cell.attrib.get("t") == "s":
-                            shared_index = int(cell.find("main:v", ns).text)
-                            value = self._read_shared_string(zf, shared_index)
-                        else:
-                            v = cell.find("main:v", ns)
-                            if v is not None:
-                                value = v.text
-                        row_data.append({"ref": cell.attrib.get("r"), "value": value})
-                    rows.append(row_data)
-                spec["sheets"][name] = {"rows": rows}
-
-            defined_names = workbook_xml.find("main:definedNames", ns)
-            if defined_names is not None:
-                for defined_name in defined_names.findall("main:definedName", ns):
-                    text = defined_name.text or ""
-                    spec["named_ranges"][defined_name.attrib.get("name")] = text
+            sheets, spec["named_ranges"] = self._read_workbook(zf)
+            shared_strings = self._read_shared_strings(zf)
+            for name, path in sheets:
+                spec["sheets"][name] = {"rows": list(self._iter_rows(zf, path, shared_strings))}
         return spec
 
-    def _read_shared_string(self, zf: zipfile.ZipFile, index: int) -> str:
+    def stream(self, fh: TextIO, fmt: str = STREAM_JSON) -> int:
+        """Write the spec to ``fh`` row by row; returns the number of rows.
+
+        ``"json"`` writes the same document as ``extract``; ``"ndjson"``
+        writes one ``{"sheet", "row"}`` object per row followed by one
+        ``{"named_ranges"}`` object. Sheets are parsed incrementally, so
+        memory stays bounded by the shared-strings table and a single row.
+        """
+        if fmt not in STREAM_FORMATS:
+            raise ValueError(f"Unsupported stream format: {fmt}")
+        count = 0
+        with zipfile.ZipFile(self.workbook_path) as zf:
+            sheets, named_ranges = self._read_workbook(zf)
+            shared_strings = self._read_shared_strings(zf)
+            if fmt == STREAM_JSON:
+                fh.write('{"sheets": {')
+            for sheet_number, (name, path) in enumerate(sheets):
+                if fmt == STREAM_JSON:
+                    fh.write(f'{", " if sheet_number else ""}{json.dumps(name)}: {{"rows": [')
+                for row_number, row in enumerate(self._iter_rows(zf, path, shared_strings)):
+                    if fmt == STREAM_JSON:
+                        fh.write(("," if row_number else "") + "\n" + json.dumps(row))
+                    else:
+                        fh.write(json.dumps({"sheet": name, "row": row}) + "\n")
+                    count += 1
+                if fmt == STREAM_JSON:
+                    fh.write("]}")
+            if fmt == STREAM_JSON:
+                fh.write(f'}}, "named_ranges": {json.dumps(named_ranges)}}}\n')
+            else:
+                fh.write(json.dumps({"named_ranges": named_ranges}) + "\n")
+        return count
+
+    @staticmethod
+    def _read_workbook(zf: zipfile.ZipFile) -> Tuple[List[Tuple[str, str]], Dict[str, str]]:
+        """Return ``[(sheet name, zip path)]`` in workbook order and the named ranges."""
+        workbook_xml = ET.fromstring(zf.read("xl/workbook.xml"))
+        rels_xml = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+        ns = {"main": MAIN_NS}
+        rel_map = {
+            rel.attrib["Id"]: rel.attrib["Target"]
+            for rel in rels_xml.findall("rel:Relationship", {"rel": "http://schemas.openxmlformats.org/package/2006/relationships"})
+        }
+        sheets = [
+            (sheet.attrib["name"], f"xl/{rel_map[sheet.attrib[f'{{{REL_NS}}}id']]}")
+            for sheet in workbook_xml.findall("main:sheets/main:sheet", ns)
+        ]
+        named_ranges: Dict[str, str] = {}
+        defined_names = workbook_xml.find("main:definedNames", ns)
+        if defined_names is not None:
+            for defined_name in defined_names.findall("main:definedName", ns):
+                named_ranges[defined_name.attrib.get("name")] = defined_name.text or ""
+        return sheets, named_ranges
+
+    @staticmethod
+    def _iter_rows(zf: zipfile.ZipFile, path: str, shared_strings: List[str]) -> Iterator[List[Dict[str, Any]]]:
+        """Yield a sheet's rows with ``iterparse`` over the zip member stream.
+
+        Each ``<row>`` is dropped from the tree once converted, so only the
+        row being parsed is held in memory.
+        """
+        row_tag, cell_tag, value_tag = f"{{{MAIN_NS}}}row", f"{{{MAIN_NS}}}c", f"{{{MAIN_NS}}}v"
+        sheet_data_tag = f"{{{MAIN_NS}}}sheetData"
+        with zf.open(path) as stream:
+            sheet_data = None
+            for event, elem in ET.iterparse(stream, events=("start", "end")):
+                if event == "start":
+                    if elem.tag == sheet_data_tag:
+                        sheet_data = elem
+                    continue
+                if elem.tag != row_tag:
+                    continue
+                row_data = []
+                for cell in elem.iterfind(cell_tag):
+                    value = ""
+                    v = cell.find(value_tag)
+                    if cell.attrib.get("t") == "s":
+                        shared_index = int(v.text)
+                        if shared_index < len(shared_strings):
+                            value = shared_strings[shared_index]
+                    elif v is not None:
+                        value = v.text
+                    row_data.append({"ref": cell.attrib.get("r"), "value": value})
+                if sheet_data is not None:
+                    sheet_data.clear()
+                else:
+                    elem.clear()
+                yield row_data
+
+    @staticmethod
+    def _read_shared_strings(zf: zipfile.ZipFile) -> List[str]:
+        """Parse ``xl/sharedStrings.xml`` once into a list indexed like ``<c t="s">``.
+
+        Plain items hold one ``<t>``; rich-text items hold ``<r>`` runs whose
+        ``<t>`` texts are concatenated. Phonetic ``<rPh>`` hints are skipped.
+        """
+        if "xl/sharedStrings.xml" not in zf.namelist():
+            return []
         table = ET.fromstring(zf.read("xl/sharedStrings.xml"))
-        ns = {"main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
-        items = table.findall("main:si", ns)
-        if index < len(items):
-            text = items[index].find("main:t", ns)
-            if text is not None:
-                return text.text or ""
-        return ""
+        text_tag, run_tag = f"{{{MAIN_NS}}}t", f"{{{MAIN_NS}}}r"
+        strings: List[str] = []
+        for item in table.iterfind(f"{{{MAIN_NS}}}si"):
+            parts = []
+            for child in item:
+                if child.tag == text_tag:
+                    parts.append(child.text or "")
+                elif child.tag == run_tag:
+                    parts.extend(run.text or "" for run in child.iterfind(text_tag))
+            strings.append("".join(parts))
+        return strings
 
     def dump(self, output_path: Path) -> Dict[str, Any]:
         spec = self.extract()
@@ -65,3 +144,9 @@ class WorkbookIngestor:
         with output_path.open("w", encoding="utf-8") as fh:
             json.dump(spec, fh, indent=2)
         return spec
+
+    def dump_stream(self, output_path: Path, fmt: str = STREAM_JSON) -> int:
+        """Stream the spec to ``output_path`` (see ``stream``); returns the row count."""
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with output_path.open("w", encoding="utf-8") as fh:
+            return self.stream(fh, fmt)
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import math
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Union
+
+Numeric = Union[int, float, str, Decimal]
+
+# Fixed-point values are plain ints holding 1/10,000ths of a unit, the same
+# layout as Excel's Currency type (an int64 with four implied decimals).
+# Catalog prices carry at most four decimals, so sums stay exact.
+FIXED_PLACES = 4
+FIXED_SCALE = 10**FIXED_PLACES
+
+NUMERIC_FLOAT = "float"
+NUMERIC_FIXED = "fixed"
+NUMERIC_DECIMAL = "decimal"
+
+
+def _div_round(numerator: int, denominator: int) -> int:
+    """Integer division rounding half away from zero (Excel ``ROUND`` semantics)."""
+    quotient, remainder = divmod(abs(numerator), abs(denominator))
+    if 2 * remainder >= abs(denominator):
+        quotient += 1
+    return quotient if (numerator < 0) == (denominator < 0) else -quotient
+
+
+def to_fixed(value: Numeric) -> int:
+    """Convert a number to fixed-point units, rounding half away from zero."""
+    if isinstance(value, bool):
+        return int(value) * FIXED_SCALE
+    if isinstance(value, int):
+        return value * FIXED_SCALE
+    if isinstance(value, float):
+        # ``round(..., 6)`` absorbs binary noise such as 2.675 -> 267.49999...
+        return int(math.copysign(math.floor(round(abs(value) * FIXED_SCALE, 6) + 0.5), value))
+    quantized = Decimal(value).scaleb(FIXED_PLACES).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+    return int(quantized)
+
+
+def from_fixed(units: int) -> float:
+    """Convert fixed-point units back to the nearest float."""
+    return units / FIXED_SCALE
+
+
+def fixed_mul(left: int, right: int) -> int:
+    return _div_round(left * right, FIXED_SCALE)
+
+
+def fixed_div(left: int, right: int) -> int:
+    if right == 0:
+        raise ZeroDivisionError("fixed-point division by zero")
+    return _div_round(left * FIXED_SCALE, right)
+
+
+def round_fixed(units: int, digits: int) -> int:
+    """Round fixed-point units to ``digits`` decimal places (Excel rules)."""
+    digits = int(digits)
+    if digits >= FIXED_PLACES:
+        return units
+    step = 10 ** (FIXED_PLACES - digits)
+    return _div_round(units, step) * step
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from array import array
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session, selectinload
+
+from .cel import CostingEmulationLayer, RollupResult
+from .models import CostingItem, CostingSummary, Pricing
+
+DEFAULT_CHUNK_SIZE = 500
+# Upper bound on worker processes, whatever a caller asks for.
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+
+# (summary id, rds_input id, RESULT_KEYS values, margin, toggle mask) as
+# returned by a worker; the parent expands it with ``RollupResult``.
+RepricedRow = Tuple[int, int, array, float, int]
+
+_EXECUTOR: Optional[ProcessPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def shared_executor() -> ProcessPoolExecutor:
+    """The ``MAX_WORKERS`` process pool every re-price reuses, started on first use."""
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ProcessPoolExecutor(max_workers=MAX_WORKERS)
+        return _EXECUTOR
+
+
+@dataclass(frozen=True)
+class RepriceProgress:
+    done: int
+    total: int
+    elapsed: float
+
+    @property
+    def rate(self) -> float:
+        """Quotes re-priced per second."""
+        return self.done / self.elapsed if self.elapsed > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"done": self.done, "total": self.total, "elapsed": self.elapsed, "rate": self.rate}
+
+
+ProgressCallback = Callable[[RepriceProgress], None]
+
+
+def _snapshot(summary: CostingSummary) -> Dict[str, Any]:
+    """Picklable copy of everything the CEL reads from a summary."""
+    return {
+        "id": summary.id,
+        "rds_input_id": summary.rds_input_id,
+        "margin": summary.margin,
+        "toggles": dict(summary.toggles or {}),
+        "items": [
+            (item.code, item.description, item.quantity, item.unit_cost, dict(item.metadata_json or {}))
+            for item in summary.items
+        ],
+    }
+
+
+def _reprice_chunk(snapshots: List[Dict[str, Any]], margin: Optional[float]) -> List[RepricedRow]:
+    """Worker entry point: rebuild detached summaries and recompute them."""
+    rows: List[RepricedRow] = []
+    for snapshot in snapshots:
+        summary = CostingSummary(margin=snapshot["margin"], toggles=snapshot["toggles"], totals={})
+        summary.items = [
+            CostingItem(code=code, description=description, quantity=quantity, unit_cost=unit_cost, metadata_json=metadata)
+            for code, description, quantity, unit_cost, metadata in snapshot["items"]
+        ]
+        result = CostingEmulationLayer(None, summary).recompute(margin)
+        rows.append((snapshot["id"], snapshot["rds_input_id"], result.values, result.margin, result.toggle_mask))
+    return rows
+
+
+def _iter_chunks(session: Session, chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Yield summary snapshots in id order, one keyset page at a time."""
+    last_id = 0
+    while True:
+        summaries = session.scalars(
+            select(CostingSummary)
+            .where(CostingSummary.id > last_id)
+            .order_by(CostingSummary.id)
+            .limit(chunk_size)
+            .options(selectinload(CostingSummary.items))
+        ).all()
+        if not summaries:
+            return
+        last_id = summaries[-1].id
+        chunk = [_snapshot(summary) for summary in summaries]
+        # Keep the identity map flat: the bulk UPDATEs below bypass these objects.
+        for summary in summaries:
+            for item in summary.items:
+                session.expunge(item)
+            session.expunge(summary)
+        yield chunk
+
+
+def _pipelined(executor: Executor, chunks: Iterable[List[Dict[str, Any]]], margin: Optional[float], depth: int) -> Iterator[List[RepricedRow]]:
+    """Submit chunks as they are read, keeping at most ``depth`` in flight."""
+    pending = deque()
+    for chunk in chunks:
+        pending.append(executor.submit(_reprice_chunk, chunk, margin))
+        if len(pending) >= depth:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _write_results(session: Session, rows: List[RepricedRow]) -> None:
+    """Write totals back with one executemany per table."""
+    results = [RollupResult(values, margin, mask) for _, _, values, margin, mask in rows]
+    totals_by_row = [result.summary_values.to_dict() for result in results]
+    session.execute(
+        update(CostingSummary),
+        [
+            {"id": row[0], "margin": result.margin, "toggles": result.toggles, "totals": totals}
+            for row, result, totals in zip(rows, results, totals_by_row)
+        ],
+    )
+    pricing_ids = dict(
+        session.execute(
+            select(Pricing.rds_input_id, Pricing.id).where(Pricing.rds_input_id.in_([row[1] for row in rows]))
+        ).all()
+    )
+    updates: List[Dict[str, Any]] = []
+    inserts: List[Dict[str, Any]] = []
+    for (_, rds_input_id, _, margin, _), totals in zip(rows, totals_by_row):
+        values = {"subtotal": totals["base_total"], "margin": margin, "total": totals["sell_price"], "data": totals}
+        if rds_input_id in pricing_ids:
+            updates.append({"id": pricing_ids[rds_input_id], **values})
+        else:
+            inserts.append({"rds_input_id": rds_input_id, **values})
+    if updates:
+        session.execute(update(Pricing), updates)
+    if inserts:
+        session.execute(insert(Pricing), inserts)
+
+
+def reprice_all(
+    session: Session,
+    margin: Optional[float] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+    commit: bool = True,
+) -> RepriceProgress:
+    """Recompute every costing summary and persist ``Pricing``/``totals``.
+
+    Summaries are streamed in ``chunk_size`` pages with their items eagerly
+    loaded, recomputed by the CEL on the shared process pool with at most
+    ``workers`` busy processes (``None`` = ``MAX_WORKERS``, ``0`` = in this
+    process, larger values are capped) and written back in bulk.
+    ``margin`` overrides every summary's margin when given. Each chunk is
+    committed (or only flushed with ``commit=False``) before ``progress`` is
+    called.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    if workers is not None and workers < 0:
+        raise ValueError("workers must not be negative")
+    workers = MAX_WORKERS if workers is None else min(workers, MAX_WORKERS)
+    total = session.scalar(select(func.count()).select_from(CostingSummary)) or 0
+    started = time.perf_counter()
+    done = 0
+    chunks = _iter_chunks(session, chunk_size)
+    if workers == 0:
+        results = (_reprice_chunk(chunk, margin) for chunk in chunks)
+    else:
+        # At most ``workers`` chunks are in flight, so one call never holds
+        # more processes than it asked for; the pool outlives the call.
+        results = _pipelined(shared_executor(), chunks, margin, depth=workers)
+    for rows in results:
+        _write_results(session, rows)
+        if commit:
+            session.commit()
+        else:
+            session.flush()
+        done += len(rows)
+        if progress is not None:
+            progress(RepriceProgress(done, total, time.perf_counter() - started))
+    return RepriceProgress(done, total, time.perf_counter() - started)
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, List, Mapping, Tuple
+
+import numpy as np
+
+from .cache import LRUCache
+from .money import to_fixed
+from .system_options import Catalog, PricingTable, PricingValidationError, current_catalog
+
+DEFAULT_SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 1000
+SEARCH_ORDERS = ("asc", "desc")
+
+# Keys of an object constraint; a bare value means ``in: [value]`` and a
+# list means ``in: list``. ``min``/``max`` compare numbers by value and
+# enum options by their position in the dropdown (e.g. Tall or higher).
+CONSTRAINT_KEYS = frozenset({"in", "not_in", "min", "max"})
+
+
+class SearchIndex:
+    """Rows of a catalog's ``PricingTable`` sorted by grand total.
+
+    ``positions[i, f]`` is the option position of priced field ``f`` in the
+    ``i``-th cheapest configuration, so field constraints become boolean
+    lookups over whole columns and total bounds become a ``searchsorted``
+    slice of the sorted totals.
+    """
+
+    def __init__(self, table: PricingTable):
+        self.table = table
+        self.order = np.argsort(table.grand_total, kind="stable")
+        self.grand_total = table.grand_total[self.order]
+        self.positions = np.stack(
+            [(self.order // stride) % len(positions) for positions, stride in zip(table._positions, table._strides)],
+            axis=1,
+        )
+
+    def matches(self, allowed: Mapping[int, "np.ndarray"], min_total: int | None, max_total: int | None) -> "np.ndarray":
+        """Sorted-index positions satisfying every column mask and total bound."""
+        lo = 0 if min_total is None else int(np.searchsorted(self.grand_total, min_total, side="left"))
+        hi = len(self.order) if max_total is None else int(np.searchsorted(self.grand_total, max_total, side="right"))
+        if hi <= lo:
+            return np.empty(0, dtype=np.intp)
+        mask = np.ones(hi - lo, dtype=bool)
+        for column, column_allowed in allowed.items():
+            mask &= column_allowed[self.positions[lo:hi, column]]
+        return np.flatnonzero(mask) + lo
+
+
+_SEARCH_INDEXES: LRUCache[SearchIndex] = LRUCache(4)
+
+
+def search_index(catalog: Catalog | None = None) -> SearchIndex:
+    """The sorted index for ``catalog`` (default: active), built once per version."""
+    catalog = catalog or current_catalog()
+    index = _SEARCH_INDEXES.get(catalog.version)
+    if index is None:
+        index = SearchIndex(catalog.pricing_table)
+        _SEARCH_INDEXES.put(catalog.version, index)
+    return index
+
+
+def _allowed_options(catalog: Catalog, field: str, constraint: Any) -> List[bool]:
+    """Per dropdown option, whether ``constraint`` admits it."""
+    dropdown = catalog.dropdown_map.get(field)
+    if dropdown is None:
+        raise PricingValidationError(f"unknown field: {field}", field)
+    options = dropdown.options
+    if isinstance(constraint, Mapping):
+        rules = constraint
+    elif isinstance(constraint, list):
+        rules = {"in": constraint}
+    else:
+        rules = {"in": [constraint]}
+    if not rules or set(rules) - CONSTRAINT_KEYS:
+        raise PricingValidationError(f"constraint for {field} must use {', '.join(sorted(CONSTRAINT_KEYS))}", field)
+
+    def checked(values: object) -> List[object]:
+        if not isinstance(values, list) or any(isinstance(v, bool) or v not in options for v in values):
+            raise PricingValidationError(f"invalid enum for {field}", field)
+        return values
+
+    allowed = [True] * len(options)
+    if "in" in rules:
+        values = checked(rules["in"])
+        allowed = [ok and option in values for ok, option in zip(allowed, options)]
+    if "not_in" in rules:
+        values = checked(rules["not_in"])
+        allowed = [ok and option not in values for ok, option in zip(allowed, options)]
+    numeric = field in catalog.numeric_fields
+    for bound, keep in (("min", lambda a, b: a >= b), ("max", lambda a, b: a <= b)):
+        if bound not in rules:
+            continue
+        limit = rules[bound]
+        if numeric:
+            if isinstance(limit, bool) or not isinstance(limit, (int, float)):
+                raise PricingValidationError(f"{bound} for {field} must be a number", field)
+            allowed = [ok and keep(option, limit) for ok, option in zip(allowed, options)]
+        else:
+            position = options.index(checked([limit])[0])
+            allowed = [ok and keep(pos, position) for pos, ok in enumerate(allowed)]
+    return allowed
+
+
+def _total_bound(payload: Mapping[str, Any], key: str) -> int | None:
+    value = payload.get(key)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise PricingValidationError(f"{key} must be a number", key)
+    return to_fixed(value)
+
+
+def search_configurations(
+    payload: Mapping[str, Any], catalog: Catalog | None = None
+) -> Tuple[int, Iterator[Dict[str, Any]]]:
+    """Find configurations matching ``payload`` ranked by grand total.
+
+    ``payload`` holds ``constraints`` (field -> value, list or object with
+    ``in``/``not_in``/``min``/``max``), optional ``min_total``/``max_total``,
+    ``limit`` and ``order`` (``"asc"`` cheapest first, ``"desc"`` most
+    expensive first). Returns the number of matches and a lazy iterator of
+    up to ``limit`` ``{"rank", "inputs", "pricing"}`` results.
+    """
+    catalog = catalog or current_catalog()
+    constraints = payload.get("constraints") or {}
+    if not isinstance(constraints, Mapping):
+        raise PricingValidationError("constraints must be an object", "constraints")
+    limit = payload.get("limit", DEFAULT_SEARCH_LIMIT)
+    if isinstance(limit, bool) or not isinstance(limit, int) or not 1 <= limit <= MAX_SEARCH_LIMIT:
+        raise PricingValidationError(f"limit must be an integer from 1 to {MAX_SEARCH_LIMIT}", "limit")
+    order = payload.get("order", "asc")
+    if order not in SEARCH_ORDERS:
+        raise PricingValidationError("order must be asc or desc", "order")
+    min_total = _total_bound(payload, "min_total")
+    max_total = _total_bound(payload, "max_total")
+
+    index = search_index(catalog)
+    table = index.table
+    columns = {field: column for column, field in enumerate(table.fields)}
+    allowed: Dict[int, "np.ndarray"] = {}
+    # Fields that do not affect price are echoed with the default (or first
+    # allowed) option; an unsatisfiable one rules out every configuration.
+    fixed: Dict[str, str | int] = {}
+    satisfiable = True
+    for field, constraint in constraints.items():
+        options_allowed = _allowed_options(catalog, field, constraint)
+        if field in columns:
+            allowed[columns[field]] = np.array(options_allowed, dtype=bool)
+            continue
+        options = catalog.dropdown_map[field].options
+        default = catalog.dropdown_map[field].default
+        choices = [option for option, ok in zip(options, options_allowed) if ok]
+        if not choices:
+            satisfiable = False
+        else:
+            fixed[field] = default if default in choices else choices[0]
+    unpriced = {
+        dropdown.id: fixed.get(dropdown.id, dropdown.default)
+        for dropdown in catalog.dropdowns
+        if dropdown.id not in columns
+    }
+
+    matches = index.matches(allowed, min_total, max_total) if satisfiable else np.empty(0, dtype=np.intp)
+    selected = matches[:limit] if order == "asc" else matches[::-1][:limit]
+    rows = index.order[selected].tolist()
+
+    def results() -> Iterator[Dict[str, Any]]:
+        for rank, row in enumerate(rows, start=1):
+            yield {"rank": rank, "inputs": {**unpriced, **table.inputs(row)}, "pricing": table.payload(row)}
+
+    return len(matches), results()
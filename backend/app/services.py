@@ -1,11 +1,22 @@
 from __future__ import annotations
 
+import math
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload
 
-from .cel import CostingEmulationLayer, ensure_costing_summary
+from .cel import (
+    GOAL_SELL_PRICE,
+    GOALS,
+    ROLLUP_SNAPSHOTS,
+    TOGGLE_BITS,
+    CostingEmulationLayer,
+    costing_summary_for_read,
+    ensure_costing_summary,
+    solve_linear_margins,
+)
 from .models import CostingItem, CostingSummary, Pricing, RDSInput, UsageLog
 from .excel import CostingWorkbookWriter
 from .word import ProposalWriter
@@ -46,8 +57,20 @@ class RDSService:
     def __init__(self, session: Session):
         self.session = session
 
+    def load_quote(self, quote_number: str) -> RDSInput | None:
+        """Fetch a quote with its pricing, summary and items in a single SELECT."""
+        statement = (
+            select(RDSInput)
+            .where(RDSInput.quote_number == quote_number)
+            .options(
+                joinedload(RDSInput.pricing),
+                joinedload(RDSInput.costing_summary).joinedload(CostingSummary.items),
+            )
+        )
+        return self.session.scalars(statement).unique().one_or_none()
+
     def get_or_create_quote(self, quote_number: str, defaults: Dict[str, Any] | None = None) -> RDSInput:
-        quote = self.session.query(RDSInput).filter_by(quote_number=quote_number).one_or_none()
+        quote = self.load_quote(quote_number)
         if quote is None:
             quote = RDSInput(quote_number=quote_number, data=defaults or {}, customer=None)
             self.session.add(quote)
@@ -66,19 +89,30 @@ class RDSService:
 
     def recompute_costing(self, quote: RDSInput, margin: float | None = None) -> Dict[str, Any]:
         summary = ensure_costing_summary(self.session, quote)
-        layer = CostingEmulationLayer(self.session, summary)
-        result = layer.recompute(margin)
+        if margin is None:
+            margin = summary.margin
+        result = ROLLUP_SNAPSHOTS.get(summary, margin)
+        if result is None:
+            result = CostingEmulationLayer(self.session, summary).recompute(margin)
+            ROLLUP_SNAPSHOTS.put(summary, margin, result)
+        else:
+            # Nothing changed since the snapshot: re-apply it instead of rebuilding the layer.
+            summary.margin = result.margin
+            summary.totals = result.summary_values.to_dict()
+            if summary.toggles != result.toggles:
+                summary.toggles = result.toggles
         pricing = quote.pricing
         if pricing is None:
             pricing = Pricing(rds_input=quote)
-        pricing.subtotal = result.summary_values.get("base_total", 0.0)
+        totals = result.summary_values.to_dict()
+        pricing.subtotal = totals["base_total"]
         pricing.margin = result.margin
-        pricing.total = result.summary_values.get("sell_price", 0.0)
-        pricing.data = result.summary_values
+        pricing.total = totals["sell_price"]
+        pricing.data = totals
         self.session.add(pricing)
         self.session.flush()
         return {
-            "totals": result.summary_values,
+            "totals": totals,
             "margin": result.margin,
             "toggles": result.toggles,
         }
@@ -99,11 +133,104 @@ class RDSService:
         CostingEmulationLayer.set_toggle(summary, cell, value)
         return self.recompute_costing(quote)
 
+    def toggle_what_if(self, quote: RDSInput, without: Iterable[str] = (), margin: float | None = None) -> Dict[str, Any]:
+        """Price every toggle combination without persisting anything."""
+        summary = costing_summary_for_read(quote)
+        scenarios = CostingEmulationLayer(None, summary).what_if(margin)
+        without = list(without)
+        return {
+            "mask": scenarios.current_mask,
+            "margin": scenarios.margin,
+            "base_total": scenarios.base_total,
+            "without": without,
+            "sell_price": scenarios.without(*without),
+            "delta": scenarios.delta(*without),
+            "toggles": list(TOGGLE_BITS),
+            "scenarios": scenarios.sell_price.tolist(),
+        }
+
+    def margin_sweep(self, quote: RDSInput, margins: Iterable[float]) -> Dict[str, Any]:
+        """Sell price curve over ``margins`` without touching ``Pricing`` rows."""
+        summary = costing_summary_for_read(quote)
+        margins = list(margins)
+        sell_prices = CostingEmulationLayer(None, summary).margin_sweep(margins)
+        return {
+            "margin": summary.margin,
+            "margins": margins,
+            "sell_price": sell_prices.tolist(),
+        }
+
+    def goal_seek(self, targets: Mapping[str, float], goal: str = GOAL_SELL_PRICE) -> List[Dict[str, Any]]:
+        """Solve for the margin that hits each quote's target; nothing is persisted.
+
+        Quotes whose rollup is linear in margin are solved together with one
+        vectorised closed-form inverse; the rest fall back to ``solve_margin``.
+        """
+        if goal not in GOALS:
+            raise ValueError(f"Unsupported goal: {goal}")
+        # One SELECT for every quote, its summary and items, however many targets.
+        statement = (
+            select(RDSInput)
+            .where(RDSInput.quote_number.in_(list(targets)))
+            .options(joinedload(RDSInput.costing_summary).joinedload(CostingSummary.items))
+        )
+        quotes = {quote.quote_number: quote for quote in self.session.scalars(statement).unique()}
+        margins: Dict[str, float] = {}
+        linear: List[Tuple[str, float, float]] = []
+        for quote_number, quote in quotes.items():
+            layer = CostingEmulationLayer(None, costing_summary_for_read(quote))
+            if layer.margin_is_linear:
+                at_zero, at_one = layer.goal_curve(goal)([0.0, 1.0])
+                linear.append((quote_number, at_zero, at_one))
+            else:
+                margins[quote_number] = layer.goal_seek(targets[quote_number], goal)
+        if linear:
+            numbers, at_zero, at_one = zip(*linear)
+            solved = solve_linear_margins(at_zero, at_one, [targets[number] for number in numbers])
+            margins.update(zip(numbers, solved.tolist()))
+
+        results: List[Dict[str, Any]] = []
+        for quote_number, target in targets.items():
+            entry: Dict[str, Any] = {"quote_number": quote_number, "goal": goal, "target": target}
+            if quote_number not in quotes:
+                entry["error"] = "not found"
+            else:
+                margin = margins[quote_number]
+                entry["margin"] = None if math.isnan(margin) else margin
+            results.append(entry)
+        return results
+
     def append_usage(self, quote: RDSInput | None, event: str, payload: Dict[str, Any]) -> None:
         log = UsageLog(rds_input=quote, event=event, payload=payload)
         self.session.add(log)
         self.session.flush()
 
+    @staticmethod
+    def quote_detail(quote: RDSInput) -> Dict[str, Any]:
+        """Response DTO for ``/api/quote/<quote_number>`` built from the loaded graph.
+
+        Reads only attributes ``load_quote`` already fetched, so it issues no
+        further queries.
+        """
+        pricing = quote.pricing
+        summary = quote.costing_summary
+        return {
+            "quote_number": quote.quote_number,
+            "customer": quote.customer,
+            "inputs": quote.data,
+            "pricing": {
+                "base_total": pricing.subtotal if pricing else 0.0,
+                "margin": pricing.margin if pricing else 0.0,
+                "sell_price": pricing.total if pricing else 0.0,
+                "raw": pricing.data if pricing else {},
+            },
+            "summary": {
+                "margin": summary.margin if summary else None,
+                "toggles": summary.toggles if summary else {},
+                "totals": summary.totals if summary else {},
+            },
+        }
+
     def summary_as_dict(self, quote: RDSInput) -> Dict[str, Any]:
         summary = ensure_costing_summary(self.session, quote)
         return {
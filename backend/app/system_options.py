@@ -1,12 +1,31 @@
 from __future__ import annotations
 
+import gzip
+import hashlib
+import json
+import logging
+import re
+import time
 from dataclasses import dataclass
 from decimal import Decimal
-from typing import Dict, List, Mapping, Tuple
+from itertools import product
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Iterator, List, Mapping, Tuple
 
+import numpy as np
 
-CATALOG_VERSION = "v1"
-CATALOG_UPDATED_AT = "2025-09-23T00:00:00Z"
+try:  # optional brotli variant of the serialized catalog payloads
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None  # type: ignore
+
+from .money import NUMERIC_DECIMAL, NUMERIC_FIXED, from_fixed, to_fixed
+
+logger = logging.getLogger(__name__)
+
+# Shipped catalog; ``reload_catalog`` can swap in another file at runtime.
+CATALOG_PATH = Path(__file__).with_name("catalog.json")
 
 
 @dataclass(frozen=True)
@@ -31,264 +50,734 @@ class Dropdown:
         return payload
 
 
-DROPDOWNS: Tuple[Dropdown, ...] = (
-    Dropdown(
-        id="sys.infeed_orientation",
-        label="Infeed Orientation",
-        options=("Left", "Centered", "Right"),
-        default="Centered",
-        source={"type": "range", "ref": "Sheet2!A2:A4"},
-        tooltip="Select orientation for illustration placement",
-    ),
-    Dropdown(
-        id="sys.spare_parts_qty",
-        label="Spare Parts Package",
-        options=(0, 1),
-        default=1,
-        source={"type": "inline", "ref": ""},
-        tooltip="# of spare parts packages",
-    ),
-    Dropdown(
-        id="sys.spare_saw_blades_qty",
-        label="Spare Saw Blades",
-        options=(0, 10, 20, 30, 40, 50),
-        default=20,
-        source={"type": "inline", "ref": ""},
-        tooltip="packs of 10 blades",
-    ),
-    Dropdown(
-        id="sys.spare_foam_pads_qty",
-        label="Spare Foam Pads",
-        options=(0, 10, 20, 30, 40, 50),
-        default=0,
-        source={"type": "inline", "ref": ""},
-        tooltip="packs of 10 foam pads",
-    ),
-    Dropdown(
-        id="sys.guarding",
-        label="Guarding",
-        options=("Standard", "Tall", "Tall w/ Netting"),
-        default="Standard",
-        source={"type": "inline", "ref": ""},
-        tooltip="Choose guarding height/netting",
-    ),
-    Dropdown(
-        id="sys.feeding_funneling",
-        label="Feeding USL/Badger",
-        options=("No", "Front USL", "Front Badger", "Side USL", "Side Badger"),
-        default="No",
-        source={"type": "inline", "ref": ""},
-        tooltip="Select funneling style",
-    ),
-    Dropdown(
-        id="sys.transformer",
-        label="Transformer",
-        options=("None", "Canada", "Step Up"),
-        default="None",
-        source={"type": "inline", "ref": ""},
-        tooltip="Select transformer type",
-    ),
-    Dropdown(
-        id="sys.training_lang",
-        label="Training",
-        options=("English", "English & Spanish"),
-        default="English",
-        source={"type": "inline", "ref": ""},
-        tooltip="Training language",
-    ),
-)
-
-
-DROPDOWN_MAP: Dict[str, Dropdown] = {dropdown.id: dropdown for dropdown in DROPDOWNS}
-
-REQUIRED_FIELDS: Tuple[str, ...] = (
-    "sys.spare_parts_qty",
-    "sys.spare_saw_blades_qty",
-    "sys.spare_foam_pads_qty",
-    "sys.guarding",
-    "sys.feeding_funneling",
-    "sys.transformer",
-    "sys.training_lang",
-)
-
-NUMERIC_FIELDS: Tuple[str, ...] = (
-    "sys.spare_parts_qty",
-    "sys.spare_saw_blades_qty",
-    "sys.spare_foam_pads_qty",
-)
+class PricingValidationError(ValueError):
+    """Invalid pricing input; ``errors`` lists every failing field.
 
+    ``str(exc)`` and ``field`` describe the first error.
+    """
 
-class PricingValidationError(ValueError):
-    def __init__(self, message: str, field: str | None = None):
+    def __init__(self, message: str, field: str | None = None, errors: List[Dict[str, str | None]] | None = None):
         super().__init__(message)
         self.field = field
+        self.errors = errors if errors is not None else [{"field": field, "error": message}]
 
 
-BASE_PRICE = Decimal("414320.82")
-UNIT_PRICES: Dict[str, Decimal] = {
-    "opt.spare_parts": Decimal("10069"),
-    "opt.saw_blades": Decimal("155"),
-    "opt.foam_pads": Decimal("224"),
-    "opt.guarding_tall": Decimal("10672.24"),
-    "opt.guarding_tall_net": Decimal("12067.8917"),
-    "opt.feeding_front": Decimal("3429.7074"),
-    "opt.feeding_side_usl": Decimal("5205.7466"),
-    "opt.feeding_side_badger": Decimal("5205.7466"),
-    "opt.transformer_canada": Decimal("10651.258"),
-    "opt.transformer_step": Decimal("6401.453"),
-    "opt.training_spanish": Decimal("0"),
-}
+@dataclass(frozen=True)
+class SerializedPayload:
+    """JSON bytes of a payload plus compressed variants and a strong ETag."""
+
+    body: bytes
+    encodings: Mapping[str, bytes]
+    etag: str
+
+    @classmethod
+    def build(cls, payload: Mapping[str, object]) -> "SerializedPayload":
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        encodings = {"gzip": gzip.compress(body, mtime=0)}
+        if brotli is not None:
+            encodings["br"] = brotli.compress(body)
+        return cls(body, encodings, hashlib.sha256(body).hexdigest()[:32])
+
+    def etag_for(self, encoding: str | None) -> str:
+        """Per-representation ETag: compressed bodies are distinct variants."""
+        return f"{self.etag}-{encoding}" if encoding else self.etag
+
+
+_CELL_RE = re.compile(r"^([A-Z]+)(\d+)$")
+
+
+def _column_number(letters: str) -> int:
+    number = 0
+    for char in letters:
+        number = number * 26 + ord(char) - 64
+    return number
+
+
+def _spec_range_values(spec: Mapping[str, Any], ref: str) -> List[str]:
+    """Non-empty values of an ``Sheet!A1:B2`` range in an ingested RDS spec."""
+    sheet, _, cells = ref.replace("$", "").partition("!")
+    start, _, end = cells.partition(":")
+    first, last = _CELL_RE.match(start.upper()), _CELL_RE.match((end or start).upper())
+    if first is None or last is None:
+        raise ValueError(f"Unsupported range source: {ref}")
+    columns = range(_column_number(first.group(1)), _column_number(last.group(1)) + 1)
+    rows = range(int(first.group(2)), int(last.group(2)) + 1)
+    values: List[str] = []
+    for row in spec["sheets"][sheet]["rows"]:
+        for cell in row:
+            match = _CELL_RE.match(cell.get("ref") or "")
+            if match and _column_number(match.group(1)) in columns and int(match.group(2)) in rows and cell.get("value"):
+                values.append(cell["value"])
+    return values
+
+
+# Markers used by the compiled validator.
+_REQUIRED = object()
+_INVALID = object()
+
+# An option line: (option id, quantity).
+OptionLine = Tuple[str, int]
+
+# ``qty`` of a rule that prices the selected value itself as the quantity.
+QTY_FROM_VALUE = "value"
+
+
+def _compile_rules(
+    rules: List[Mapping[str, Any]],
+    dropdown_map: Mapping[str, Dropdown],
+    unit_prices: Mapping[str, Decimal],
+) -> Tuple[Dict[str, Dict[str | int, Tuple[OptionLine, ...]]], Dict[str, Tuple[str, ...]]]:
+    """Compile the catalog's option rules into per-field dispatch dicts.
+
+    A rule maps a field (optionally only some of its ``values``) to an option
+    with a fixed ``qty`` or ``"value"`` to use the selected value as the
+    quantity. Lines are precomputed for every dropdown value; the second
+    mapping keeps the ``"value"`` rules for inputs outside the dropdown.
+    """
+    dispatch: Dict[str, Dict[str | int, List[OptionLine]]] = {}
+    value_rules: Dict[str, List[str]] = {}
+    for rule in rules:
+        field, option_id, qty = rule["field"], rule["option"], rule["qty"]
+        if field not in dropdown_map:
+            raise ValueError(f"Option rule for unknown field: {field}")
+        if option_id not in unit_prices:
+            raise ValueError(f"Option rule for unknown option: {option_id}")
+        if qty != QTY_FROM_VALUE and (isinstance(qty, bool) or not isinstance(qty, int)):
+            raise ValueError(f"Unsupported qty for {option_id}: {qty!r}")
+        lines = dispatch.setdefault(field, {value: [] for value in dropdown_map[field].options})
+        for value in rule.get("values", dropdown_map[field].options):
+            if value not in lines:
+                raise ValueError(f"Option rule value {value!r} is not an option of {field}")
+            line_qty = int(value) if qty == QTY_FROM_VALUE else qty
+            if line_qty:
+                lines[value].append((option_id, line_qty))
+        if qty == QTY_FROM_VALUE and "values" not in rule:
+            value_rules.setdefault(field, []).append(option_id)
+    compiled = {field: {value: tuple(found) for value, found in lines.items()} for field, lines in dispatch.items()}
+    return compiled, {field: tuple(options) for field, options in value_rules.items()}
+
+
+class Catalog:
+    """One immutable catalog version plus everything derived from it.
+
+    ``version`` is a content hash of the resolved catalog, so any change to
+    prices, labels or options yields a new version. Payloads, fixed-point
+    prices and the pricing table are built once per instance.
+    """
+
+    def __init__(self, data: Mapping[str, Any], spec: Mapping[str, Any] | None = None):
+        dropdowns = []
+        for entry in data["dropdowns"]:
+            entry = dict(entry)
+            source = entry.get("source") or {}
+            if spec is not None and source.get("type") == "range":
+                options = _spec_range_values(spec, source["ref"])
+                if options:
+                    entry["options"] = options
+                    if entry.get("default") not in options:
+                        entry["default"] = options[0]
+            dropdowns.append(entry)
+        resolved = {**data, "dropdowns": dropdowns}
+        canonical = json.dumps(resolved, sort_keys=True, separators=(",", ":"))
+        self.data: Dict[str, Any] = json.loads(canonical)
+        self.version = hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+        self.updated_at: str = resolved["updatedAt"]
+
+        self.dropdowns: Tuple[Dropdown, ...] = tuple(
+            Dropdown(
+                id=entry["id"],
+                label=entry["label"],
+                options=tuple(entry["options"]),
+                default=entry["default"],
+                source=dict(entry.get("source") or {}),
+                tooltip=entry.get("tooltip"),
+            )
+            for entry in dropdowns
+        )
+        self.dropdown_map: Dict[str, Dropdown] = {dropdown.id: dropdown for dropdown in self.dropdowns}
+        self.required_fields: Tuple[str, ...] = tuple(resolved["requiredFields"])
+        self.numeric_fields: Tuple[str, ...] = tuple(resolved["numericFields"])
+
+        self.base_price = Decimal(resolved["basePrice"])
+        self.default_margin = Decimal(resolved["defaultMargin"])
+        self.unit_prices: Dict[str, Decimal] = {option["id"]: Decimal(option["unitPrice"]) for option in resolved["options"]}
+        self.option_labels: Dict[str, str] = {option["id"]: option["label"] for option in resolved["options"]}
+        self.option_rules, self._value_rules = _compile_rules(resolved["rules"], self.dropdown_map, self.unit_prices)
+        self._rule_dispatch = tuple(self.option_rules.items())
+        self.price_per_qty: Dict[str, Decimal] = {
+            key: self.unit_prices[entry["option"]] * Decimal(entry["qty"])
+            for key, entry in resolved["pricePerQty"].items()
+        }
 
-OPTION_LABELS: Dict[str, str] = {
-    "opt.spare_parts": "Spare Parts Package",
-    "opt.saw_blades": "Spare Saw Blades",
-    "opt.foam_pads": "Spare Foam Pads",
-    "opt.guarding_tall": "Taller Guarding",
-    "opt.guarding_tall_net": "Taller Guarding and Netting",
-    "opt.feeding_front": "Front Funneling USL/Badger",
-    "opt.feeding_side_usl": "Side Funneling USL",
-    "opt.feeding_side_badger": "Side Funneling Badger",
-    "opt.transformer_canada": "Canada Transformer",
-    "opt.transformer_step": "Step Up Transformer",
-    "opt.training_spanish": "Spanish Training",
-}
+        # Integer fixed-point mirrors of the Decimal prices (see ``money``).
+        # Catalog prices carry at most four decimals, so these are exact.
+        self.base_price_fixed = to_fixed(self.base_price)
+        self.unit_prices_fixed: Dict[str, int] = {
+            option_id: to_fixed(price) for option_id, price in self.unit_prices.items()
+        }
+        self.base_price_float = float(self.base_price)
+        self.default_margin_float = float(self.default_margin)
+        self.price_per_qty_floats = {key: float(value) for key, value in self.price_per_qty.items()}
+
+        self.payload: Dict[str, object] = {
+            "version": self.version,
+            "updatedAt": self.updated_at,
+            "dropdowns": [dropdown.to_dict() for dropdown in self.dropdowns],
+        }
+        self.dropdown_payloads: Dict[str, Dict[str, object]] = {
+            dropdown.id: {**dropdown.to_dict(), "version": self.version, "updatedAt": self.updated_at}
+            for dropdown in self.dropdowns
+        }
+
+        self.payload_serialized = SerializedPayload.build(self.payload)
+        self.dropdown_serialized: Dict[str, SerializedPayload] = {
+            dropdown_id: SerializedPayload.build(payload) for dropdown_id, payload in self.dropdown_payloads.items()
+        }
 
-PRICE_PER_QTY: Dict[str, Decimal] = {
-    "parts": UNIT_PRICES["opt.spare_parts"],
-    "blades": UNIT_PRICES["opt.saw_blades"] * Decimal(10),
-    "pads": UNIT_PRICES["opt.foam_pads"] * Decimal(10),
+        # Validation plan: (field, numeric, allowed values, default or _REQUIRED)
+        # for the required fields, then the optional dropdowns with defaults.
+        fields = self.required_fields + tuple(d.id for d in self.dropdowns if d.id not in self.required_fields)
+        self._validators: Tuple[Tuple[str, bool, frozenset | None, object], ...] = tuple(
+            (
+                field,
+                field in self.numeric_fields,
+                frozenset(self.dropdown_map[field].options) if field in self.dropdown_map else None,
+                _REQUIRED if field in self.required_fields else self.dropdown_map[field].default,
+            )
+            for field in fields
+        )
+        self.input_fields: Tuple[str, ...] = fields
+        self._input_index: Dict[str, int] = {field: position for position, field in enumerate(fields)}
+        # Option positions for configuration keys (see ``configuration_key``).
+        self._input_positions: Tuple[Dict[object, int], ...] = tuple(
+            {value: pos for pos, value in enumerate(self.dropdown_map[field].options)} for field in fields
+        )
+
+        self._table: PricingTable | None = None
+        self._table_lock = Lock()
+
+    @classmethod
+    def from_file(cls, path: Path, spec_path: Path | None = None) -> "Catalog":
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        spec = json.loads(Path(spec_path).read_text(encoding="utf-8")) if spec_path else None
+        return cls(data, spec)
+
+    @property
+    def pricing_table(self) -> "PricingTable":
+        """Precomputed table for this version, built on first use."""
+        if self._table is None:
+            with self._table_lock:
+                if self._table is None:
+                    self._table = PricingTable(self)
+        return self._table
+
+
+# Seconds between checks of the active catalog's files for changes.
+CATALOG_CHECK_INTERVAL = 2.0
+
+
+def _source_stamp(path: Path, spec_path: Path | None) -> Tuple[Tuple[int, int] | None, ...]:
+    stamps = []
+    for source in (path, spec_path):
+        try:
+            stat = source.stat() if source is not None else None
+        except OSError:
+            stat = None
+        stamps.append((stat.st_mtime_ns, stat.st_size) if stat is not None else None)
+    return tuple(stamps)
+
+
+_ACTIVE_SOURCE: Tuple[Path, Path | None] = (CATALOG_PATH, None)
+_ACTIVE_STAMP = _source_stamp(*_ACTIVE_SOURCE)
+_ACTIVE_CATALOG = Catalog.from_file(CATALOG_PATH)
+_NEXT_CHECK = time.monotonic() + CATALOG_CHECK_INTERVAL
+# Stamp of source files that failed to load, so each bad edit is logged once.
+_FAILED_STAMP: Tuple | None = None
+_RELOAD_LOCK = Lock()
+
+
+def current_catalog() -> Catalog:
+    """The active catalog; grab it once per request for a consistent view.
+
+    Every ``CATALOG_CHECK_INTERVAL`` seconds the active catalog's files are
+    checked and reloaded if they changed, so each worker process picks up a
+    catalog edited on disk even when ``reload_catalog`` ran in another one.
+    """
+    if time.monotonic() >= _NEXT_CHECK:
+        _check_sources()
+    return _ACTIVE_CATALOG
+
+
+def _check_sources() -> None:
+    global _NEXT_CHECK, _FAILED_STAMP
+    if not _RELOAD_LOCK.acquire(blocking=False):
+        return  # another thread is already checking or reloading
+    try:
+        _NEXT_CHECK = time.monotonic() + CATALOG_CHECK_INTERVAL
+        stamp = _source_stamp(*_ACTIVE_SOURCE)
+        if stamp != _ACTIVE_STAMP and stamp != _FAILED_STAMP:
+            try:
+                _activate(*_ACTIVE_SOURCE)
+            except (OSError, ValueError, KeyError):
+                # Keep serving the loaded catalog until the file is valid again.
+                _FAILED_STAMP = stamp
+                logger.exception(
+                    "Catalog reload from %s failed; still serving version %s",
+                    _ACTIVE_SOURCE[0],
+                    _ACTIVE_CATALOG.version,
+                )
+    finally:
+        _RELOAD_LOCK.release()
+
+
+def _activate(path: Path, spec_path: Path | None) -> Catalog:
+    global _ACTIVE_CATALOG, _ACTIVE_SOURCE, _ACTIVE_STAMP
+    stamp = _source_stamp(path, spec_path)
+    catalog = Catalog.from_file(path, spec_path)
+    catalog.pricing_table
+    _ACTIVE_CATALOG, _ACTIVE_SOURCE, _ACTIVE_STAMP = catalog, (path, spec_path), stamp
+    return catalog
+
+
+def reload_catalog(path: Path | str | None = None, spec_path: Path | str | None = None) -> Catalog:
+    """Load a catalog file and atomically make it the active catalog.
+
+    The new catalog (and its pricing table) is fully built before the swap,
+    so concurrent requests see either the old or the new version, never a mix.
+    The swap is per process: other workers serving the same files follow
+    within ``CATALOG_CHECK_INTERVAL`` via ``current_catalog``, but a path
+    passed here only takes effect in this process (configure it through
+    ``CATALOG_PATH`` so every worker loads it in ``create_app``).
+    """
+    with _RELOAD_LOCK:
+        return _activate(Path(path or CATALOG_PATH), Path(spec_path) if spec_path else None)
+
+
+def configure_catalog(path: Path | str | None = None, spec_path: Path | str | None = None) -> Catalog:
+    """Make the given files the active catalog unless they already are."""
+    source = (Path(path or CATALOG_PATH), Path(spec_path) if spec_path else None)
+    if source != _ACTIVE_SOURCE:
+        return reload_catalog(*source)
+    return current_catalog()
+
+
+# Module attributes kept for callers of the former constants; they always
+# reflect the active catalog.
+_CATALOG_ATTRIBUTES = {
+    "CATALOG_VERSION": "version",
+    "CATALOG_UPDATED_AT": "updated_at",
+    "DROPDOWNS": "dropdowns",
+    "DROPDOWN_MAP": "dropdown_map",
+    "REQUIRED_FIELDS": "required_fields",
+    "NUMERIC_FIELDS": "numeric_fields",
+    "BASE_PRICE": "base_price",
+    "UNIT_PRICES": "unit_prices",
+    "OPTION_LABELS": "option_labels",
+    "PRICE_PER_QTY": "price_per_qty",
+    "DEFAULT_MARGIN": "default_margin",
+    "BASE_PRICE_FIXED": "base_price_fixed",
+    "UNIT_PRICES_FIXED": "unit_prices_fixed",
 }
 
-DEFAULT_MARGIN = Decimal("0.24")
 
+def __getattr__(name: str) -> Any:
+    try:
+        return getattr(_ACTIVE_CATALOG, _CATALOG_ATTRIBUTES[name])
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
 
-def catalog_payload() -> Dict[str, object]:
-    return {
-        "version": CATALOG_VERSION,
-        "updatedAt": CATALOG_UPDATED_AT,
-        "dropdowns": [dropdown.to_dict() for dropdown in DROPDOWNS],
-    }
 
+def catalog_payload(catalog: Catalog | None = None) -> Dict[str, object]:
+    return (catalog or current_catalog()).payload
 
-def dropdown_payload(dropdown_id: str) -> Dict[str, object] | None:
-    dropdown = DROPDOWN_MAP.get(dropdown_id)
-    if dropdown is None:
-        return None
-    payload = dropdown.to_dict()
-    payload["version"] = CATALOG_VERSION
-    payload["updatedAt"] = CATALOG_UPDATED_AT
-    return payload
 
+def dropdown_payload(dropdown_id: str, catalog: Catalog | None = None) -> Dict[str, object] | None:
+    return (catalog or current_catalog()).dropdown_payloads.get(dropdown_id)
 
-def _coerce_value(field: str, value: object) -> str | int:
-    if field in NUMERIC_FIELDS:
-        if isinstance(value, bool):  # guard against True/False
-            raise PricingValidationError(f"invalid enum for {field}", field)
-        try:
-            numeric = int(value)
-        except (TypeError, ValueError):
-            raise PricingValidationError(f"invalid enum for {field}", field) from None
-        return numeric
-    if not isinstance(value, str):
-        raise PricingValidationError(f"invalid enum for {field}", field)
-    return value
 
+class ValidatedInputs(Mapping[str, Any]):
+    """Frozen, hashable ``{field: value}`` view of validated pricing inputs.
 
-def validate_inputs(payload: Mapping[str, object]) -> Dict[str, str | int]:
-    if "inputs" not in payload or not isinstance(payload["inputs"], Mapping):
-        raise PricingValidationError("inputs must be an object", "inputs")
-    inputs_raw = payload["inputs"]
-    validated: Dict[str, str | int] = {}
-
-    for field in REQUIRED_FIELDS:
-        if field not in inputs_raw:
-            raise PricingValidationError(f"missing field: {field}", field)
-        validated[field] = _coerce_value(field, inputs_raw[field])
-
-    optional_orientation = inputs_raw.get("sys.infeed_orientation", DROPDOWN_MAP["sys.infeed_orientation"].default)
-    if optional_orientation not in DROPDOWN_MAP["sys.infeed_orientation"].options:
-        raise PricingValidationError("invalid enum for sys.infeed_orientation", "sys.infeed_orientation")
-    validated["sys.infeed_orientation"] = optional_orientation
-
-    for field, value in validated.items():
-        dropdown = DROPDOWN_MAP.get(field)
-        if dropdown and value not in dropdown.options:
-            raise PricingValidationError(f"invalid enum for {field}", field)
-
-    return validated
-
-
-def _add_option(
-    collector: List[Dict[str, object]],
-    option_id: str,
-    qty: int,
-) -> Decimal:
-    unit_price = UNIT_PRICES[option_id]
-    label = OPTION_LABELS[option_id]
-    extended = unit_price * Decimal(qty)
-    collector.append(
-        {
-            "id": option_id,
-            "label": label,
-            "unit": float(unit_price),
-            "qty": qty,
-            "extended": float(extended),
-        }
-    )
-    return extended
+    Values are stored in the catalog's ``input_fields`` order, so equal
+    configurations hash equally and can key pricing caches directly.
+    """
 
+    __slots__ = ("_fields", "_index", "_values", "_hash")
 
-def compute_pricing(inputs: Mapping[str, str | int]) -> Dict[str, object]:
-    options: List[Dict[str, object]] = []
-    options_total = Decimal("0")
+    def __init__(self, fields: Tuple[str, ...], index: Mapping[str, int], values: Tuple[str | int, ...]):
+        self._fields = fields
+        self._index = index
+        self._values = values
+        self._hash = hash((fields, values))
 
-    spare_parts_qty = int(inputs["sys.spare_parts_qty"])
-    if spare_parts_qty:
-        options_total += _add_option(options, "opt.spare_parts", spare_parts_qty)
+    def __getitem__(self, field: str) -> str | int:
+        return self._values[self._index[field]]
 
-    blades_qty = int(inputs["sys.spare_saw_blades_qty"])
-    if blades_qty:
-        options_total += _add_option(options, "opt.saw_blades", blades_qty)
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fields)
 
-    pads_qty = int(inputs["sys.spare_foam_pads_qty"])
-    if pads_qty:
-        options_total += _add_option(options, "opt.foam_pads", pads_qty)
+    def __len__(self) -> int:
+        return len(self._fields)
 
-    guarding = inputs["sys.guarding"]
-    if guarding == "Tall":
-        options_total += _add_option(options, "opt.guarding_tall", 1)
-    elif guarding == "Tall w/ Netting":
-        options_total += _add_option(options, "opt.guarding_tall_net", 1)
+    def __hash__(self) -> int:
+        return self._hash
 
-    feeding = inputs["sys.feeding_funneling"]
-    if feeding in {"Front USL", "Front Badger"}:
-        options_total += _add_option(options, "opt.feeding_front", 1)
-    elif feeding == "Side USL":
-        options_total += _add_option(options, "opt.feeding_side_usl", 1)
-    elif feeding == "Side Badger":
-        options_total += _add_option(options, "opt.feeding_side_badger", 1)
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, ValidatedInputs):
+            return self._fields == other._fields and self._values == other._values
+        if isinstance(other, Mapping):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
 
-    transformer = inputs["sys.transformer"]
-    if transformer == "Canada":
-        options_total += _add_option(options, "opt.transformer_canada", 1)
-    elif transformer == "Step Up":
-        options_total += _add_option(options, "opt.transformer_step", 1)
+    def __repr__(self) -> str:
+        return f"ValidatedInputs({dict(self)!r})"
 
-    training = inputs["sys.training_lang"]
-    if training == "English & Spanish":
-        options_total += _add_option(options, "opt.training_spanish", 1)
 
-    grand_total = BASE_PRICE + options_total
+def _coerce_value(numeric: bool, value: object) -> object:
+    """Coerce a raw input value, or return ``_INVALID``."""
+    if numeric:
+        if type(value) is int:
+            return value
+        if isinstance(value, bool):  # guard against True/False
+            return _INVALID
+        try:
+            return int(value)  # type: ignore[arg-type]
+        except (TypeError, ValueError):
+            return _INVALID
+    return value if isinstance(value, str) else _INVALID
+
+
+def validate_inputs(payload: Mapping[str, object], catalog: Catalog | None = None) -> ValidatedInputs:
+    """Validate ``payload["inputs"]`` in one pass over the compiled plan.
+
+    Raises ``PricingValidationError`` listing every invalid field; optional
+    dropdowns that are omitted take their defaults.
+    """
+    catalog = catalog or current_catalog()
+    inputs_raw = payload.get("inputs") if isinstance(payload, Mapping) else None
+    if not isinstance(inputs_raw, Mapping):
+        raise PricingValidationError("inputs must be an object", "inputs")
 
+    values: List[object] = []
+    errors: List[Dict[str, str | None]] = []
+    for field, numeric, allowed, default in catalog._validators:
+        value = inputs_raw.get(field, default)
+        if value is _REQUIRED:
+            errors.append({"field": field, "error": f"missing field: {field}"})
+            continue
+        if value is not default:
+            value = _coerce_value(numeric, value)
+        if value is _INVALID or (allowed is not None and value not in allowed):
+            errors.append({"field": field, "error": f"invalid enum for {field}"})
+            continue
+        values.append(value)
+    if errors:
+        raise PricingValidationError(errors[0]["error"], errors[0]["field"], errors)
+    return ValidatedInputs(catalog.input_fields, catalog._input_index, tuple(values))  # type: ignore[arg-type]
+
+
+def _selected_options(catalog: Catalog, inputs: Mapping[str, str | int]) -> List[OptionLine]:
+    """Return the ``(option id, qty)`` lines selected by ``inputs``."""
+    selected: List[OptionLine] = []
+    for field, dispatch in catalog._rule_dispatch:
+        value = inputs[field]
+        try:
+            selected += dispatch[value]
+        except KeyError:
+            # Outside the dropdown: only ``"value"`` quantity rules still apply.
+            quantity = int(value) if field in catalog._value_rules else 0
+            if quantity:
+                selected += [(option_id, quantity) for option_id in catalog._value_rules[field]]
+    return selected
+
+
+def _pricing_payload(
+    catalog: Catalog,
+    options: List[Dict[str, object]],
+    options_total: float,
+    grand_total: float,
+) -> Dict[str, object]:
     return {
-        "base": float(BASE_PRICE),
+        "base": catalog.base_price_float,
         "options": options,
         "totals": {
-            "options": float(options_total),
-            "grand": float(grand_total),
-            "margin": float(DEFAULT_MARGIN),
+            "options": options_total,
+            "grand": grand_total,
+            "margin": catalog.default_margin_float,
         },
         "derived": {
-            "price_per_qty": {key: float(value) for key, value in PRICE_PER_QTY.items()},
+            "price_per_qty": dict(catalog.price_per_qty_floats),
+        },
+    }
+
+
+def _compute_pricing_decimal(catalog: Catalog, inputs: Mapping[str, str | int]) -> Dict[str, object]:
+    options: List[Dict[str, object]] = []
+    options_total = Decimal("0")
+    for option_id, qty in _selected_options(catalog, inputs):
+        unit_price = catalog.unit_prices[option_id]
+        extended = unit_price * Decimal(qty)
+        options.append(
+            {
+                "id": option_id,
+                "label": catalog.option_labels[option_id],
+                "unit": float(unit_price),
+                "qty": qty,
+                "extended": float(extended),
+            }
+        )
+        options_total += extended
+    grand_total = catalog.base_price + options_total
+    return _pricing_payload(catalog, options, float(options_total), float(grand_total))
+
+
+def _compute_pricing_fixed(catalog: Catalog, inputs: Mapping[str, str | int]) -> Dict[str, object]:
+    options: List[Dict[str, object]] = []
+    options_total = 0
+    for option_id, qty in _selected_options(catalog, inputs):
+        unit_price = catalog.unit_prices_fixed[option_id]
+        extended = unit_price * qty
+        options.append(
+            {
+                "id": option_id,
+                "label": catalog.option_labels[option_id],
+                "unit": from_fixed(unit_price),
+                "qty": qty,
+                "extended": from_fixed(extended),
+            }
+        )
+        options_total += extended
+    return _pricing_payload(
+        catalog, options, from_fixed(options_total), from_fixed(catalog.base_price_fixed + options_total)
+    )
+
+
+class PricingTable:
+    """Every combination of a catalog's priced fields computed up front.
+
+    A configuration maps to a row through a mixed-radix index (one digit per
+    field, its option position). Rows hold the option quantities and the
+    fixed-point extended prices, options total and grand total, so pricing is
+    an index computation plus building the payload for the selected options.
+    Only fields with option rules are dimensions; the rest do not affect price.
+    """
+
+    def __init__(self, catalog: Catalog):
+        self.catalog = catalog
+        self.version = catalog.version
+        self.fields: Tuple[str, ...] = tuple(catalog.option_rules)
+        self.option_ids: Tuple[str, ...] = tuple(catalog.unit_prices)
+        self._positions = [
+            {value: pos for pos, value in enumerate(catalog.dropdown_map[field].options)} for field in self.fields
+        ]
+        self._strides: List[int] = []
+        stride = 1
+        for positions in reversed(self._positions):
+            self._strides.insert(0, stride)
+            stride *= len(positions)
+        self.size = stride
+
+        columns = {option_id: col for col, option_id in enumerate(self.option_ids)}
+        quantities = np.zeros((self.size, len(self.option_ids)), dtype=np.int32)
+        for row, combo in enumerate(product(*(catalog.dropdown_map[field].options for field in self.fields))):
+            for option_id, qty in _selected_options(catalog, dict(zip(self.fields, combo))):
+                quantities[row, columns[option_id]] = qty
+        unit_prices = np.array([catalog.unit_prices_fixed[option_id] for option_id in self.option_ids], dtype=np.int64)
+        self.quantities = quantities
+        self.extended = quantities * unit_prices
+        self.options_total = self.extended.sum(axis=1)
+        self.grand_total = self.options_total + catalog.base_price_fixed
+
+        # Hot-path views: per row, the payload lines of its selected options
+        # and the float totals, so a lookup never touches NumPy scalars.
+        lines: Dict[Tuple[int, int], Dict[str, object]] = {}
+        self._rows: List[Tuple[Tuple[Dict[str, object], ...], float, float]] = []
+        for row_quantities, options_total, grand_total in zip(
+            quantities.tolist(), self.options_total.tolist(), self.grand_total.tolist()
+        ):
+            selected = []
+            for col, qty in enumerate(row_quantities):
+                if qty:
+                    line = lines.get((col, qty))
+                    if line is None:
+                        option_id = self.option_ids[col]
+                        line = lines[(col, qty)] = {
+                            "id": option_id,
+                            "label": catalog.option_labels[option_id],
+                            "unit": from_fixed(int(unit_prices[col])),
+                            "qty": qty,
+                            "extended": from_fixed(int(unit_prices[col]) * qty),
+                        }
+                    selected.append(line)
+            self._rows.append((tuple(selected), from_fixed(options_total), from_fixed(grand_total)))
+
+    def index(self, inputs: Mapping[str, str | int]) -> int:
+        """Row of ``inputs``; ``KeyError`` for values outside the catalog."""
+        row = 0
+        for field, positions, stride in zip(self.fields, self._positions, self._strides):
+            row += positions[inputs[field]] * stride
+        return row
+
+    def inputs(self, row: int) -> Dict[str, str | int]:
+        """The priced field values of ``row`` (inverse of ``index``)."""
+        return {
+            field: self.catalog.dropdown_map[field].options[(row // stride) % len(positions)]
+            for field, positions, stride in zip(self.fields, self._positions, self._strides)
+        }
+
+    def payload(self, row: int) -> Dict[str, object]:
+        selected, options_total, grand_total = self._rows[row]
+        return _pricing_payload(self.catalog, [dict(line) for line in selected], options_total, grand_total)
+
+    def lookup(self, inputs: Mapping[str, str | int]) -> Dict[str, object]:
+        return self.payload(self.index(inputs))
+
+
+def pricing_table() -> PricingTable:
+    """The table for the active catalog version."""
+    return current_catalog().pricing_table
+
+
+def compute_pricing(
+    inputs: Mapping[str, str | int],
+    numeric: str = NUMERIC_FIXED,
+    use_table: bool = True,
+    catalog: Catalog | None = None,
+) -> Dict[str, object]:
+    """Price a validated configuration against ``catalog`` (default: active).
+
+    The default ``numeric="fixed"`` path sums integer fixed-point units and
+    only converts to floats in the payload; ``numeric="decimal"`` keeps the
+    original ``Decimal`` arithmetic. Both produce identical payloads. With
+    ``use_table`` the fixed path is served from the catalog's precomputed
+    ``PricingTable``.
+    """
+    catalog = catalog or current_catalog()
+    if numeric == NUMERIC_FIXED:
+        table = catalog.pricing_table if use_table else None
+        if table is not None:
+            try:
+                return table.lookup(inputs)
+            except KeyError:
+                pass
+        return _compute_pricing_fixed(catalog, inputs)
+    if numeric == NUMERIC_DECIMAL:
+        return _compute_pricing_decimal(catalog, inputs)
+    raise ValueError(f"Unsupported numeric mode: {numeric}")
+
+
+def price_batch(payloads: List[object], catalog: Catalog | None = None) -> List[Dict[str, object]]:
+    """Validate and price many ``/api/price`` payloads against one catalog.
+
+    Each entry may be a full payload (``{"inputs": {...}}``) or a bare inputs
+    object. Returns one ``{"index", "pricing"}`` or ``{"index", "error",
+    "field"}`` result per entry, in order.
+    """
+    catalog = catalog or current_catalog()
+    results: List[Dict[str, object]] = []
+    for index, payload in enumerate(payloads):
+        if isinstance(payload, Mapping) and "inputs" not in payload:
+            payload = {"inputs": payload}
+        try:
+            if not isinstance(payload, Mapping):
+                raise PricingValidationError("item must be a JSON object", None)
+            pricing = compute_pricing(validate_inputs(payload, catalog), catalog=catalog)
+        except PricingValidationError as exc:
+            results.append({"index": index, "error": str(exc), "field": exc.field, "errors": exc.errors})
+        else:
+            results.append({"index": index, "pricing": pricing})
+    return results
+
+
+def configuration_key(inputs: Mapping[str, str | int], catalog: Catalog | None = None) -> str:
+    """Compact, reversible key of a validated configuration.
+
+    The key is the catalog version plus the configuration's mixed-radix
+    position over ``input_fields`` in hex, so it is only valid for that
+    catalog version.
+    """
+    catalog = catalog or current_catalog()
+    number = 0
+    for field, positions in zip(catalog.input_fields, catalog._input_positions):
+        number = number * len(positions) + positions[inputs[field]]
+    return f"{catalog.version}-{number:x}"
+
+
+def configuration_from_key(key: str, catalog: Catalog | None = None) -> ValidatedInputs:
+    """Inverse of ``configuration_key``; rejects keys of other catalog versions."""
+    catalog = catalog or current_catalog()
+    version, _, encoded = str(key).rpartition("-")
+    try:
+        number = int(encoded, 16)
+    except ValueError:
+        number = -1
+    if version != catalog.version or number < 0:
+        raise PricingValidationError("unknown configuration key", "base_key")
+    values: List[str | int] = []
+    for field in reversed(catalog.input_fields):
+        options = catalog.dropdown_map[field].options
+        number, position = divmod(number, len(options))
+        values.append(options[position])
+    if number:
+        raise PricingValidationError("unknown configuration key", "base_key")
+    return ValidatedInputs(catalog.input_fields, catalog._input_index, tuple(reversed(values)))
+
+
+def _options_total_fixed(catalog: Catalog, inputs: Mapping[str, str | int]) -> int:
+    table = catalog.pricing_table
+    return int(table.options_total[table.index(inputs)])
+
+
+def price_delta(
+    base: Mapping[str, str | int], changes: Mapping[str, object], catalog: Catalog | None = None
+) -> Dict[str, object]:
+    """Reprice ``base`` (validated inputs) with ``changes`` applied.
+
+    Only the option lines of changed fields are re-derived: their old lines
+    are subtracted from the base options total and the new ones added.
+    Returns the new configuration key, the changed fields, the option lines
+    that were added or changed, the ids of removed options and the totals.
+    """
+    catalog = catalog or current_catalog()
+    updated = validate_inputs({"inputs": {**base, **changes}}, catalog)
+    changed = [field for field in catalog.input_fields if updated[field] != base[field]]
+
+    before: Dict[str, int] = {}
+    after: Dict[str, int] = {}
+    for field in changed:
+        dispatch = catalog.option_rules.get(field)
+        if dispatch is None:
+            continue
+        for option_id, qty in dispatch[base[field]]:
+            before[option_id] = before.get(option_id, 0) + qty
+        for option_id, qty in dispatch[updated[field]]:
+            after[option_id] = after.get(option_id, 0) + qty
+
+    prices = catalog.unit_prices_fixed
+    options_total = (
+        _options_total_fixed(catalog, base)
+        - sum(prices[option_id] * qty for option_id, qty in before.items())
+        + sum(prices[option_id] * qty for option_id, qty in after.items())
+    )
+    lines = [
+        {
+            "id": option_id,
+            "label": catalog.option_labels[option_id],
+            "unit": from_fixed(prices[option_id]),
+            "qty": qty,
+            "extended": from_fixed(prices[option_id] * qty),
+        }
+        for option_id, qty in after.items()
+        if before.get(option_id) != qty
+    ]
+    return {
+        "key": configuration_key(updated, catalog),
+        "changed": changed,
+        "options": lines,
+        "removed": [option_id for option_id in before if option_id not in after],
+        "totals": {
+            "options": from_fixed(options_total),
+            "grand": from_fixed(catalog.base_price_fixed + options_total),
+            "margin": catalog.default_margin_float,
         },
     }
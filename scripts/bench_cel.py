@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from backend.app.cel import SUMMARY_ROLLUP_ORDER, CostingEmulationLayer
+from backend.app.models import CostingItem, CostingSummary
+from backend.app.money import NUMERIC_FIXED, NUMERIC_FLOAT
+
+
+def make_summary(formula_items: int) -> CostingSummary:
+    """Detached summary: one priced item per rollup cell plus ``formula_items`` formula inputs of J5."""
+    summary = CostingSummary(margin=0.2, toggles={}, totals={})
+    items = [
+        CostingItem(code=key, description=key, quantity=3, unit_cost=0.1 * (idx + 1), metadata_json={"summary_cell": key})
+        for idx, key in enumerate(SUMMARY_ROLLUP_ORDER)
+        if key != "J5"
+    ]
+    inputs = [f"part_{idx}" for idx in range(formula_items)]
+    items.extend(
+        CostingItem(code=code, description=code, quantity=idx + 1, unit_cost=1.15, metadata_json={})
+        for idx, code in enumerate(inputs)
+    )
+    formula = f"SUM({','.join(inputs)})" if inputs else "0"
+    items.append(CostingItem(code="J5", description="J5", quantity=1, unit_cost=0.0, metadata_json={"summary_cell": "J5", "formula": formula}))
+    summary.items = items
+    return summary
+
+
+def bench_mode(numeric: str, formula_items: int, number: int) -> tuple[float, float, float]:
+    """Return (build + full recompute, margin-only recompute, item edit recompute) seconds."""
+    summary = make_summary(formula_items)
+    full = min(timeit.repeat(lambda: CostingEmulationLayer(None, summary, numeric).recompute(0.2), number=number, repeat=5))
+
+    layer = CostingEmulationLayer(None, summary, numeric)
+    layer.recompute(0.2)
+    margins = iter([0.2 + idx * 1e-5 for idx in range(1, 6 * number + 1)])
+    margin = min(timeit.repeat(lambda: layer.recompute(next(margins)), number=number, repeat=5))
+
+    item = next(item for item in summary.items if item.code == "J4")
+    costs = iter([1.0 + idx * 0.01 for idx in range(1, 6 * number + 1)])
+
+    def edit() -> None:
+        item.unit_cost = next(costs)
+        layer.update_item(item)
+        layer.recompute()
+
+    edited = min(timeit.repeat(edit, number=number, repeat=5))
+    return full / number, margin / number, edited / number
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare float and fixed-point CEL recompute")
+    parser.add_argument("--formula-items", type=int, nargs="*", default=[0, 100, 1000], help="Formula inputs feeding J5")
+    parser.add_argument("--number", type=int, default=200, help="Recomputes per timing sample")
+    args = parser.parse_args()
+
+    print(f"{'inputs':>7} {'mode':>6} {'full (us)':>10} {'margin (us)':>12} {'edit (us)':>10}")
+    for formula_items in args.formula_items:
+        for numeric in (NUMERIC_FLOAT, NUMERIC_FIXED):
+            full, margin, edited = bench_mode(numeric, formula_items, args.number)
+            print(f"{formula_items:>7} {numeric:>6} {full * 1e6:>10.1f} {margin * 1e6:>12.1f} {edited * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from backend.app.formula import CellIndex, compile_formula
+
+
+DEFAULT_SIZES = (10, 1_000, 100_000)
+
+
+def bench_range(size: int, repeat: int) -> tuple[float, float]:
+    """Return (dict path, slot path) seconds per evaluation of ``SUM(J1:J<size>)``."""
+    keys = [f"J{row}" for row in range(1, size + 1)]
+    context = {key: float(idx) for idx, key in enumerate(keys)}
+    compiled = compile_formula(f"SUM(J1:J{size},J1,J{size})")
+
+    index = CellIndex(keys)
+    bound = index.bind(compiled)
+    values = index.vector(context)
+    assert abs(bound.evaluate(values) - compiled.evaluate(context).value) < 1e-6
+
+    number = max(1, repeat // size)
+    dict_time = min(timeit.repeat(lambda: compiled.evaluate(context), number=number, repeat=5)) / number
+    slot_time = min(timeit.repeat(lambda: bound.evaluate(values), number=number, repeat=5)) / number
+    return dict_time, slot_time
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare dict-based and dense-slot range evaluation")
+    parser.add_argument("--sizes", type=int, nargs="*", default=list(DEFAULT_SIZES), help="Range sizes to benchmark")
+    parser.add_argument("--repeat", type=int, default=2_000_000, help="Cells evaluated per timing sample")
+    args = parser.parse_args()
+
+    print(f"{'cells':>10} {'dict (us)':>12} {'slots (us)':>12} {'speedup':>9}")
+    for size in args.sizes:
+        dict_time, slot_time = bench_range(size, args.repeat)
+        print(f"{size:>10} {dict_time * 1e6:>12.2f} {slot_time * 1e6:>12.2f} {dict_time / slot_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
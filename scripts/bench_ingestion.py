@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+import zipfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from backend.app.ingestion import MAIN_NS, REL_NS, STREAM_FORMATS, WorkbookIngestor
+
+PKG_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+COLUMNS = "ABCDEFGHIJ"
+
+
+def write_synthetic_workbook(path: Path, string_cells: int, unique_strings: int) -> Path:
+    """One sheet of ``string_cells`` shared-string cells, ten per row.
+
+    Every fifth shared string is a two-run rich-text item.
+    """
+    items = []
+    for number in range(unique_strings):
+        if number % 5 == 0:
+            items.append(f"<si><r><t>Item </t></r><r><rPr><b/></rPr><t>{number}</t></r></si>")
+        else:
+            items.append(f"<si><t>Item {number}</t></si>")
+    rows = []
+    for row in range(string_cells // len(COLUMNS)):
+        cells = "".join(
+            f'<c r="{column}{row + 1}" t="s"><v>{(row * len(COLUMNS) + col) % unique_strings}</v></c>'
+            for col, column in enumerate(COLUMNS)
+        )
+        rows.append(f'<row r="{row + 1}">{cells}</row>')
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(
+            "xl/workbook.xml",
+            f'<workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}"><sheets><sheet name="Data" sheetId="1" r:id="rId1"/></sheets></workbook>',
+        )
+        zf.writestr(
+            "xl/_rels/workbook.xml.rels",
+            f'<Relationships xmlns="{PKG_NS}"><Relationship Id="rId1" Target="worksheets/sheet1.xml"/></Relationships>',
+        )
+        zf.writestr("xl/worksheets/sheet1.xml", f'<worksheet xmlns="{MAIN_NS}"><sheetData>{"".join(rows)}</sheetData></worksheet>')
+        zf.writestr(
+            "xl/sharedStrings.xml",
+            f'<sst xmlns="{MAIN_NS}" count="{string_cells}" uniqueCount="{unique_strings}">{"".join(items)}</sst>',
+        )
+    return path
+
+
+def legacy_read_shared_string(zf: zipfile.ZipFile, index: int) -> str:
+    """The former per-cell lookup: re-read and re-parse the whole table."""
+    table = ET.fromstring(zf.read("xl/sharedStrings.xml"))
+    items = table.findall("main:si", {"main": MAIN_NS})
+    if index < len(items):
+        text = items[index].find("main:t", {"main": MAIN_NS})
+        if text is not None:
+            return text.text or ""
+    return ""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time and measure workbook ingestion of a synthetic shared-string workbook")
+    parser.add_argument("--cells", type=int, default=100_000, help="Shared-string cells in the workbook")
+    parser.add_argument("--unique", type=int, default=20_000, help="Distinct shared strings")
+    parser.add_argument("--legacy-sample", type=int, default=20, help="Cells timed with the former per-cell lookup")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_synthetic_workbook(Path(tmp) / "synthetic.xlsx", args.cells, args.unique)
+        tracemalloc.start()
+        started = time.perf_counter()
+        spec = WorkbookIngestor(path).extract()
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        cells = sum(len(row) for row in spec["sheets"]["Data"]["rows"])
+        del spec
+        print(f"string cells: {cells}  unique strings: {args.unique}")
+        print(f"{'mode':>8} {'time (s)':>10} {'peak (MB)':>10}")
+        print(f"{'extract':>8} {elapsed:>10.2f} {peak / 2**20:>10.1f}")
+        for fmt in STREAM_FORMATS:
+            tracemalloc.start()
+            started = time.perf_counter()
+            WorkbookIngestor(path).dump_stream(Path(tmp) / f"spec.{fmt}", fmt)
+            stream_elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{fmt:>8} {stream_elapsed:>10.2f} {peak / 2**20:>10.1f}")
+
+        if args.legacy_sample > 0:
+            with zipfile.ZipFile(path) as zf:
+                started = time.perf_counter()
+                for index in range(args.legacy_sample):
+                    legacy_read_shared_string(zf, index)
+                per_cell = (time.perf_counter() - started) / args.legacy_sample
+            print(
+                f"former per-cell lookup: {per_cell * 1e3:.1f} ms/cell, "
+                f"~{per_cell * cells:.0f} s estimated for the whole sheet ({per_cell * cells / elapsed:.0f}x slower)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from itertools import product
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from backend.app.money import NUMERIC_DECIMAL, NUMERIC_FIXED
+from backend.app.system_options import (
+    DROPDOWN_MAP,
+    REQUIRED_FIELDS,
+    _selected_options,
+    compute_pricing,
+    current_catalog,
+)
+
+
+def all_configurations() -> list[dict[str, str | int]]:
+    options = [DROPDOWN_MAP[field].options for field in REQUIRED_FIELDS]
+    return [dict(zip(REQUIRED_FIELDS, combo)) for combo in product(*options)]
+
+
+MODES = {
+    "decimal": {"numeric": NUMERIC_DECIMAL},
+    "fixed": {"numeric": NUMERIC_FIXED, "use_table": False},
+    "table": {"numeric": NUMERIC_FIXED, "use_table": True},
+}
+
+
+def branch_selection(inputs: dict[str, str | int]) -> list[tuple[str, int]]:
+    """The hard-coded if/elif option selection the catalog rules replaced."""
+    selected = []
+    for field, option_id in (
+        ("sys.spare_parts_qty", "opt.spare_parts"),
+        ("sys.spare_saw_blades_qty", "opt.saw_blades"),
+        ("sys.spare_foam_pads_qty", "opt.foam_pads"),
+    ):
+        qty = int(inputs[field])
+        if qty:
+            selected.append((option_id, qty))
+    guarding = inputs["sys.guarding"]
+    if guarding == "Tall":
+        selected.append(("opt.guarding_tall", 1))
+    elif guarding == "Tall w/ Netting":
+        selected.append(("opt.guarding_tall_net", 1))
+    feeding = inputs["sys.feeding_funneling"]
+    if feeding in {"Front USL", "Front Badger"}:
+        selected.append(("opt.feeding_front", 1))
+    elif feeding == "Side USL":
+        selected.append(("opt.feeding_side_usl", 1))
+    elif feeding == "Side Badger":
+        selected.append(("opt.feeding_side_badger", 1))
+    transformer = inputs["sys.transformer"]
+    if transformer == "Canada":
+        selected.append(("opt.transformer_canada", 1))
+    elif transformer == "Step Up":
+        selected.append(("opt.transformer_step", 1))
+    if inputs["sys.training_lang"] == "English & Spanish":
+        selected.append(("opt.training_spanish", 1))
+    return selected
+
+
+def bench_selection(configurations: list[dict[str, str | int]], rounds: int) -> dict[str, float]:
+    """Best wall time of the if/elif chain and the compiled catalog rules."""
+    catalog = current_catalog()
+    selectors = {"branches": branch_selection, "rules": lambda inputs: _selected_options(catalog, inputs)}
+    timings = {}
+    for name, select in selectors.items():
+        best = float("inf")
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for inputs in configurations:
+                select(inputs)
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best
+    return timings
+
+
+def bench(mode: str, configurations: list[dict[str, str | int]], rounds: int) -> float:
+    """Return the best wall time in seconds to price every configuration once."""
+    options = MODES[mode]
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for inputs in configurations:
+            compute_pricing(inputs, **options)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare pricing modes and option selection over every configuration")
+    parser.add_argument("--rounds", type=int, default=5, help="Timing rounds; the fastest is reported")
+    args = parser.parse_args()
+
+    configurations = all_configurations()
+    started = time.perf_counter()
+    compute_pricing(configurations[0])  # builds the pricing table
+    build_time = time.perf_counter() - started
+    mismatches = sum(
+        compute_pricing(inputs, **options) != compute_pricing(inputs, numeric=NUMERIC_DECIMAL)
+        for inputs in configurations
+        for options in MODES.values()
+    )
+    catalog = current_catalog()
+    mismatches += sum(branch_selection(inputs) != _selected_options(catalog, inputs) for inputs in configurations)
+    timings = {mode: bench(mode, configurations, args.rounds) for mode in MODES}
+    selection = bench_selection(configurations, args.rounds)
+
+    print(f"configurations: {len(configurations)}  mismatches: {mismatches}  table build: {build_time * 1e3:.1f} ms")
+    print(f"{'mode':>8} {'total (ms)':>12} {'per quote (us)':>16} {'speedup':>9}")
+    for mode, elapsed in timings.items():
+        speedup = timings["decimal"] / elapsed
+        print(f"{mode:>8} {elapsed * 1e3:>12.2f} {elapsed / len(configurations) * 1e6:>16.2f} {speedup:>8.2f}x")
+    print(f"{'select':>8} {'total (ms)':>12} {'per quote (us)':>16} {'speedup':>9}")
+    for name, elapsed in selection.items():
+        speedup = selection["branches"] / elapsed
+        print(f"{name:>8} {elapsed * 1e3:>12.2f} {elapsed / len(configurations) * 1e6:>16.2f} {speedup:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
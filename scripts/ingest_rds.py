@@ -9,7 +9,7 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.append(str(ROOT))
 
-from backend.app.ingestion import WorkbookIngestor
+from backend.app.ingestion import STREAM_FORMATS, STREAM_JSON, WorkbookIngestor
 
 
 DEFAULT_CONFIG = {
@@ -28,10 +28,17 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Ingest RDS Sales Tool workbook")
     parser.add_argument("workbook", type=Path, help="Path to RDS Sales Tool workbook (.xlsm)")
     parser.add_argument("--config", type=Path, default=None, help="Path to config JSON")
+    parser.add_argument("--stream", action="store_true", help="Parse sheets incrementally with bounded memory")
+    parser.add_argument("--format", choices=STREAM_FORMATS, default=STREAM_JSON, help="Output format when streaming")
+    parser.add_argument("--output", type=Path, default=None, help="Output path (default: SPEC_CACHE from config)")
     args = parser.parse_args()
 
     config = load_config(args.config)
-    output = Path(config["SPEC_CACHE"])
+    output = args.output or Path(config["SPEC_CACHE"])
     ingestor = WorkbookIngestor(args.workbook)
-    spec = ingestor.dump(output)
-    print(f"Wrote spec to {output} ({len(spec['sheets'])} sheets)")
+    if args.stream:
+        rows = ingestor.dump_stream(output, args.format)
+        print(f"Streamed spec to {output} ({rows} rows, {args.format})")
+    else:
+        spec = ingestor.dump(output)
+        print(f"Wrote spec to {output} ({len(spec['sheets'])} sheets)")
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.config import load_config
+from backend.app.repricing import DEFAULT_CHUNK_SIZE, RepriceProgress, reprice_all
+
+
+def report(progress: RepriceProgress) -> None:
+    print(f"\r{progress.done}/{progress.total} quotes  {progress.rate:,.0f} quotes/s", end="", flush=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-price every quote through the Costing Emulation Layer")
+    parser.add_argument("--config", type=Path, default=None, help="Path to config JSON")
+    parser.add_argument("--margin", type=float, default=None, help="Override every quote's margin")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Quotes per batch")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes, capped at MAX_WORKERS (0 = run in-process)")
+    args = parser.parse_args()
+
+    config = load_config(str(args.config) if args.config else None)
+    engine = create_engine(config["DATABASE_URL"], future=True)
+    with sessionmaker(bind=engine, future=True)() as session:
+        result = reprice_all(
+            session,
+            margin=args.margin,
+            chunk_size=args.chunk_size,
+            workers=args.workers,
+            progress=report,
+        )
+    print(f"\nRe-priced {result.done} quotes in {result.elapsed:.2f}s ({result.rate:,.0f} quotes/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from backend.app.cache import LRUCache
+from backend.app.cel import ROLLUP_SNAPSHOTS
+from backend.app.models import Base, CostingItem
+from backend.app.services import RDSService
+
+
+@pytest.fixture()
+def session() -> Session:
+    engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, future=True)
+    ROLLUP_SNAPSHOTS.clear()
+    with SessionLocal() as session:
+        yield session
+    ROLLUP_SNAPSHOTS.clear()
+
+
+def test_lru_cache_evicts_least_recently_used() -> None:
+    cache: LRUCache[int] = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert "b" not in cache
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.evictions, stats.size) == (1, 1, 1, 2)
+    assert stats.hit_rate == 0.5
+    with pytest.raises(ValueError):
+        LRUCache(0)
+
+
+def test_rollup_snapshots_hit_until_service_write(session: Session) -> None:
+    service = RDSService(session)
+    quote = service.get_or_create_quote("QCACHE")
+    first = service.recompute_costing(quote)
+    assert ROLLUP_SNAPSHOTS.stats().size == 1
+
+    second = service.recompute_costing(quote)
+    assert ROLLUP_SNAPSHOTS.stats().hits == 1
+    assert second["totals"] == first["totals"]
+
+    service.recompute_costing(quote, 0.3)
+    assert ROLLUP_SNAPSHOTS.stats().hits == 1
+
+    service.ensure_seed_costing(quote, {"J4": {"quantity": 2, "unit_cost": 50.0}})
+    result = service.recompute_costing(quote, 0.3)
+    assert ROLLUP_SNAPSHOTS.stats().hits == 1
+    assert result["totals"]["J4"] == 100.0
+
+    service.set_toggle(quote, "H38", 1)
+    assert service.recompute_costing(quote)["toggles"]["H38"] == 1
+    assert ROLLUP_SNAPSHOTS.stats().hits == 2
+
+
+def test_rollup_snapshots_miss_after_direct_item_update(session: Session) -> None:
+    service = RDSService(session)
+    quote = service.get_or_create_quote("QDIRECT")
+    service.recompute_costing(quote, 0.1)
+    session.commit()
+
+    # A write that bypasses the service, as another worker or script would do.
+    session.execute(
+        update(CostingItem)
+        .where(CostingItem.summary_id == quote.costing_summary.id, CostingItem.code == "J4")
+        .values(quantity=1.0, unit_cost=250.0)
+    )
+    session.commit()
+    session.expire_all()
+
+    result = service.recompute_costing(quote, 0.1)
+    assert ROLLUP_SNAPSHOTS.stats().hits == 0
+    assert result["totals"]["J4"] == 250.0
+    assert quote.pricing.total == pytest.approx(result["totals"]["base_total"] * 1.1)
+
+
+def test_rollup_snapshot_key_tracks_only_cel_inputs(session: Session) -> None:
+    service = RDSService(session)
+    quote = service.get_or_create_quote("QKEY")
+    service.recompute_costing(quote, 0.1)
+    j5 = next(item for item in quote.costing_summary.items if item.code == "J5")
+
+    j5.metadata_json = {**j5.metadata_json, "note": "ignored by the CEL"}
+    service.recompute_costing(quote, 0.1)
+    assert ROLLUP_SNAPSHOTS.stats().hits == 1
+
+    j5.metadata_json = {**j5.metadata_json, "formula": "J4 * 0 + 40"}
+    result = service.recompute_costing(quote, 0.1)
+    assert ROLLUP_SNAPSHOTS.stats().hits == 1
+    assert result["totals"]["J5"] == 40.0
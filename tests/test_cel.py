@@ -1,12 +1,22 @@
 from __future__ import annotations
 
+import math
 from pathlib import Path
 
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import Session, sessionmaker
 
-from backend.app.cel import CostingEmulationLayer, SUMMARY_ROLLUP_ORDER, ensure_costing_summary
+from backend.app.cel import (
+    ALL_TOGGLES,
+    SUMMARY_ROLLUP_ORDER,
+    TOGGLE_BITS,
+    CostingEmulationLayer,
+    ensure_costing_summary,
+    solve_margin,
+    toggle_mask,
+    toggles_from_mask,
+)
 from backend.app.models import Base, CostingItem, RDSInput
 
 
@@ -50,3 +60,244 @@ def test_force_enable(session: Session) -> None:
     layer = CostingEmulationLayer(session, summary)
     result = layer.recompute()
     assert all(value == 1 for value in result.toggles.values())
+
+
+def test_incremental_recompute_reports_changed_cells(session: Session) -> None:
+    quote = seed_quote(session)
+    summary = quote.costing_summary
+    layer = CostingEmulationLayer(session, summary)
+    first = layer.recompute(0.25)
+    assert {"J4", "base_total", "sell_price"} <= first.changed
+
+    assert layer.recompute().changed == set()
+
+    j38 = next(item for item in summary.items if item.code == "J38")
+    j38.unit_cost = 500.0
+    layer.update_item(j38)
+    assert layer.recompute().changed == {"J38"}
+
+    j4 = next(item for item in summary.items if item.code == "J4")
+    j4.unit_cost = 100.0
+    layer.update_item(j4)
+    result = layer.recompute()
+    assert result.changed == {"J4", "base_total", "sell_price"}
+    assert result.summary_values["base_total"] == pytest.approx(sum(range(1, 12)) - 1 + 100)
+
+    assert layer.recompute(0.5).changed == {"margin", "sell_price"}
+
+
+def test_metadata_formula_items(session: Session) -> None:
+    quote = seed_quote(session)
+    summary = quote.costing_summary
+    summary.items.append(CostingItem(code="material_cost", description="Material", quantity=2, unit_cost=50.0, metadata_json={}))
+    summary.items.append(CostingItem(code="labor_cost", description="Labor", quantity=1, unit_cost=25.0, metadata_json={}))
+    j5 = next(item for item in summary.items if item.code == "J5")
+    j5.metadata_json = {
+        "summary_cell": "J5",
+        "formula": "material_cost + labor_cost",
+        "inputs": ["material_cost", "labor_cost"],
+    }
+    layer = CostingEmulationLayer(session, summary)
+    result = layer.recompute(0.0)
+    assert result.summary_values["J5"] == pytest.approx(125.0)
+
+    labor = next(item for item in summary.items if item.code == "labor_cost")
+    labor.unit_cost = 75.0
+    layer.update_item(labor)
+    result = layer.recompute()
+    assert result.changed == {"labor_cost", "J5", "base_total", "sell_price"}
+    assert result.summary_values["J5"] == pytest.approx(175.0)
+
+
+def test_items_without_summary_cell_only_feed_formula_inputs(session: Session) -> None:
+    quote = seed_quote(session)
+    summary = quote.costing_summary
+    stray = CostingItem(code="J4", description="Unmapped J4", quantity=1, unit_cost=999.0, metadata_json={})
+    margin_item = CostingItem(code="margin", description="Not a margin", quantity=1, unit_cost=5.0, metadata_json={})
+    summary.items.extend([stray, margin_item])
+    layer = CostingEmulationLayer(session, summary)
+    result = layer.recompute(0.1)
+    assert result.summary_values["J4"] == 1.0
+    assert result.summary_values["base_total"] == sum(range(1, 12))
+    assert result.margin == 0.1
+
+    stray.unit_cost = 500.0
+    layer.update_item(stray)
+    assert layer.recompute().summary_values["J4"] == 1.0
+
+
+def test_fixed_point_mode_is_exact(session: Session) -> None:
+    quote = seed_quote(session)
+    summary = quote.costing_summary
+    for item in summary.items:
+        item.unit_cost = 0.1
+        item.quantity = 3
+    layer = CostingEmulationLayer(session, summary, numeric="fixed")
+    result = layer.recompute(0.1)
+    assert result.summary_values["J4"] == 0.3
+    assert result.summary_values["base_total"] == 3.3
+    assert result.summary_values["sell_price"] == 3.63
+
+
+def test_fixed_point_mode_keeps_margin_unrounded(session: Session) -> None:
+    quote = seed_quote(session)
+    summary = quote.costing_summary
+    for item in summary.items:
+        item.unit_cost = 0.1
+        item.quantity = 3
+    layer = CostingEmulationLayer(session, summary, numeric="fixed")
+    result = layer.recompute(0.123456)
+    assert result.margin == 0.123456
+    # 3.3 * 1.123456 = 3.7074048; a margin rounded to 0.1235 would give 3.7076.
+    assert result.summary_values["sell_price"] == 3.7074
+    assert result.summary_values["base_total"] == 3.3
+
+    result = layer.recompute(0.12349)
+    assert "sell_price" in result.changed
+    assert result.summary_values["sell_price"] == 3.7075
+
+
+def test_toggle_mask_gates_options(session: Session) -> None:
+    quote = seed_quote(session)
+    summary = quote.costing_summary
+    layer = CostingEmulationLayer(session, summary)
+    result = layer.recompute(0.0)
+    assert result.toggle_mask == 0
+    assert result.summary_values["options_total"] == 0.0
+
+    CostingEmulationLayer.set_toggle(summary, "H38", 1)
+    CostingEmulationLayer.set_toggle(summary, "H47", 1)
+    result = layer.recompute()
+    assert result.toggle_mask == toggle_mask({"H38": 1, "H47": 1})
+    # Toggles gate the reported options total, not the persisted sell price.
+    assert result.changed == {"toggle_mask", "options_total"}
+    assert result.summary_values["sell_price"] == result.summary_values["base_total"]
+    j38 = SUMMARY_ROLLUP_ORDER.index("J38") + 1
+    j47 = SUMMARY_ROLLUP_ORDER.index("J47") + 1
+    assert result.summary_values["options_total"] == pytest.approx(j38 + j47)
+    assert toggles_from_mask(result.toggle_mask) == summary.toggles
+
+
+def test_what_if_enumerates_every_toggle_combination(session: Session) -> None:
+    quote = seed_quote(session)
+    summary = quote.costing_summary
+    CostingEmulationLayer.force_enable_all(summary)
+    layer = CostingEmulationLayer(session, summary)
+    scenarios = layer.what_if(0.1)
+    assert scenarios.current_mask == ALL_TOGGLES
+    assert len(scenarios.sell_price) == ALL_TOGGLES + 1
+
+    current = layer.recompute(0.1).summary_values
+    assert scenarios.sell_price[ALL_TOGGLES] == pytest.approx(current["sell_price"])
+    for mask in (0, 5, 1234, ALL_TOGGLES):
+        summary.toggles = toggles_from_mask(mask)
+        totals = layer.recompute(0.1).summary_values
+        expected = current["sell_price"] + (totals["options_total"] - current["options_total"]) * 1.1
+        assert scenarios.sell_price[mask] == pytest.approx(expected)
+
+    j18 = SUMMARY_ROLLUP_ORDER.index("J18") + 1
+    j33 = SUMMARY_ROLLUP_ORDER.index("J33") + 1
+    assert scenarios.delta("H18", "H33") == pytest.approx(-(j18 + j33) * 1.1)
+    assert scenarios.without("H18", "H33") == pytest.approx(current["sell_price"] - (j18 + j33) * 1.1)
+    with pytest.raises(KeyError):
+        scenarios.without("J4")
+
+
+def test_what_if_current_mask_matches_persisted_total(session: Session) -> None:
+    from backend.app.services import RDSService
+
+    quote = seed_quote(session)
+    service = RDSService(session)
+    CostingEmulationLayer.set_toggle(quote.costing_summary, "H38", 1)
+    service.recompute_costing(quote, 0.25)
+    scenarios = CostingEmulationLayer(None, quote.costing_summary).what_if(0.25)
+    assert scenarios.sell_price[scenarios.current_mask] == pytest.approx(quote.pricing.total)
+    assert scenarios.delta() == 0.0
+
+
+def test_margin_sweep_matches_recompute(session: Session) -> None:
+    quote = seed_quote(session)
+    summary = quote.costing_summary
+    CostingEmulationLayer.set_toggle(summary, "H38", 1)
+    layer = CostingEmulationLayer(session, summary)
+    margins = [0.0, 0.15, 0.24, 0.5]
+    curve = layer.margin_sweep(margins)
+    assert summary.margin == 0.2
+    assert summary.totals == {}
+
+    for margin, sell_price in zip(margins, curve.tolist()):
+        assert sell_price == pytest.approx(layer.recompute(margin).summary_values["sell_price"])
+
+
+def test_goal_seek_linear_and_fallback(session: Session) -> None:
+    quote = seed_quote(session)
+    summary = quote.costing_summary
+    layer = CostingEmulationLayer(session, summary)
+    assert layer.margin_is_linear
+    margin = layer.goal_seek(99.0)
+    assert margin == pytest.approx(99.0 / sum(range(1, 12)) - 1)
+    assert layer.recompute(margin).summary_values["sell_price"] == pytest.approx(99.0)
+    assert layer.goal_seek(33.0, goal="profit") == pytest.approx(0.5)
+
+    j5 = next(item for item in summary.items if item.code == "J5")
+    j5.metadata_json = {"summary_cell": "J5", "formula": "J4 * 100 * margin * margin"}
+    layer.update_item(j5)
+    assert not layer.margin_is_linear
+    for target, goal in ((150.0, "sell_price"), (40.0, "profit")):
+        margin = layer.goal_seek(target, goal)
+        values = layer.recompute(margin).summary_values
+        reached = values["sell_price"] if goal == "sell_price" else values["sell_price"] - values["base_total"]
+        assert reached == pytest.approx(target)
+    assert math.isnan(solve_margin(layer.goal_curve(), -1e12))
+    with pytest.raises(ValueError):
+        layer.goal_seek(1.0, goal="revenue")
+
+
+def test_rollup_result_is_array_backed(session: Session) -> None:
+    quote = seed_quote(session)
+    summary = quote.costing_summary
+    result = CostingEmulationLayer(session, summary).recompute(0.25)
+    assert not hasattr(result, "__dict__")
+    assert len(result.values) == len(SUMMARY_ROLLUP_ORDER) + 4
+    assert result.values[SUMMARY_ROLLUP_ORDER.index("J38")] == result.summary_values["J38"]
+    assert list(result.summary_values)[: len(SUMMARY_ROLLUP_ORDER)] == SUMMARY_ROLLUP_ORDER
+    assert summary.totals == result.summary_values.to_dict()
+    assert summary.totals["margin"] == 0.25
+    assert result.details["J4"] == {"J4": 1.0}
+    with pytest.raises(KeyError):
+        result.summary_values["H18"]
+
+
+def test_toggles_do_not_reprice_existing_quotes(session: Session) -> None:
+    from backend.app.services import RDSService
+
+    quote = seed_quote(session)
+    service = RDSService(session)
+    before = service.recompute_costing(quote, 0.2)
+    base_total = sum(range(1, 12))
+    assert quote.pricing.total == pytest.approx(base_total * 1.2)
+
+    enabled = service.force_enable_options(quote)
+    assert quote.pricing.total == pytest.approx(base_total * 1.2)
+    assert enabled["totals"]["sell_price"] == before["totals"]["sell_price"]
+    assert enabled["totals"]["options_total"] > 0
+
+    service.set_margin(quote, 0.3)
+    assert quote.pricing.total == pytest.approx(base_total * 1.3)
+
+
+def test_contributions_are_cached_per_item_set(session: Session) -> None:
+    quote = seed_quote(session)
+    layer = CostingEmulationLayer(session, quote.costing_summary)
+    layer.recompute(0.1)
+    contributions = layer.contributions()
+    layer.set_cell("margin", 0.4)
+    layer.recompute(0.4)
+    assert layer.contributions() is contributions
+
+    j38 = next(item for item in quote.costing_summary.items if item.code == "J38")
+    j38.unit_cost = 100.0
+    layer.update_item(j38)
+    assert layer.contributions()[TOGGLE_BITS.index("H38")] == 100.0
+    layer.set_cell("J39", 7.0)
+    assert layer.contributions()[TOGGLE_BITS.index("H39")] == 7.0
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from backend.app.formula import CellIndex, FormulaEngine, FormulaError, compile_formula
+
+
+SUBTOTAL = "SUM(J4:J10,J14,J17,J24,J31)"
+
+
+def make_context() -> dict[str, float]:
+    return {f"J{idx}": float(idx) for idx in range(1, 48)}
+
+
+def test_sum_range_and_cells() -> None:
+    engine = FormulaEngine(make_context())
+    result = engine.eval(SUBTOTAL)
+    assert result.value == pytest.approx(sum(range(4, 11)) + 14 + 17 + 24 + 31)
+    assert set(result.details) == {"J4", "J5", "J6", "J7", "J8", "J9", "J10", "J14", "J17", "J24", "J31"}
+
+
+def test_arithmetic_chain() -> None:
+    engine = FormulaEngine({"J4": 10.0, "J5": 4.0})
+    assert engine.eval("J4 - J5 / 2").value == pytest.approx(8.0)
+    with pytest.raises(KeyError):
+        engine.eval("J4 + missing")
+
+
+def test_compiled_formula_is_shared_between_engines() -> None:
+    compile_formula.cache_clear()
+    FormulaEngine(make_context()).eval(SUBTOTAL)
+    FormulaEngine({**make_context(), "J4": 1.0}).eval(SUBTOTAL)
+    info = FormulaEngine.cache_info()
+    assert info.misses == 1
+    assert info.hits == 1
+    assert compile_formula(SUBTOTAL).refs[:2] == ("J4", "J5")
+
+
+def test_eval_batch_matches_scalar_path() -> None:
+    columns = [f"J{idx}" for idx in range(1, 48)]
+    matrix = np.arange(3 * len(columns), dtype=float).reshape(3, len(columns))
+    batch = FormulaEngine.eval_batch(SUBTOTAL, matrix, columns)
+    expected = [FormulaEngine(dict(zip(columns, row))).eval(SUBTOTAL).value for row in matrix]
+    assert batch.tolist() == pytest.approx(expected)
+
+    chained = FormulaEngine.eval_batch("J4 * 2 + 1", matrix, columns)
+    assert chained.tolist() == pytest.approx((matrix[:, 3] * 2 + 1).tolist())
+    with pytest.raises(KeyError):
+        FormulaEngine.eval_batch("J4 + missing", matrix, columns)
+
+
+def test_cell_index_binds_ranges_to_slices() -> None:
+    context = {**make_context(), "Summary!J4": 5.0, "Summary!J6": 7.0, "margin": 0.2}
+    index = CellIndex(context)
+    assert index.span("J4", "J10") == slice(3, 10)
+    assert index.span("Summary!J4", "Summary!J6") is not None
+    assert "Summary!J5" in index
+    assert index.span("J4", "Summary!J6") is None
+
+    values = index.vector(context)
+    for formula in (SUBTOTAL, "SUM(Summary!J4:Summary!J6)", "J4 * 2 + margin"):
+        expected = FormulaEngine(context).eval(formula).value
+        assert index.bind(formula).evaluate(values) == pytest.approx(expected)
+
+    with pytest.raises(KeyError):
+        index.bind("J4 + missing")
+
+
+def test_cell_index_keeps_sparse_rows_compact() -> None:
+    context = {"J1": 1.0, "J1000000": 2.0, "J500": 3.0, "J502": 4.0, "K5": 5.0}
+    index = CellIndex(context)
+    assert index.size == 6  # J500:J502 is a block (J501 padded); the rest are single slots
+    assert "J501" in index and "J2" not in index
+    assert index.span("J500", "J502") is not None
+    assert index.span("J1", "J1000000") is None
+    values = index.vector(context)
+    assert index.bind("J1 + J1000000 + SUM(J500:J502)").evaluate(values) == pytest.approx(10.0)
+
+    long_column = CellIndex(f"J{row}" for row in range(1, 10001))
+    assert long_column.size == 10000
+    assert long_column.span("J1", "J4096") == slice(0, 4096)
+    assert long_column.span("J4097", "J4100") == slice(4096, 4100)
+    assert long_column.span("J4000", "J5000") is None
+    assert long_column.bind("SUM(J4000:J5000)").evaluate(long_column.vector({"J4500": 1.0, "J4096": 2.0})) == 3.0
+
+
+@pytest.mark.parametrize(
+    ("formula", "context", "expected"),
+    [
+        ("MIN(A1:A30)", {"A1": 5.0, "A30": 7.0}, 5.0),
+        ("MAX(A1:A3)", {"A1": -5.0}, -5.0),
+        ("MAX(A1:A3)", {"A1": -5.0, "A3": -2.0}, -2.0),
+        ("MIN(A1:A3, 9)", {"A2": 4.0}, 4.0),
+        ("SUM(A1:A3) + MAX(A1:A3)", {"A1": 1.0, "A3": 2.0}, 5.0),
+        ("AND(A1:A3)", {"A1": 1.0, "A3": 2.0}, 1.0),
+        ("OR(A1:A3)", {"A1": 0.0, "A3": 0.0}, 0.0),
+        ("SUMPRODUCT(A1:A3, B1:B3)", {"A1": 2.0, "A3": 4.0, "B1": 10.0, "B2": 3.0, "B3": 1.0}, 24.0),
+    ],
+)
+def test_range_blanks_agree_across_evaluators(formula: str, context: dict, expected: float) -> None:
+    assert FormulaEngine(context).eval(formula).value == pytest.approx(expected)
+    index = CellIndex(context)
+    assert index.bind(formula).evaluate(index.vector(context)) == pytest.approx(expected)
+    columns = list(context)
+    matrix = np.array([[context[key] for key in columns]])
+    assert FormulaEngine.eval_batch(formula, matrix, columns).tolist() == pytest.approx([expected])
+    assert FormulaEngine.eval_batch(formula, np.array([index.vector(context)]), index).tolist() == pytest.approx([expected])
+
+
+def test_eval_batch_accepts_cell_index() -> None:
+    index = CellIndex(make_context())
+    matrix = np.vstack([np.asarray(index.vector(make_context())), np.ones(index.size)])
+    result = FormulaEngine.eval_batch(SUBTOTAL, matrix, index)
+    assert result.tolist() == pytest.approx([FormulaEngine(make_context()).eval(SUBTOTAL).value, 11.0])
+
+
+@pytest.mark.parametrize(
+    ("formula", "expected"),
+    [
+        ("A1+B1*2", 5.0),
+        ("(A1+B1)*2", 6.0),
+        ("-A1^2", 1.0),
+        ("2^3^2", 64.0),
+        ("=A1-B1-1", -2.0),
+        ("IF(A1>B1, 10, 20)", 20.0),
+        ("IF(AND(A1>0, OR(B1=0, B1<>1)), MAX(A1:B1, 5), 0)", 5.0),
+        ("MIN(A1:B2) + MAX(-1, -7)", 0.0),
+        ("ROUND(2.675, 2)", 2.68),
+        ("ROUND(-1250, -2)", -1300.0),
+        ("SUMPRODUCT(A1:A2, B1:B2)", 1 * 2 + 3 * 4),
+        ("SUM($A$1:B2) / 2", 5.0),
+        ("Summary!J4 * 2 + 'Sell Price'!B2", 5.0),
+    ],
+)
+def test_expression_parser(formula: str, expected: float) -> None:
+    context = {"A1": 1.0, "B1": 2.0, "A2": 3.0, "B2": 4.0, "Summary!J4": 1.0, "Sell Price!B2": 3.0}
+    assert FormulaEngine(context).eval(formula).value == pytest.approx(expected)
+    assert CellIndex(context).bind(formula).evaluate(CellIndex(context).vector(context)) == pytest.approx(expected)
+    columns = list(context)
+    matrix = np.array([[context[key] for key in columns]] * 2)
+    assert FormulaEngine.eval_batch(formula, matrix, columns).tolist() == pytest.approx([expected, expected])
+
+
+@pytest.mark.parametrize("formula", ["A1 +", "SUM(A1", "NOPE(A1)", "ROUND(A1)", "A1:A2 + 1", "A1 # 2"])
+def test_invalid_formulas(formula: str) -> None:
+    with pytest.raises(FormulaError):
+        compile_formula(formula)
+
+
+def test_fixed_point_engine() -> None:
+    engine = FormulaEngine({"A1": 0.1, "B1": 0.2, "C1": 1.0}, numeric="fixed")
+    result = engine.eval("A1 + B1")
+    assert result.value == 0.3
+    assert result.details == {"A1": 0.1, "B1": 0.2}
+    assert engine.eval("C1 / 3 * 3").value == 0.9999
+    assert engine.eval("ROUND(2.675, 2)").value == 2.68
+    assert engine.eval("IF(A1 + B1 = 0.3, 1, 0)").value == 1.0
+    with pytest.raises(ValueError):
+        FormulaEngine({}, numeric="binary")
+
+
+def test_fixed_point_engine_follows_context_changes() -> None:
+    context = {"A1": 0.1, "B1": 0.2}
+    engine = FormulaEngine(context, numeric="fixed")
+    assert engine.eval("A1 + B1").value == 0.3
+    context["A1"] = 1.5
+    context["C1"] = 2.0
+    assert engine.eval("A1 + B1 + C1").value == 3.7
+    engine.context["B1"] = 0.25
+    assert engine.eval("A1 + B1").value == 1.75
+    engine.context = {"A1": 4.0, "B1": 1.0}
+    assert engine.eval("A1 - B1").value == 3.0
+    with pytest.raises(KeyError):
+        engine.eval("C1")
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import json
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from backend.app.ingestion import WorkbookIngestor
+
+MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+SHARED_STRINGS = f"""<?xml version="1.0" encoding="UTF-8"?>
+<sst xmlns="{MAIN}" count="4" uniqueCount="4">
+  <si><t>Type</t></si>
+  <si><r><t>Tall </t></r><r><rPr><b/></rPr><t>w/ Netting</t></r></si>
+  <si><t xml:space="preserve"> padded </t><rPh sb="0" eb="1"><t>phonetic</t></rPh></si>
+  <si><t/></si>
+</sst>"""
+
+
+def write_workbook(path: Path, shared_strings: str | None) -> Path:
+    cells = '<c r="A1" t="s"><v>0</v></c><c r="B1" t="s"><v>1</v></c><c r="C1"><v>42</v></c>'
+    cells2 = '<c r="A2" t="s"><v>2</v></c><c r="B2" t="s"><v>3</v></c><c r="C2" t="s"><v>9</v></c>'
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr(
+            "xl/workbook.xml",
+            f'<workbook xmlns="{MAIN}" xmlns:r="{REL}"><sheets><sheet name="Sheet2" sheetId="1" r:id="rId1"/></sheets>'
+            '<definedNames><definedName name="Types">Sheet2!$A$2:$A$4</definedName></definedNames></workbook>',
+        )
+        zf.writestr(
+            "xl/_rels/workbook.xml.rels",
+            f'<Relationships xmlns="{PKG}"><Relationship Id="rId1" Target="worksheets/sheet1.xml"/></Relationships>',
+        )
+        zf.writestr(
+            "xl/worksheets/sheet1.xml",
+            f'<worksheet xmlns="{MAIN}"><sheetData><row r="1">{cells}</row><row r="2">{cells2}</row></sheetData></worksheet>',
+        )
+        if shared_strings is not None:
+            zf.writestr("xl/sharedStrings.xml", shared_strings)
+    return path
+
+
+def test_shared_strings_are_resolved_with_rich_text(tmp_path: Path) -> None:
+    spec = WorkbookIngestor(write_workbook(tmp_path / "book.xlsx", SHARED_STRINGS)).extract()
+    rows = spec["sheets"]["Sheet2"]["rows"]
+    assert [cell["value"] for cell in rows[0]] == ["Type", "Tall w/ Netting", "42"]
+    assert [cell["value"] for cell in rows[1]] == [" padded ", "", ""]
+    assert spec["named_ranges"] == {"Types": "Sheet2!$A$2:$A$4"}
+
+
+def test_workbook_without_shared_strings(tmp_path: Path) -> None:
+    spec = WorkbookIngestor(write_workbook(tmp_path / "book.xlsx", None)).extract()
+    assert [cell["value"] for cell in spec["sheets"]["Sheet2"]["rows"][0]] == ["", "", "42"]
+
+
+def test_streamed_spec_matches_extract(tmp_path: Path) -> None:
+    ingestor = WorkbookIngestor(write_workbook(tmp_path / "book.xlsx", SHARED_STRINGS))
+    expected = ingestor.extract()
+
+    assert ingestor.dump_stream(tmp_path / "spec.json") == 2
+    assert json.loads((tmp_path / "spec.json").read_text()) == expected
+
+    assert ingestor.dump_stream(tmp_path / "spec.ndjson", "ndjson") == 2
+    records = [json.loads(line) for line in (tmp_path / "spec.ndjson").read_text().splitlines()]
+    assert [record["row"] for record in records[:-1]] == expected["sheets"]["Sheet2"]["rows"]
+    assert {record["sheet"] for record in records[:-1]} == {"Sheet2"}
+    assert records[-1] == {"named_ranges": expected["named_ranges"]}
+
+    with pytest.raises(ValueError):
+        ingestor.dump_stream(tmp_path / "spec.xml", "xml")
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from decimal import Decimal
+from itertools import product
+
+import pytest
+
+from backend.app.money import fixed_div, fixed_mul, from_fixed, round_fixed, to_fixed
+from backend.app.system_options import (
+    DROPDOWN_MAP,
+    REQUIRED_FIELDS,
+    Catalog,
+    compute_pricing,
+    current_catalog,
+    pricing_table,
+)
+
+
+def test_fixed_point_conversions() -> None:
+    assert to_fixed(0.1) + to_fixed(0.2) == to_fixed(0.3)
+    assert to_fixed(Decimal("12067.8917")) == 120678917
+    assert to_fixed("2.67505") == 26751
+    assert to_fixed(-1.00005) == -10001
+    assert from_fixed(to_fixed(414320.82)) == 414320.82
+
+
+def test_fixed_point_arithmetic() -> None:
+    assert fixed_mul(to_fixed(1.5), to_fixed(2.5)) == to_fixed(3.75)
+    assert fixed_div(to_fixed(1), to_fixed(3)) == 3333
+    assert fixed_div(to_fixed(-2), to_fixed(3)) == -6667
+    assert round_fixed(to_fixed(2.675), 2) == to_fixed(2.68)
+    assert round_fixed(to_fixed(-1250), -2) == to_fixed(-1300)
+    with pytest.raises(ZeroDivisionError):
+        fixed_div(1, 0)
+
+
+def test_fixed_pricing_matches_decimal_for_every_configuration() -> None:
+    for combo in product(*(DROPDOWN_MAP[field].options for field in REQUIRED_FIELDS)):
+        inputs = dict(zip(REQUIRED_FIELDS, combo))
+        expected = compute_pricing(inputs, numeric="decimal")
+        assert compute_pricing(inputs) == expected
+        assert compute_pricing(inputs, use_table=False) == expected
+    with pytest.raises(ValueError):
+        compute_pricing(inputs, numeric="binary")
+
+
+def test_pricing_table_is_built_once_per_catalog_version() -> None:
+    table = pricing_table()
+    assert table.size == 2 * 6 * 6 * 3 * 5 * 3 * 2
+    assert pricing_table() is table
+    assert table.version == current_catalog().version
+
+    data = dict(current_catalog().data, basePrice="414321.82")
+    repriced = Catalog(data)
+    assert repriced.version != table.version
+    assert repriced.pricing_table is not table
+    inputs = {field: DROPDOWN_MAP[field].default for field in REQUIRED_FIELDS}
+    assert compute_pricing(inputs, catalog=repriced)["totals"]["grand"] == compute_pricing(inputs)["totals"]["grand"] + 1
+
+
+def test_catalog_range_source_reads_spec() -> None:
+    spec = {
+        "sheets": {
+            "Sheet2": {
+                "rows": [
+                    [{"ref": "A1", "value": "Type"}],
+                    [{"ref": "A2", "value": "Left"}, {"ref": "B2", "value": "ignored"}],
+                    [{"ref": "A3", "value": "Right"}],
+                ]
+            }
+        }
+    }
+    catalog = Catalog(current_catalog().data, spec)
+    assert catalog.dropdown_map["sys.infeed_orientation"].options == ("Left", "Right")
+    assert catalog.dropdown_map["sys.infeed_orientation"].default == "Left"
+    assert catalog.version != current_catalog().version
+
+
+def test_option_rules_are_data_driven() -> None:
+    catalog = current_catalog()
+    assert catalog.option_rules["sys.feeding_funneling"]["Front Badger"] == (("opt.feeding_front", 1),)
+    assert catalog.option_rules["sys.spare_saw_blades_qty"][0] == ()
+    inputs = {field: DROPDOWN_MAP[field].default for field in REQUIRED_FIELDS}
+    inputs["sys.spare_saw_blades_qty"] = 25  # outside the dropdown, priced by its quantity rule
+    blades = compute_pricing(inputs, use_table=False)["options"]
+    assert [(line["id"], line["qty"]) for line in blades if line["id"] == "opt.saw_blades"] == [("opt.saw_blades", 25)]
+
+    data = dict(catalog.data)
+    data["rules"] = data["rules"] + [
+        {"field": "sys.infeed_orientation", "values": ["Left"], "option": "opt.training_spanish", "qty": 2}
+    ]
+    extended = Catalog(data)
+    assert extended.option_rules["sys.infeed_orientation"]["Left"] == (("opt.training_spanish", 2),)
+    inputs["sys.spare_saw_blades_qty"] = 0
+    inputs["sys.infeed_orientation"] = "Left"
+    assert compute_pricing(inputs, catalog=extended) == compute_pricing(inputs, numeric="decimal", catalog=extended)
+    assert extended.pricing_table.size == 3 * current_catalog().pricing_table.size
+    with pytest.raises(ValueError):
+        Catalog(dict(data, rules=[{"field": "sys.guarding", "values": ["Short"], "option": "opt.guarding_tall", "qty": 1}]))
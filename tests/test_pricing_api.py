@@ -1,10 +1,25 @@
 from __future__ import annotations
 
+import gzip
 import json
+import logging
+from itertools import product
 
 import pytest
 
 from backend.app import create_app
+from backend.app import system_options
+from backend.app.system_options import (
+    REQUIRED_FIELDS,
+    PricingValidationError,
+    compute_pricing,
+    configuration_from_key,
+    current_catalog,
+    reload_catalog,
+    validate_inputs,
+)
+
+VERSION = current_catalog().version
 
 
 @pytest.fixture(scope="module")
@@ -48,9 +63,9 @@ DEFAULT_INPUTS = {
 def test_dropdown_catalog(client):
     response = client.get("/api/dropdowns")
     assert response.status_code == 200
-    assert response.headers["X-Catalog-Version"] == "v1"
+    assert response.headers["X-Catalog-Version"] == VERSION
     payload = response.get_json()
-    assert payload["version"] == "v1"
+    assert payload["version"] == VERSION
     assert payload["updatedAt"] == "2025-09-23T00:00:00Z"
     assert len(payload["dropdowns"]) == 8
     orientation = next(item for item in payload["dropdowns"] if item["id"] == "sys.infeed_orientation")
@@ -58,6 +73,27 @@ def test_dropdown_catalog(client):
     assert orientation["options"] == ["Left", "Centered", "Right"]
 
 
+def test_dropdown_catalog_etag_and_compression(client):
+    first = client.get("/api/dropdowns")
+    etag = first.headers["ETag"]
+    assert "Content-Encoding" not in first.headers
+    assert "Accept-Encoding" in first.headers["Vary"]
+
+    cached = client.get("/api/dropdowns", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.data == b""
+    assert cached.headers["ETag"] == etag
+
+    compressed = client.get("/api/dropdowns", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.headers["ETag"] != etag
+    assert json.loads(gzip.decompress(compressed.data)) == first.get_json()
+
+    detail = client.get("/api/dropdowns/sys.transformer")
+    revalidated = client.get("/api/dropdowns/sys.transformer", headers={"If-None-Match": detail.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+
 def test_dropdown_detail(client):
     response = client.get("/api/dropdowns/sys.transformer")
     assert response.status_code == 200
@@ -66,14 +102,14 @@ def test_dropdown_detail(client):
     assert payload["default"] == "None"
     missing = client.get("/api/dropdowns/unknown")
     assert missing.status_code == 404
-    assert missing.headers["X-Catalog-Version"] == "v1"
+    assert missing.headers["X-Catalog-Version"] == VERSION
 
 
 def test_price_defaults(client):
     response = client.post(
         "/api/price",
         json={"inputs": DEFAULT_INPUTS},
-        headers={"X-Catalog-Version": "v1"},
+        headers={"X-Catalog-Version": VERSION},
     )
     assert response.status_code == 200
     payload = response.get_json()
@@ -92,7 +128,7 @@ def test_price_defaults(client):
 
 def test_price_with_adders(client):
     payload = {"inputs": {**DEFAULT_INPUTS, "sys.guarding": "Tall w/ Netting"}}
-    response = client.post("/api/price", json=payload, headers={"X-Catalog-Version": "v1"})
+    response = client.post("/api/price", json=payload, headers={"X-Catalog-Version": VERSION})
     assert response.status_code == 200
     data = response.get_json()
     assert data["totals"]["options"] == pytest.approx(25_236.8917)
@@ -122,6 +158,25 @@ def test_price_validation_errors(client):
     assert response.status_code == 400
     data = response.get_json()
     assert data["field"] == "sys.spare_saw_blades_qty"
+    assert [error["field"] for error in data["errors"]] == list(REQUIRED_FIELDS[1:])
+
+
+def test_validate_inputs_collects_errors_and_freezes_inputs():
+    with pytest.raises(PricingValidationError) as excinfo:
+        validate_inputs({"inputs": {**DEFAULT_INPUTS, "sys.guarding": "Short", "sys.spare_parts_qty": True, "sys.infeed_orientation": 3}})
+    assert [error["field"] for error in excinfo.value.errors] == [
+        "sys.spare_parts_qty",
+        "sys.guarding",
+        "sys.infeed_orientation",
+    ]
+
+    inputs = validate_inputs({"inputs": {**DEFAULT_INPUTS, "sys.spare_saw_blades_qty": "20"}})
+    assert inputs == DEFAULT_INPUTS
+    same = validate_inputs({"inputs": DEFAULT_INPUTS})
+    assert hash(inputs) == hash(same)
+    assert {inputs: "cached"}[same] == "cached"
+    defaulted = validate_inputs({"inputs": {k: v for k, v in DEFAULT_INPUTS.items() if k != "sys.infeed_orientation"}})
+    assert defaulted["sys.infeed_orientation"] == "Centered"
 
 
 def test_price_rejects_stale_catalog(client):
@@ -132,5 +187,159 @@ def test_price_rejects_stale_catalog(client):
     )
     assert response.status_code == 409
     data = response.get_json()
-    assert data["version"] == "v1"
+    assert data["version"] == VERSION
     assert data["error"] == "stale catalog"
+
+
+def test_price_batch(client):
+    items = [
+        {"inputs": DEFAULT_INPUTS},
+        {**DEFAULT_INPUTS, "sys.guarding": "Tall w/ Netting"},
+        {"inputs": {**DEFAULT_INPUTS, "sys.transformer": "Diesel"}},
+    ]
+    response = client.post("/api/price/batch", json=items, headers={"X-Catalog-Version": VERSION})
+    assert response.status_code == 200
+    assert response.headers["X-Catalog-Version"] == VERSION
+    results = response.get_json()["results"]
+    assert [result["index"] for result in results] == [0, 1, 2]
+    assert results[0]["pricing"]["totals"]["grand"] == pytest.approx(427_489.82)
+    assert results[1]["pricing"]["totals"]["grand"] == pytest.approx(439_557.7117)
+    assert results[2]["field"] == "sys.transformer"
+
+    ndjson = "\n".join([json.dumps(DEFAULT_INPUTS), "not json", ""])
+    response = client.post("/api/price/batch", data=ndjson, content_type="application/x-ndjson")
+    results = response.get_json()["results"]
+    assert results[0]["pricing"]["totals"]["options"] == pytest.approx(13_169.0)
+    assert "error" in results[1]
+
+    stale = client.post("/api/price/batch", json=items, headers={"X-Catalog-Version": "stale"})
+    assert stale.status_code == 409
+    assert client.post("/api/price/batch", json={"inputs": DEFAULT_INPUTS}).status_code == 400
+
+
+def test_catalog_reload_swaps_version(app, client, tmp_path):
+    data = dict(current_catalog().data, basePrice="414420.82")
+    catalog_path = tmp_path / "catalog.json"
+    catalog_path.write_text(json.dumps(data))
+    app.config["CATALOG_PATH"] = str(catalog_path)
+    try:
+        response = client.post("/api/catalog/reload")
+        assert response.status_code == 200
+        version = response.get_json()["version"]
+        assert version != VERSION
+        assert response.headers["X-Catalog-Version"] == version
+
+        stale = client.post("/api/price", json={"inputs": DEFAULT_INPUTS}, headers={"X-Catalog-Version": VERSION})
+        assert stale.status_code == 409
+        priced = client.post("/api/price", json={"inputs": DEFAULT_INPUTS}, headers={"X-Catalog-Version": version})
+        assert priced.get_json()["base"] == 414420.82
+    finally:
+        app.config["CATALOG_PATH"] = None
+        reload_catalog()
+    assert current_catalog().version == VERSION
+
+
+def test_search_streams_cheapest_matches(client):
+    catalog = current_catalog()
+    query = {
+        "constraints": {"sys.guarding": {"min": "Tall"}, "sys.transformer": "Canada", "sys.spare_saw_blades_qty": {"max": 20}},
+        "max_total": 440_000,
+        "limit": 5,
+    }
+    response = client.post("/api/search", json=query)
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    results = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    # Brute force over the priced fields for the same constraints.
+    expected = []
+    for combo in product(*(catalog.dropdown_map[field].options for field in REQUIRED_FIELDS)):
+        inputs = dict(zip(REQUIRED_FIELDS, combo))
+        grand = compute_pricing(inputs, use_table=False)["totals"]["grand"]
+        if (
+            inputs["sys.guarding"] != "Standard"
+            and inputs["sys.transformer"] == "Canada"
+            and inputs["sys.spare_saw_blades_qty"] <= 20
+            and grand <= 440_000
+        ):
+            expected.append(grand)
+    expected.sort()
+    assert int(response.headers["X-Total-Matches"]) == len(expected)
+    assert [result["pricing"]["totals"]["grand"] for result in results] == expected[:5]
+    assert [result["rank"] for result in results] == [1, 2, 3, 4, 5]
+    for result in results:
+        assert compute_pricing(result["inputs"])["totals"]["grand"] == result["pricing"]["totals"]["grand"]
+
+    priciest = client.post("/api/search", json={"order": "desc", "limit": 1}).get_data(as_text=True)
+    assert json.loads(priciest)["pricing"]["totals"]["grand"] == max(
+        compute_pricing(dict(zip(REQUIRED_FIELDS, combo)))["totals"]["grand"]
+        for combo in product(*(catalog.dropdown_map[field].options for field in REQUIRED_FIELDS))
+    )
+
+    bad = client.post("/api/search", json={"constraints": {"sys.guarding": {"min": "Short"}}})
+    assert bad.status_code == 400
+    assert bad.get_json()["field"] == "sys.guarding"
+
+
+def test_price_delta_matches_full_recompute(client):
+    full = client.post("/api/price", json={"inputs": DEFAULT_INPUTS})
+    key = full.headers["X-Configuration-Key"]
+    assert validate_inputs({"inputs": DEFAULT_INPUTS}) == configuration_from_key(key)
+
+    changes = {"sys.spare_saw_blades_qty": 40, "sys.guarding": "Tall", "sys.spare_parts_qty": 0}
+    response = client.post("/api/price/delta", json={"base_key": key, "changes": changes})
+    assert response.status_code == 200
+    delta = response.get_json()
+    expected = compute_pricing(validate_inputs({"inputs": {**DEFAULT_INPUTS, **changes}}))
+    assert delta["totals"] == expected["totals"]
+    assert delta["changed"] == ["sys.spare_parts_qty", "sys.spare_saw_blades_qty", "sys.guarding"]
+    assert [(line["id"], line["qty"]) for line in delta["options"]] == [
+        ("opt.saw_blades", 40),
+        ("opt.guarding_tall", 1),
+    ]
+    assert delta["removed"] == ["opt.spare_parts"]
+    assert configuration_from_key(delta["key"]) == {**DEFAULT_INPUTS, **changes}
+
+    by_inputs = client.post("/api/price/delta", json={"base": DEFAULT_INPUTS, "changes": changes})
+    assert by_inputs.get_json() == delta
+    unchanged = client.post("/api/price/delta", json={"base_key": key, "changes": {"sys.infeed_orientation": "Left"}})
+    assert unchanged.get_json()["totals"] == full.get_json()["totals"]
+    assert unchanged.get_json()["options"] == []
+
+    bad = client.post("/api/price/delta", json={"base_key": "stale-0", "changes": changes})
+    assert bad.status_code == 400
+    assert bad.get_json()["field"] == "base_key"
+
+
+def test_configured_catalog_loads_at_startup_and_follows_disk(tmp_path, monkeypatch, caplog):
+    catalog_path = tmp_path / "catalog.json"
+    catalog_path.write_text(json.dumps(dict(current_catalog().data, basePrice="414420.82")))
+    config_path = tmp_path / "config.json"
+    config_path.write_text(
+        json.dumps({"DATABASE_URL": f"sqlite:///{tmp_path / 'catalog.db'}", "CATALOG_PATH": str(catalog_path)})
+    )
+    try:
+        client = create_app(str(config_path)).test_client()
+        configured = client.post("/api/price", json={"inputs": DEFAULT_INPUTS})
+        assert configured.get_json()["base"] == 414420.82
+        assert configured.headers["X-Catalog-Version"] != VERSION
+
+        # Another worker rewriting the file is picked up on the next check.
+        catalog_path.write_text(json.dumps(dict(current_catalog().data, basePrice="414520.82"), indent=1))
+        monkeypatch.setattr(system_options, "CATALOG_CHECK_INTERVAL", 0.0)
+        monkeypatch.setattr(system_options, "_NEXT_CHECK", 0.0)
+        assert client.post("/api/price", json={"inputs": DEFAULT_INPUTS}).get_json()["base"] == 414520.82
+
+        served = current_catalog().version
+        catalog_path.write_text("{not json")
+        with caplog.at_level(logging.ERROR, logger="backend.app.system_options"):
+            response = client.post("/api/price", json={"inputs": DEFAULT_INPUTS})
+            client.post("/api/price", json={"inputs": DEFAULT_INPUTS})
+        assert response.get_json()["base"] == 414520.82
+        assert response.headers["X-Catalog-Version"] == served
+        [record] = caplog.records
+        assert str(catalog_path) in record.getMessage() and served in record.getMessage()
+        assert record.exc_info is not None
+    finally:
+        reload_catalog()
+    assert current_catalog().version == VERSION
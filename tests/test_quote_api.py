@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import json
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from backend.app import create_app, database
+from backend.app.cel import ALL_TOGGLES, toggles_from_mask
+from backend.app.compute import _compute, cost_cells, normalise_payload
+from backend.app.models import CostingItem, CostingSummary, RDSInput
+from backend.app.services import RDSService
+from backend.app.system_options import Catalog, current_catalog
+
+
+@pytest.fixture(scope="module")
+def app(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp("quotes")
+    config_path = tmp_path / "config.json"
+    database_path = tmp_path / "quotes.db"
+    config_path.write_text(
+        json.dumps(
+            {
+                "DATABASE_URL": f"sqlite:///{database_path}",
+                "TEMPLATE_DIR": str(tmp_path / "templates"),
+                "OUTPUT_DIR": str(tmp_path / "output"),
+                "WORD_TEMPLATE": str(tmp_path / "templates" / "proposal_template.docx"),
+                "EXCEL_TEMPLATE": str(tmp_path / "templates" / "costing_template.xlsx"),
+            }
+        )
+    )
+    app = create_app(str(config_path))
+    app.config.update(TESTING=True)
+    return app
+
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+
+def test_toggle_what_if(client):
+    client.post("/api/quote/QWHATIF/toggle", json={"cell": "H38", "value": 1})
+    response = client.get("/api/quote/QWHATIF/what-if?without=H38&margin=0.25")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["mask"] == 1 << body["toggles"].index("H38")
+    assert len(body["scenarios"]) == 2048
+    assert body["sell_price"] == body["scenarios"][0]
+    assert body["delta"] == pytest.approx(body["scenarios"][0] - body["scenarios"][body["mask"]])
+    assert body["scenarios"][body["mask"]] == pytest.approx(body["base_total"] * 1.25)
+
+    response = client.get("/api/quote/QWHATIF/what-if?without=J4")
+    assert response.status_code == 400
+
+
+def test_margin_sweep(client):
+    body = client.post("/api/quote/QSWEEP").get_json()
+    base = body["pricing"]["base_total"]
+
+    response = client.post("/api/quote/QSWEEP/margin-sweep", json={"start": 0.1, "stop": 0.3, "step": 0.05})
+    assert response.status_code == 200
+    sweep = response.get_json()
+    assert sweep["margins"] == pytest.approx([0.1, 0.15, 0.2, 0.25, 0.3])
+    assert sweep["sell_price"] == pytest.approx([base * (1 + margin) for margin in sweep["margins"]])
+
+    response = client.get("/api/quote/QSWEEP/margin-sweep?margins=0.1,0.2")
+    assert response.get_json()["margins"] == [0.1, 0.2]
+    assert client.get("/api/quote/QSWEEP").get_json()["pricing"]["margin"] == body["pricing"]["margin"]
+
+    assert client.post("/api/quote/QSWEEP/margin-sweep", json={"margins": ["x"]}).status_code == 400
+    assert client.post("/api/quote/QSWEEP/margin-sweep", json={"step": 0}).status_code == 400
+
+
+def test_goal_seek(client):
+    client.post("/api/quote/QGOAL")
+    response = client.post("/api/goal-seek", json={"targets": {"QGOAL": 1000, "QMISSING": 5}})
+    assert response.status_code == 200
+    found, missing = response.get_json()["results"]
+    assert found["quote_number"] == "QGOAL"
+    assert found["margin"] is None  # placeholder costs: no margin reaches the target
+    assert missing["error"] == "not found"
+
+    response = client.post("/api/quote/QGOAL/goal-seek", json={"target": 0, "goal": "profit"})
+    assert response.status_code == 200
+    assert client.post("/api/quote/QGOAL/goal-seek", json={"target": 1, "goal": "x"}).status_code == 400
+    assert client.post("/api/goal-seek", json={"targets": []}).status_code == 400
+
+
+def test_bulk_goal_seek_query_count_is_fixed(client):
+    numbers = [f"QBULK{idx}" for idx in range(5)]
+    for number in numbers:
+        client.post(f"/api/quote/{number}")
+    counts = []
+    for size in (1, len(numbers)):
+        with count_queries() as statements:
+            response = client.post("/api/goal-seek", json={"targets": {number: 0 for number in numbers[:size]}})
+        assert response.status_code == 200
+        assert len(response.get_json()["results"]) == size
+        counts.append(len(statements))
+    assert counts == [1, 1]
+
+
+def test_reprice_endpoint(client):
+    client.post("/api/quote/QREPRICE")
+    response = client.post("/api/reprice", json={"margin": 0.4, "workers": 0})
+    assert response.status_code == 200
+    report = response.get_json()
+    assert report["done"] == report["total"] >= 1
+    assert client.get("/api/quote/QREPRICE").get_json()["pricing"]["margin"] == 0.4
+    assert client.post("/api/reprice", json={"chunk_size": 0, "workers": 0}).status_code == 400
+
+
+@contextmanager
+def count_queries():
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(database._engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(database._engine, "before_cursor_execute", record)
+
+
+def test_quote_detail_query_count(client):
+    client.post("/api/quote/QCOUNT")
+    with count_queries() as statements:
+        response = client.get("/api/quote/QCOUNT")
+    assert response.status_code == 200
+    assert [sql.split()[0] for sql in statements] == ["SELECT"]
+
+    client.post("/api/quote/QCOUNT", json={"data": {"a": 1}, "margin": 0.3})
+    with count_queries() as statements:
+        response = client.post("/api/quote/QCOUNT", json={"data": {"a": 2}, "margin": 0.3})
+    assert response.get_json()["inputs"] == {"a": 2}
+    assert [sql.split()[0] for sql in statements] == ["SELECT", "UPDATE", "INSERT"]
+
+
+def test_quote_reads_do_not_create(client):
+    with count_queries() as statements:
+        assert client.get("/api/quote/QNOPE").status_code == 404
+        assert client.get("/api/quote/QNOPE/what-if").status_code == 404
+        assert client.get("/api/quote/QNOPE/margin-sweep?margins=0.1").status_code == 404
+        assert client.post("/api/quote/QNOPE/goal-seek", json={"target": 1}).status_code == 404
+    assert all(sql.startswith("SELECT") for sql in statements)
+
+    response = client.post("/api/quote/QNOPE", json={"customer": "ACME"})
+    assert response.status_code == 200
+    assert client.get("/api/quote/QNOPE").get_json()["customer"] == "ACME"
+
+
+def test_reads_of_quote_without_summary_do_not_insert(client):
+    with database.session_scope() as session:
+        session.add(RDSInput(quote_number="QBARE", data={}))
+    with count_queries() as statements:
+        sweep = client.get("/api/quote/QBARE/margin-sweep?margins=0,0.5")
+        what_if = client.get("/api/quote/QBARE/what-if")
+        goal = client.post("/api/quote/QBARE/goal-seek", json={"target": 0, "goal": "profit"})
+    assert [sweep.status_code, what_if.status_code, goal.status_code] == [200, 200, 200]
+    assert sweep.get_json()["margin"] == 0.2
+    assert sweep.get_json()["sell_price"] == [0.0, 0.0]
+    assert what_if.get_json()["base_total"] == 0.0
+    assert all(sql.startswith("SELECT") for sql in statements)
+    with database.read_scope() as session:
+        quote = session.query(RDSInput).filter_by(quote_number="QBARE").one()
+        assert quote.costing_summary is None
+
+
+def test_compute_is_stateless_and_cached(client):
+    payload = {
+        "quote_number": "Q12345",
+        "customer": "EPF",
+        "margin": 0.15,
+        "spares": 10,
+        "guard": "Tall",
+        "usl": "Front",
+        "xfmr": "None",
+        "train": "EN",
+    }
+    with count_queries() as statements:
+        first = client.post("/api/quote/compute", json=payload)
+        second = client.post("/api/quote/compute", json={**payload, "quote_number": "Q2"})
+    assert statements == []
+    assert first.status_code == 200
+    body = first.get_json()
+    assert body["base_cost"] == pytest.approx(414320.82)
+    assert body["spares"] == {"J38": 10069.0, "J39": 1550.0, "J40": 0.0}
+    assert body["guard"] == {"J32": 10672.24, "J33": 0.0}
+    assert body["infeed"]["J18"] == pytest.approx(3429.7074)
+    assert body["margin"] == 0.15
+    assert body["options_total"] == pytest.approx(1550.0 + 10069.0 + 10672.24 + 3429.7074)
+    assert body["sell_price"] == pytest.approx(414320.82 * 1.15)
+    assert second.get_json()["quote_number"] == "Q2"
+    assert client.get("/api/cache/stats").get_json()["compute"]["hits"] >= 1
+
+    assert client.post("/api/quote/compute", json={"margin": "RESET"}).get_json()["margin"] == 0.24
+    response = client.post("/api/quote/compute", json={**payload, "guard": "Huge"})
+    assert response.status_code == 400
+    assert response.get_json()["field"] == "guard"
+
+
+def test_compute_matches_saved_quote_rollup(client):
+    payload = {"margin": 0.18, "spares": 10, "guard": "TallNet", "usl": "Side", "xfmr": "Canada", "train": "EN+ES"}
+    computed = client.post("/api/quote/compute", json=payload).get_json()
+    inputs, margin = normalise_payload(payload)
+    with database.session_scope() as session:
+        quote = RDSInput(quote_number="QCOMPUTED", data={})
+        summary = CostingSummary(rds_input=quote, margin=margin, toggles=toggles_from_mask(ALL_TOGGLES), totals={})
+        summary.items = [
+            CostingItem(code=cell, description=cell, quantity=1.0, unit_cost=value, metadata_json={"summary_cell": cell})
+            for cell, value in cost_cells(inputs, current_catalog()).items()
+        ]
+        session.add(quote)
+        session.flush()
+        saved = RDSService(session).recompute_costing(quote, margin)["totals"]
+        total = quote.pricing.total
+    assert computed["sell_price"] == pytest.approx(saved["sell_price"])
+    assert computed["sell_price"] == pytest.approx(total)
+    assert computed["options_total"] == pytest.approx(saved["options_total"])
+
+
+def test_compute_misc_cells_follow_read_back_map(client):
+    step = client.post("/api/quote/compute", json={"xfmr": "StepUp", "train": "EN+ES", "margin": 0}).get_json()
+    assert step["misc"] == {"J45": 0.0, "J46": pytest.approx(6401.453), "J47": 0.0}
+
+    canada = client.post("/api/quote/compute", json={"xfmr": "Canada", "train": "EN+ES", "margin": 0}).get_json()
+    assert canada["misc"] == {"J45": pytest.approx(10651.258), "J46": 0.0, "J47": 0.0}
+    assert canada["options_total"] - step["options_total"] == pytest.approx(10651.258 - 6401.453)
+
+    # Spanish training is free in the shipped catalog; price it to see its cell.
+    data = current_catalog().data
+    priced = Catalog(dict(data, options=[
+        dict(option, unitPrice="125.5") if option["id"] == "opt.training_spanish" else option for option in data["options"]
+    ]))
+    inputs, margin = normalise_payload({"xfmr": "StepUp", "train": "EN+ES", "margin": 0}, priced)
+    assert _compute(inputs, margin, priced)["misc"] == {"J45": 0.0, "J46": pytest.approx(6401.453), "J47": 125.5}
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from backend.app.cel import CostingEmulationLayer, ensure_costing_summary
+from backend.app.models import Base, CostingSummary, Pricing, RDSInput
+from backend.app import repricing
+from backend.app.repricing import MAX_WORKERS, _reprice_chunk, _snapshot, reprice_all
+
+
+@pytest.fixture()
+def session() -> Session:
+    engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, future=True)
+    with SessionLocal() as session:
+        yield session
+
+
+def seed_quotes(session: Session, count: int) -> None:
+    for number in range(count):
+        quote = RDSInput(quote_number=f"Q{number}", data={})
+        session.add(quote)
+        session.flush()
+        summary = ensure_costing_summary(session, quote)
+        summary.toggles = {"H38": number % 2}
+        for idx, item in enumerate(summary.items):
+            item.unit_cost = float(number + idx)
+        if number % 3 == 0:
+            session.add(Pricing(rds_input=quote))
+    session.commit()
+
+
+def expected_totals(session: Session, margin: float) -> dict[str, dict[str, float]]:
+    expected = {}
+    for quote in session.scalars(select(RDSInput)):
+        result = CostingEmulationLayer(None, quote.costing_summary).recompute(margin)
+        expected[quote.quote_number] = result.summary_values.to_dict()
+    session.rollback()
+    return expected
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_reprice_all_writes_pricing_in_chunks(session: Session, workers: int) -> None:
+    seed_quotes(session, 7)
+    expected = expected_totals(session, 0.3)
+    seen = []
+    report = reprice_all(session, margin=0.3, chunk_size=3, workers=workers, progress=seen.append)
+    assert (report.done, report.total) == (7, 7)
+    assert [progress.done for progress in seen] == [3, 6, 7]
+
+    session.expire_all()
+    for quote in session.scalars(select(RDSInput)):
+        totals = expected[quote.quote_number]
+        assert quote.costing_summary.totals == totals
+        assert quote.costing_summary.margin == 0.3
+        assert quote.pricing.total == pytest.approx(totals["sell_price"])
+        assert quote.pricing.data == totals
+    assert len(session.scalars(select(Pricing)).all()) == 7
+
+
+def test_reprice_reuses_one_capped_pool(session: Session) -> None:
+    seed_quotes(session, 4)
+    reprice_all(session, chunk_size=2, workers=1000)
+    pool = repricing._EXECUTOR
+    assert pool is not None and pool._max_workers == MAX_WORKERS
+    reprice_all(session, chunk_size=2, workers=2)
+    assert repricing._EXECUTOR is pool
+    with pytest.raises(ValueError):
+        reprice_all(session, workers=-1)
+
+
+def test_reprice_chunk_returns_compact_rows(session: Session) -> None:
+    seed_quotes(session, 2)
+    summaries = session.scalars(select(CostingSummary).order_by(CostingSummary.id)).all()
+    rows = _reprice_chunk([_snapshot(summary) for summary in summaries], 0.25)
+    for (summary_id, _, values, margin, mask), summary in zip(rows, summaries):
+        expected = CostingEmulationLayer(None, summary).recompute(0.25)
+        assert summary_id == summary.id
+        assert values.typecode == "d"
+        assert (list(values), margin, mask) == (list(expected.values), expected.margin, expected.toggle_mask)